@@ -0,0 +1,92 @@
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    from backend.analyzer import analyze_document
+    from backend.file_utils import file_digest
+except ImportError:
+    from analyzer import analyze_document
+    from file_utils import file_digest
+
+
+class AnalysisCache:
+    """
+    Bounded LRU cache of analyze_document() results.
+
+    Entries are keyed by absolute path and validated against the file's
+    mtime, size and content hash, so a template that is replaced on disk is
+    re-analyzed on the next lookup.
+    """
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # path -> (mtime_ns, size, digest, variables)
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str):
+        """
+        Returns the variable list for file_path, analyzing it only on a miss.
+
+        Raises:
+            FileNotFoundError: If file_path does not exist.
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return _copy_variables(entry[3])
+
+        # The stat changed (or the entry is new): fall back to the content hash
+        # so a touched-but-identical file does not force a re-parse.
+        digest = file_digest(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[2] == digest:
+                self._entries[path] = (stat.st_mtime_ns, stat.st_size, digest, entry[3])
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return _copy_variables(entry[3])
+
+        variables = analyze_document(path)
+
+        with self._lock:
+            self.misses += 1
+            self._entries[path] = (stat.st_mtime_ns, stat.st_size, digest, variables)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return _copy_variables(variables)
+
+    def invalidate(self, file_path: str = None):
+        """Drops the entry for file_path, or every entry when no path is given."""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(file_path), None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+def _copy_variables(variables):
+    # Callers get their own dicts so they cannot corrupt the cached entry.
+    return [dict(v) for v in variables]
+
+
+analysis_cache = AnalysisCache(maxsize=int(os.getenv("ANALYSIS_CACHE_SIZE", "32")))
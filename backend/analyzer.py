@@ -1,49 +1,77 @@
 import re
 import json
-from docx import Document
+import zipfile
 
-def analyze_document(file_path: str):
+# Regex to find {{ v1 }}, {{ V2 }}, etc.
+# The flag re.IGNORECASE handles the v vs V issue.
+var_pattern = re.compile(r"\{\{\s*(v\d+)\s*\}\}", re.IGNORECASE)
+
+# Header and footer parts, e.g. word/header1.xml, word/footer2.xml
+HEADER_FOOTER_PART = re.compile(r"^word/(header|footer)\d*\.xml$")
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_BODY = W_NS + "body"
+W_P = W_NS + "p"
+W_TBL = W_NS + "tbl"
+W_TR = W_NS + "tr"
+W_TC = W_NS + "tc"
+W_R = W_NS + "r"
+W_HYPERLINK = W_NS + "hyperlink"
+W_T = W_NS + "t"
+W_TAB = W_NS + "tab"
+W_PTAB = W_NS + "ptab"
+W_BR = W_NS + "br"
+W_CR = W_NS + "cr"
+W_NO_BREAK_HYPHEN = W_NS + "noBreakHyphen"
+W_TR_PR = W_NS + "trPr"
+W_TC_PR = W_NS + "tcPr"
+W_GRID_BEFORE = W_NS + "gridBefore"
+W_GRID_SPAN = W_NS + "gridSpan"
+W_V_MERGE = W_NS + "vMerge"
+W_VAL = W_NS + "val"
+W_TYPE = W_NS + "type"
+
+# Helper to clean text
+def clean_text(text):
+    return text.replace('\xa0', ' ').strip()
+
+def _collect_variables(table_rows, paragraphs, header_footer_paragraphs=()):
     """
-    Robustly scans a DOCX file for variables {{ v... }} and {{ V... }}.
-    Captures full row context for table-based variables.
+    Builds the sorted variable list from raw document text.
+
+    Args:
+        table_rows: Iterable of rows, each a list of cell texts with merged cells repeated
+            once per layout-grid column (the python-docx `row.cells` convention).
+        paragraphs: Iterable of body paragraph texts.
+        header_footer_paragraphs: Iterable of paragraph texts from headers and footers.
     """
-    doc = Document(file_path)
     variables = {}
-    
-    # Regex to find {{ v1 }}, {{ V2 }}, etc. 
-    # The flag re.IGNORECASE handles the v vs V issue.
-    var_pattern = re.compile(r"\{\{\s*(v\d+)\s*\}\}", re.IGNORECASE)
-
-    # Helper to clean text
-    def clean_text(text):
-        return text.replace('\xa0', ' ').strip()
 
     # 1. SCAN TABLES (Primary Source for Forms)
-    for table in doc.tables:
-        for row in table.rows:
-            # Capture the entire row text as context
-            row_cells = [clean_text(cell.text) for cell in row.cells if cell.text.strip()]
-            full_row_context = " | ".join(row_cells)
-            
-            # Scan each cell
-            for cell in row.cells:
-                text = clean_text(cell.text)
-                matches = var_pattern.findall(text)
-                for var_raw in matches:
-                    # Normalize to lowercase (e.g., 'V2' -> 'v2') to ensure consistency
-                    var_id = var_raw.lower()
-                    
-                    # Store with rich context
-                    variables[var_id] = {
-                        "id": var_id,
-                        "original_tag": var_raw,
-                        "context": full_row_context,
-                        "type": "table_row"
-                    }
-
-    # 2. SCAN PARAGRAPHS (Fallback)
-    for para in doc.paragraphs:
-        text = clean_text(para.text)
+    for cells in table_rows:
+        # Capture the entire row text as context
+        row_cells = [clean_text(text) for text in cells if text.strip()]
+        full_row_context = " | ".join(row_cells)
+
+        # Scan each cell
+        for cell_text in cells:
+            text = clean_text(cell_text)
+            matches = var_pattern.findall(text)
+            for var_raw in matches:
+                # Normalize to lowercase (e.g., 'V2' -> 'v2') to ensure consistency
+                var_id = var_raw.lower()
+
+                # Store with rich context
+                variables[var_id] = {
+                    "id": var_id,
+                    "original_tag": var_raw,
+                    "context": full_row_context,
+                    "type": "table_row"
+                }
+
+    # 2. SCAN PARAGRAPHS (Fallback), then headers and footers
+    for para_text in list(paragraphs) + list(header_footer_paragraphs):
+        text = clean_text(para_text)
         matches = var_pattern.findall(text)
         for var_raw in matches:
             var_id = var_raw.lower()
@@ -65,6 +93,148 @@ def analyze_document(file_path: str):
     sorted_vars = sorted(variables.values(), key=get_v_num)
     return sorted_vars
 
+def analyze_document_docx(file_path: str):
+    """
+    Reference implementation of analyze_document on the python-docx object model.
+    Slower than the streaming scanner; used as its fallback and to check parity.
+    """
+    from docx import Document
+    from docx.text.paragraph import Paragraph
+
+    doc = Document(file_path)
+    table_rows = [[cell.text for cell in row.cells] for table in doc.tables for row in table.rows]
+    paragraphs = [para.text for para in doc.paragraphs]
+
+    header_footer_paragraphs = []
+    parts = sorted(doc.part.package.iter_parts(), key=lambda part: str(part.partname))
+    for part in parts:
+        if HEADER_FOOTER_PART.match(str(part.partname).lstrip("/")):
+            for p in part.element.iter(W_P):
+                header_footer_paragraphs.append(Paragraph(p, None).text)
+
+    return _collect_variables(table_rows, paragraphs, header_footer_paragraphs)
+
+# --- STREAMING SCANNER ---
+# Reads word/document.xml block by block with lxml.iterparse instead of
+# building the python-docx object graph, mirroring python-docx's text rules.
+
+def _run_text(r):
+    parts = []
+    for e in r:
+        tag = e.tag
+        if tag == W_T:
+            parts.append(e.text or "")
+        elif tag == W_TAB or tag == W_PTAB:
+            parts.append("\t")
+        elif tag == W_BR:
+            # Only line breaks produce text; page and column breaks do not
+            if e.get(W_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag == W_CR:
+            parts.append("\n")
+        elif tag == W_NO_BREAK_HYPHEN:
+            parts.append("-")
+    return "".join(parts)
+
+def _paragraph_text(p):
+    parts = []
+    for child in p:
+        if child.tag == W_R:
+            parts.append(_run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(_run_text(r) for r in child if r.tag == W_R)
+    return "".join(parts)
+
+def _int_val(parent, tag, default):
+    if parent is None:
+        return default
+    el = parent.find(tag)
+    if el is None:
+        return default
+    try:
+        return int(el.get(W_VAL))
+    except (TypeError, ValueError):
+        return default
+
+def _table_rows(tbl):
+    """Yields each row's cell texts with spans repeated per grid column, resolving vertical merges."""
+    above = {}  # grid offset -> (text, span) of the root cell in the previous row
+    for tr in tbl:
+        if tr.tag != W_TR:
+            continue
+        cells = []
+        current = {}
+        offset = _int_val(tr.find(W_TR_PR), W_GRID_BEFORE, 0)
+        for tc in tr:
+            if tc.tag != W_TC:
+                continue
+            tc_pr = tc.find(W_TC_PR)
+            span = _int_val(tc_pr, W_GRID_SPAN, 1)
+            v_merge = tc_pr.find(W_V_MERGE) if tc_pr is not None else None
+            if v_merge is not None and v_merge.get(W_VAL, "continue") == "continue" and offset in above:
+                # Continuation of a vertical merge: python-docx yields the root cell instead
+                text, root_span = above[offset]
+                cells.extend([text] * root_span)
+                current[offset] = (text, root_span)
+            else:
+                text = "\n".join(_paragraph_text(p) for p in tc if p.tag == W_P)
+                cells.extend([text] * span)
+                current[offset] = (text, span)
+            offset += span
+        above = current
+        yield cells
+
+def _scan_body(stream):
+    from lxml import etree
+
+    table_rows = []
+    paragraphs = []
+    for _, elem in etree.iterparse(stream, events=("end",), tag=(W_P, W_TBL)):
+        parent = elem.getparent()
+        if parent is None or parent.tag != W_BODY:
+            continue  # nested block: handled with its top-level ancestor
+        if elem.tag == W_TBL:
+            table_rows.extend(_table_rows(elem))
+        else:
+            paragraphs.append(_paragraph_text(elem))
+        # Free the processed block and anything before it
+        elem.clear()
+        while elem.getprevious() is not None:
+            del parent[0]
+    return table_rows, paragraphs
+
+def _scan_part_paragraphs(stream):
+    from lxml import etree
+
+    texts = []
+    for _, elem in etree.iterparse(stream, events=("end",), tag=W_P):
+        texts.append(_paragraph_text(elem))
+    return texts
+
+def scan_docx_variables(file_path: str):
+    """Streaming equivalent of analyze_document_docx over the raw package XML."""
+    with zipfile.ZipFile(file_path) as package:
+        with package.open("word/document.xml") as stream:
+            table_rows, paragraphs = _scan_body(stream)
+        header_footer_paragraphs = []
+        for name in sorted(n for n in package.namelist() if HEADER_FOOTER_PART.match(n)):
+            with package.open(name) as stream:
+                header_footer_paragraphs.extend(_scan_part_paragraphs(stream))
+    return _collect_variables(table_rows, paragraphs, header_footer_paragraphs)
+
+def analyze_document(file_path: str):
+    """
+    Robustly scans a DOCX file for variables {{ v... }} and {{ V... }}.
+    Captures full row context for table-based variables.
+    """
+    try:
+        return scan_docx_variables(file_path)
+    except (FileNotFoundError, IsADirectoryError):
+        raise
+    except Exception as e:
+        print(f"DEBUG: Streaming scan failed for {file_path} ({e}); falling back to python-docx")
+        return analyze_document_docx(file_path)
+
 if __name__ == "__main__":
     import sys
     if len(sys.argv) > 1:
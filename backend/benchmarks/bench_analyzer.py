@@ -0,0 +1,62 @@
+"""
+Compares the streaming template scanner with the python-docx implementation.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.bench_analyzer [--rows 400] [--repeat 5] [template.docx ...]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from backend.analyzer import analyze_document_docx, scan_docx_variables
+
+def build_synthetic_template(path, rows=400, cols=4):
+    """Writes a form-style template: one table with a merged header and a variable in every row."""
+    import docx
+
+    doc = docx.Document()
+    doc.add_paragraph("Specification for {{ v1 }}")
+    table = doc.add_table(rows=rows, cols=cols)
+    table.rows[0].cells[0].merge(table.rows[0].cells[cols - 1]).text = "Section A - Requirements"
+    for i in range(1, rows):
+        cells = table.rows[i].cells
+        cells[0].text = f"{i}."
+        cells[1].text = f"Requirement {i}: describe the expected service level and reporting obligations."
+        cells[2].text = f"{{{{ v{i + 1} }}}}"
+        cells[3].text = "Mandatory"
+    doc.save(path)
+
+def best_of(func, path, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(path)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("templates", nargs="*", help="Extra .docx templates to benchmark")
+    parser.add_argument("--rows", type=int, default=400, help="Table rows in the synthetic template")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per implementation (best is reported)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic = os.path.join(tmp, f"synthetic_{args.rows}_rows.docx")
+        build_synthetic_template(synthetic, rows=args.rows)
+
+        print(f"{'template':<48} {'vars':>5} {'python-docx':>12} {'streaming':>10} {'speedup':>8}")
+        for path in [synthetic] + args.templates:
+            slow, expected = best_of(analyze_document_docx, path, args.repeat)
+            fast, actual = best_of(scan_docx_variables, path, args.repeat)
+            if actual != expected:
+                print(f"MISMATCH: streaming output differs from python-docx for {path}")
+                return 1
+            name = os.path.basename(path)[:48]
+            print(f"{name:<48} {len(actual):>5} {slow * 1000:>10.1f}ms {fast * 1000:>8.1f}ms {slow / fast:>7.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Synthetic documents for the benchmark suite: templates, contracts, PDFs and spreadsheets.
+
+Every builder is deterministic for a given size, so timings are comparable across runs.
+"""
+import os
+import random
+
+CLAUSE_WORDS = (
+    "supplier shall provide services in accordance with the agreed service levels and the buyer may "
+    "terminate this agreement upon thirty days written notice where either party breaches any material "
+    "obligation including payment confidentiality data protection liability indemnity audit and reporting"
+).split()
+
+
+def clause_text(seed, words=60):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(CLAUSE_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def build_template(path, variables=200, rows=400, cols=4):
+    """
+    Writes a form-style template with `variables` {{ vN }} tags: one per table
+    row (rows under a merged section header) and the rest in body paragraphs.
+    """
+    import docx
+
+    doc = docx.Document()
+    doc.add_heading("Invitation to Tender", level=1)
+    doc.add_paragraph("Prepared for {{ v1 }}")
+    table = doc.add_table(rows=rows, cols=cols)
+    table.rows[0].cells[0].merge(table.rows[0].cells[cols - 1]).text = "Section A - Requirements"
+    number = 2
+    for i in range(1, rows):
+        cells = table.rows[i].cells
+        cells[0].text = f"{i}."
+        cells[1].text = f"Requirement {i}: describe the expected service level and reporting obligations."
+        if number <= variables:
+            cells[2].text = f"{{{{ v{number} }}}}"
+            number += 1
+        cells[3].text = "Mandatory"
+    while number <= variables:
+        doc.add_paragraph(f"Clause {number}: {clause_text(number, 20)} Response: {{{{ v{number} }}}}")
+        number += 1
+    doc.save(path)
+    return path
+
+
+def template_answers(variables):
+    return {f"v{i}": f"Answer {i} with enough text to resemble a real response." for i in range(1, variables + 1)}
+
+
+def build_contract(path, clauses=200):
+    """Writes a contract .docx: numbered clauses with a key-terms table after every 50."""
+    import docx
+
+    doc = docx.Document()
+    doc.add_heading("Master Services Agreement", level=1)
+    for i in range(1, clauses + 1):
+        doc.add_paragraph(f"{i}. {clause_text(i)}")
+        if i % 50 == 0:
+            table = doc.add_table(rows=4, cols=2)
+            for row, (term, value) in zip(table.rows, [("Term", "36 months"), ("Value", "GBP 1,200,000"),
+                                                       ("Notice", "30 days"), ("Law", "England and Wales")]):
+                row.cells[0].text = term
+                row.cells[1].text = value
+    doc.save(path)
+    return path
+
+
+def build_pdf(path, pages=50, lines_per_page=40):
+    """Writes a PDF with `lines_per_page` lines of Helvetica text on every page (no external dependency)."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        lines = " T* ".join(f"({clause_text(page * lines_per_page + n, 12)}) Tj" for n in range(lines_per_page))
+        stream = f"BT /F1 10 Tf 12 TL 50 760 Td {lines} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+def sheet_frame(rows=20000):
+    """A spend-analysis style table: text, categorical, numeric and date columns."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(rows)
+    suppliers = [f"Supplier {i:03d}" for i in range(200)]
+    return pd.DataFrame({
+        "Invoice": [f"INV-{i:07d}" for i in range(rows)],
+        "Supplier": rng.choice(suppliers, rows),
+        "Category": rng.choice(["IT", "Facilities", "Consulting", "Logistics", "Marketing"], rows),
+        "Region": rng.choice(["North", "South", "East", "West"], rows),
+        "Amount": rng.gamma(2.0, 2500.0, rows).round(2),
+        "Quantity": rng.integers(1, 500, rows),
+        "Date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 730, rows), unit="D"),
+        "Description": [clause_text(i, 8) for i in range(rows)],
+    })
+
+
+def build_xlsx(path, rows=20000):
+    sheet_frame(rows).to_excel(path, index=False)
+    return path
+
+
+def build_csv(path, rows=100000):
+    sheet_frame(rows).to_csv(path, index=False)
+    return path
+
+
+def build_text(path, clauses=200):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(f"{i}. {clause_text(i)}" for i in range(1, clauses + 1)))
+    return path
+
+
+def build_knowledge_base(directory, scale):
+    """A knowledge base folder mixing every supported format, sized like the scale's other documents."""
+    os.makedirs(os.path.join(directory, "policies"), exist_ok=True)
+    build_contract(os.path.join(directory, "contract_terms.docx"), clauses=scale["contract_clauses"][0])
+    build_text(os.path.join(directory, "policies", "travel_policy.txt"), clauses=scale["contract_clauses"][0])
+    build_pdf(os.path.join(directory, "policies", "procurement_manual.pdf"), pages=scale["pdf_pages"][0])
+    build_csv(os.path.join(directory, "spend.csv"), rows=scale["sheet_rows"] // 10)
+    return directory
@@ -0,0 +1,189 @@
+"""
+Times the document hot paths over synthetic corpora and flags regressions against a saved baseline.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.run [--scale quick|full] [--filter analyze] [--save-baseline] [--compare]
+
+Each case reports its first (cold) run and the median of the remaining (warm)
+runs; regressions are judged on the median. --compare exits with status 1
+when any case got slower than --threshold.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+from datetime import datetime
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "benchmarks", "baseline.json")
+
+SCALES = {
+    # (variables, table rows) per template; clauses per contract; pages per PDF; rows per spreadsheet
+    "quick": {"templates": [(50, 100)], "contract_clauses": [20, 200], "pdf_pages": [10, 50], "sheet_rows": 2000, "repeat": 3},
+    "full": {
+        "templates": [(50, 100), (200, 400)],
+        "contract_clauses": [20, 200, 1000],
+        "pdf_pages": [50, 300],
+        "sheet_rows": 20000,
+        "repeat": 5,
+    },
+}
+# Differences below this many seconds are noise, whatever the ratio
+MIN_DELTA_SECONDS = 0.002
+
+
+def build_cases(directory, scale):
+    """Writes the corpus into directory and returns [(name, func)] for every timed call."""
+    from backend.benchmarks import corpus
+    from backend.analyzer import analyze_document
+    from backend.generator import render_template_file
+    from backend.file_utils import get_knowledge_base_content
+    from backend.text_extraction import READERS
+    from backend.pdf_text import _extract_pages
+    from backend.sheet_cache import read_source_frame
+
+    cases = []
+    for variables, rows in scale["templates"]:
+        path = corpus.build_template(os.path.join(directory, f"template_{variables}v_{rows}r.docx"), variables, rows)
+        answers = corpus.template_answers(variables)
+        cases.append((f"analyze/template_{variables}v_{rows}r", lambda p=path: analyze_document(p)))
+        # render_template_file is generate_document without writing to backend/output
+        cases.append((f"generate/template_{variables}v_{rows}r", lambda p=path, a=answers: render_template_file(p, a)))
+
+    for clauses in scale["contract_clauses"]:
+        path = corpus.build_contract(os.path.join(directory, f"contract_{clauses}.docx"), clauses)
+        cases.append((f"reader/docx_contract_{clauses}", lambda p=path: READERS["docx"](p)))
+    path = corpus.build_text(os.path.join(directory, "policy.txt"), scale["contract_clauses"][-1])
+    cases.append((f"reader/txt_{scale['contract_clauses'][-1]}", lambda p=path: READERS["txt"](p)))
+
+    for pages in scale["pdf_pages"]:
+        path = corpus.build_pdf(os.path.join(directory, f"manual_{pages}p.pdf"), pages)
+        cases.append((f"reader/pdf_{pages}p_parse", lambda p=path, n=pages: _extract_pages(p, range(n))))
+        # First run parses, later runs are served from the per-page cache
+        cases.append((f"reader/pdf_{pages}p", lambda p=path: READERS["pdf"](p)))
+
+    rows = scale["sheet_rows"]
+    for ext, build in (("xlsx", corpus.build_xlsx), ("csv", corpus.build_csv)):
+        path = build(os.path.join(directory, f"spend_{rows}.{ext}"), rows)
+        cases.append((f"reader/{ext}_{rows}r_parse", lambda p=path: read_source_frame(p)))
+        # First run converts to the columnar cache, later runs read it
+        cases.append((f"reader/{ext}_{rows}r", lambda p=path, e=ext: READERS[e](p)))
+
+    kb_path = corpus.build_knowledge_base(os.path.join(directory, "knowledge_base"), scale)
+    cases.append(("kb/get_knowledge_base_content", lambda: get_knowledge_base_content(kb_path)))
+    return cases
+
+
+def time_case(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    warm = timings[1:] or timings
+    return {"first": timings[0], "median": statistics.median(warm), "best": min(timings), "runs": repeat}
+
+
+def run_suite(scale_name="quick", repeat=None, name_filter=None):
+    scale = SCALES[scale_name]
+    repeat = repeat or scale["repeat"]
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the suite's on-disk caches out of backend/.cache (read when the modules are imported)
+        os.environ["SHEET_CACHE_DIR"] = os.path.join(tmp, "cache", "sheets")
+        os.environ["KB_INDEX_DIR"] = os.path.join(tmp, "cache", "kb")
+        corpus_dir = os.path.join(tmp, "corpus")
+        os.makedirs(corpus_dir)
+        print(f"Building {scale_name} corpus...")
+        start = time.perf_counter()
+        cases = build_cases(corpus_dir, scale)
+        print(f"Corpus ready in {time.perf_counter() - start:.1f}s")
+
+        results = {}
+        for name, func in cases:
+            if name_filter and name_filter not in name:
+                continue
+            results[name] = time_case(func, repeat)
+            r = results[name]
+            print(f"{name:<40} first {r['first'] * 1000:>9.1f}ms  median {r['median'] * 1000:>9.1f}ms")
+    return {
+        "meta": {
+            "scale": scale_name,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.25, min_delta=MIN_DELTA_SECONDS):
+    """
+    Returns [(name, base median, current median, ratio, verdict)] for cases in
+    both runs; verdict is "REGRESSION", "improved" or "ok".
+    """
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        before, after = base["median"], result["median"]
+        ratio = after / before if before else float("inf")
+        if ratio > 1 + threshold and after - before > min_delta:
+            verdict = "REGRESSION"
+        elif ratio < 1 / (1 + threshold) and before - after > min_delta:
+            verdict = "improved"
+        else:
+            verdict = "ok"
+        rows.append((name, before, after, ratio, verdict))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="quick", help="Corpus size (default: quick)")
+    parser.add_argument("--repeat", type=int, help="Runs per case (default depends on the scale)")
+    parser.add_argument("--filter", help="Only run cases whose name contains this text")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON path")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare against the baseline and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Slowdown ratio counted as a regression (default 0.25)")
+    parser.add_argument("--output", help="Also write this run's results to a JSON file")
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.scale, args.repeat, args.filter)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+
+    status = 0
+    if args.compare:
+        try:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print(f"No baseline at {args.baseline}; run with --save-baseline first")
+            return 2
+        if baseline["meta"].get("scale") != current["meta"]["scale"]:
+            print(f"WARNING: baseline scale {baseline['meta'].get('scale')} differs from {current['meta']['scale']}")
+        print(f"\n{'case':<40} {'baseline':>10} {'current':>10} {'ratio':>7}")
+        for name, before, after, ratio, verdict in compare(current, baseline, args.threshold):
+            print(f"{name:<40} {before * 1000:>8.1f}ms {after * 1000:>8.1f}ms {ratio:>6.2f}x  {verdict}")
+            if verdict == "REGRESSION":
+                status = 1
+        print("Regressions found" if status else "No regressions")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Measures cold-start cost: import time of backend.main and time until uvicorn answers its first request.
+
+Usage (from the repo root):
+    python -m backend.benchmarks.startup [--import-budget 1.0] [--startup-budget 3.0] [--repeat 3]
+
+Exits with status 1 when the median import or startup time exceeds its budget,
+or when importing backend.main loads one of the heavy format libraries.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Must only be imported on first use, never by importing the app
+LAZY_MODULES = ("pandas", "numpy", "openpyxl", "pypdf", "docx", "docxtpl", "lxml", "openai")
+IMPORT_PROBE = (
+    "import sys, time, json\n"
+    "start = time.perf_counter()\n"
+    "import backend.main\n"
+    "elapsed = time.perf_counter() - start\n"
+    f"loaded = [m for m in {LAZY_MODULES!r} if m in sys.modules]\n"
+    "print('STARTUP_PROBE ' + json.dumps({'seconds': elapsed, 'loaded': loaded}))\n"
+)
+
+
+def _env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def parse_importtime(stderr: str):
+    """Parses `-X importtime` output into [(module, self_us, cumulative_us, depth)]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+        name = name[1:]  # the space after "|"; the rest of the indentation is the nesting depth
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure_import():
+    """Imports backend.main in a fresh interpreter; returns (seconds, heavy modules loaded, importtime rows)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_PROBE],
+        cwd=REPO_ROOT, env=_env(), capture_output=True, text=True, check=True,
+    )
+    probe = next(line for line in result.stdout.splitlines() if line.startswith("STARTUP_PROBE "))
+    data = json.loads(probe[len("STARTUP_PROBE "):])
+    return data["seconds"], data["loaded"], parse_importtime(result.stderr)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_startup(path="/templates", timeout=60.0):
+    """Seconds from launching uvicorn until it answers `path` with 200."""
+    port = _free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError(f"No response from {path} within {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--import-budget", type=float, default=float(os.getenv("IMPORT_BUDGET_SECONDS", "1.0")),
+                        help="Maximum median import time of backend.main in seconds (default 1.0)")
+    parser.add_argument("--startup-budget", type=float, default=float(os.getenv("STARTUP_BUDGET_SECONDS", "3.0")),
+                        help="Maximum median time to the first 200 response in seconds (default 3.0)")
+    parser.add_argument("--repeat", type=int, default=3, help="Measurements per metric (median is judged)")
+    parser.add_argument("--top", type=int, default=12, help="Slowest top-level imports to list")
+    parser.add_argument("--skip-server", action="store_true", help="Only measure the import")
+    args = parser.parse_args(argv)
+
+    failures = []
+    imports = [measure_import() for _ in range(args.repeat)]
+    import_seconds = statistics.median(seconds for seconds, _, _ in imports)
+    loaded = sorted({m for _, modules, _ in imports for m in modules})
+
+    rows = imports[-1][2]
+    print(f"Slowest imports under backend.main (cumulative):")
+    for name, _, cumulative, _ in sorted((r for r in rows if r[3] <= 1), key=lambda r: -r[2])[:args.top]:
+        print(f"  {cumulative / 1000:>8.1f}ms  {name}")
+    print(f"import backend.main: {import_seconds * 1000:.0f}ms (budget {args.import_budget * 1000:.0f}ms)")
+    if import_seconds > args.import_budget:
+        failures.append("import time over budget")
+    if loaded:
+        print(f"Loaded at import time (should be lazy): {', '.join(loaded)}")
+        failures.append("heavy modules imported eagerly")
+
+    if not args.skip_server:
+        startup_seconds = statistics.median(measure_startup() for _ in range(args.repeat))
+        print(f"uvicorn first response: {startup_seconds * 1000:.0f}ms (budget {args.startup_budget * 1000:.0f}ms)")
+        if startup_seconds > args.startup_budget:
+            failures.append("startup time over budget")
+
+    if failures:
+        print("FAILED: " + "; ".join(failures))
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import os
+import re
+import json
+import time
+import asyncio
+import zipfile
+import threading
+
+try:
+    from backend.generator import render_template_file
+except ImportError:
+    from generator import render_template_file
+
+# Worker processes for bulk rendering (0 = render in the default thread pool instead)
+BULK_GENERATE_WORKERS = int(os.getenv("BULK_GENERATE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Upper bound on answer sets per request
+BULK_GENERATE_MAX_ITEMS = int(os.getenv("BULK_GENERATE_MAX_ITEMS", "500"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the shared process pool, creating it on first use. None when workers are disabled."""
+    global _pool
+    if BULK_GENERATE_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None or getattr(_pool, "_broken", False):
+            from concurrent.futures import ProcessPoolExecutor
+
+            print(f"DEBUG: Starting bulk generation pool with {BULK_GENERATE_WORKERS} workers")
+            _pool = ProcessPoolExecutor(max_workers=BULK_GENERATE_WORKERS)
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _render_item(template_path, answers):
+    # Runs in a worker process; its template caches persist across items
+    return render_template_file(template_path, answers)
+
+
+def archive_names(template_filename, count, names=None):
+    """Returns one unique, path-free .docx entry name per item."""
+    stem = os.path.splitext(os.path.basename(template_filename))[0]
+    result = []
+    seen = set()
+    for index in range(count):
+        name = names[index] if names and index < len(names) and names[index] else f"{stem}_{index + 1:03d}"
+        # No directories or characters that break archive tools
+        name = re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", os.path.basename(str(name).strip())) or f"{stem}_{index + 1:03d}"
+        if not name.lower().endswith(".docx"):
+            name += ".docx"
+        base, candidate, n = name[:-5], name, 2
+        while candidate.lower() in seen:
+            candidate = f"{base}_{n}.docx"
+            n += 1
+        seen.add(candidate.lower())
+        result.append(candidate)
+    return result
+
+
+class _ChunkBuffer:
+    """Write-only file object for ZipFile; each write is collected until drained to the client."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def render_many(template_path, items, executor=None, window=None):
+    """
+    Renders every answer set, yielding (index, data, error) as each one finishes.
+    At most `window` renders are queued at once so large batches do not pile up in memory.
+    """
+    loop = asyncio.get_running_loop()
+    window = window or max(2, 2 * BULK_GENERATE_WORKERS)
+
+    async def run(index, answers):
+        try:
+            data = await loop.run_in_executor(executor, _render_item, template_path, answers)
+            return index, data, None
+        except Exception as e:
+            print(f"DEBUG: Bulk item {index} failed: {e}")
+            return index, None, str(e) or type(e).__name__
+
+    queue = iter(enumerate(items))
+    pending = set()
+    try:
+        while True:
+            for index, answers in queue:
+                pending.add(asyncio.ensure_future(run(index, answers)))
+                if len(pending) >= window:
+                    break
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # Client went away: drop renders that have not started yet
+        for task in pending:
+            task.cancel()
+
+
+async def stream_bulk_zip(template_path, items, names=None, executor=None):
+    """
+    Yields a ZIP archive in chunks: one .docx entry per successful item as soon
+    as it is rendered, then manifest.json with the status of every item.
+    A failing item is reported in the manifest instead of failing the batch.
+    """
+    start = time.time()
+    entry_names = archive_names(template_path, len(items), names)
+    results = [None] * len(items)
+    buffer = _ChunkBuffer()
+    # docx files are already deflated; storing them keeps the workers' output untouched
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        async for index, data, error in render_many(template_path, items, executor=executor):
+            if error is None:
+                archive.writestr(entry_names[index], data)
+                results[index] = {"index": index, "name": entry_names[index], "status": "ok", "size": len(data)}
+            else:
+                results[index] = {"index": index, "name": entry_names[index], "status": "error", "error": error}
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+
+        failed = sum(1 for r in results if r["status"] != "ok")
+        manifest = {
+            "template": os.path.basename(template_path),
+            "total": len(items),
+            "succeeded": len(items) - failed,
+            "failed": failed,
+            "elapsed": round(time.time() - start, 3),
+            "items": results,
+        }
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+    yield buffer.drain()
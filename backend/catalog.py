@@ -0,0 +1,195 @@
+import os
+import re
+import time
+import bisect
+import zipfile
+import threading
+from datetime import datetime
+
+# A directory whose mtime is unchanged is re-scanned at most this often (catches files edited in place)
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "5"))
+SORT_KEYS = ("name", "date", "size")
+PAGES_RE = re.compile(rb"<(?:\w+:)?Pages>(\d+)</(?:\w+:)?Pages>")
+
+
+def format_size(size_bytes: int) -> str:
+    if size_bytes < 1024:
+        return f"{size_bytes} B"
+    if size_bytes < 1024 * 1024:
+        return f"{size_bytes / 1024:.1f} KB"
+    return f"{size_bytes / (1024 * 1024):.1f} MB"
+
+
+def page_count(path: str):
+    """Pages of a PDF, or of a .docx as last saved by Word (docProps/app.xml); None when unknown."""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext == ".pdf":
+            from pypdf import PdfReader
+
+            return len(PdfReader(path).pages)
+        if ext == ".docx":
+            with zipfile.ZipFile(path) as package:
+                if "docProps/app.xml" not in package.namelist():
+                    return None
+                match = PAGES_RE.search(package.read("docProps/app.xml"))
+            return int(match.group(1)) if match else None
+    except Exception as e:
+        print(f"DEBUG: Catalog could not count pages of {os.path.basename(path)}: {e}")
+    return None
+
+
+class Catalog:
+    """
+    Listing index for one document folder.
+
+    File metadata comes from one os.scandir, repeated only when the folder's
+    mtime changes or the refresh interval has passed; unchanged files keep
+    their entries. Page and variable counts are never computed while listing:
+    they are None until warm() fills them in (from the prewarm worker) and
+    are kept until the file changes.
+    """
+
+    def __init__(self, directory: str, include=None, author: str = "System", count_variables=None,
+                 refresh_seconds: float = CATALOG_REFRESH_SECONDS):
+        self.directory = directory
+        self.include = include or (lambda name: not name.startswith("~$"))
+        self.author = author
+        self.count_variables = count_variables  # function(path) -> int, for templates
+        self.refresh_seconds = refresh_seconds
+        self._entries = {}  # name -> entry dict
+        self._orders = {}  # (sort, order) -> [name, ...]
+        self._name_keys = []  # casefolded names, ascending, for prefix lookups
+        self._dir_mtime = None
+        self._scanned = 0.0
+        self._lock = threading.Lock()
+        self.scans = 0
+
+    def refresh(self, force: bool = False):
+        try:
+            dir_mtime = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            dir_mtime = None
+        now = time.monotonic()
+        with self._lock:
+            if not force and dir_mtime == self._dir_mtime and now - self._scanned < self.refresh_seconds:
+                return
+            previous = self._entries
+
+        entries = {}
+        if dir_mtime is not None:
+            with os.scandir(self.directory) as scan:
+                for item in scan:
+                    if not item.is_file() or not self.include(item.name):
+                        continue
+                    stat = item.stat()
+                    old = previous.get(item.name)
+                    if old and old["mtime_ns"] == stat.st_mtime_ns and old["size_bytes"] == stat.st_size:
+                        entries[item.name] = old
+                    else:
+                        entries[item.name] = {
+                            "name": item.name,
+                            "mtime_ns": stat.st_mtime_ns,
+                            "size_bytes": stat.st_size,
+                            "format": os.path.splitext(item.name)[1].lstrip(".").upper(),
+                            "details": None,
+                        }
+
+        with self._lock:
+            if entries.keys() != previous.keys() or any(entries[n] is not previous[n] for n in entries):
+                self._orders = {}
+                self._name_keys = sorted(n.casefold() for n in entries)
+            self._entries = entries
+            self._dir_mtime = dir_mtime
+            self._scanned = now
+            self.scans += 1
+
+    def _order(self, sort, order):
+        names = self._orders.get((sort, order))
+        if names is None:
+            if sort == "name":
+                key = lambda n: n.casefold()
+            elif sort == "date":
+                key = lambda n: (self._entries[n]["mtime_ns"], n.casefold())
+            else:
+                key = lambda n: (self._entries[n]["size_bytes"], n.casefold())
+            names = sorted(self._entries, key=key, reverse=order == "desc")
+            self._orders[(sort, order)] = names
+        return names
+
+    def _details(self, entry):
+        path = os.path.join(self.directory, entry["name"])
+        details = {"pages": page_count(path)}
+        if self.count_variables is not None:
+            try:
+                details["variables"] = self.count_variables(path)
+            except Exception as e:
+                print(f"DEBUG: Catalog could not analyze {entry['name']}: {e}")
+                details["variables"] = None
+        return details
+
+    def _item(self, entry):
+        modified = datetime.fromtimestamp(entry["mtime_ns"] / 1e9)
+        item = {
+            "id": entry["name"],
+            "name": entry["name"],
+            "size": format_size(entry["size_bytes"]),
+            "size_bytes": entry["size_bytes"],
+            "date": modified.strftime("%b %d, %Y"),
+            "modified": modified.isoformat(timespec="seconds"),
+            "format": entry["format"],
+            "author": self.author,
+            "pages": None,
+        }
+        if self.count_variables is not None:
+            item["variables"] = None
+        item.update(entry["details"] or {})
+        return item
+
+    def page(self, offset: int = 0, limit: int = None, sort: str = "name", order: str = "asc", prefix: str = None):
+        """
+        Returns (total, items) for one page of the listing; total counts every
+        match of the prefix (case-insensitive), not just the returned items.
+
+        Raises:
+            ValueError: On an unknown sort key or order, or a negative offset/limit.
+        """
+        if sort not in SORT_KEYS or order not in ("asc", "desc"):
+            raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)} and order asc or desc")
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("offset and limit must not be negative")
+        self.refresh()
+        with self._lock:
+            names = self._order(sort, order)
+            if prefix:
+                folded = prefix.casefold()
+                if sort == "name":
+                    # Matching names are one contiguous run of the name order
+                    lo = bisect.bisect_left(self._name_keys, folded)
+                    hi = bisect.bisect_left(self._name_keys, folded + "\U0010ffff")
+                    names = names[lo:hi] if order == "asc" else names[len(names) - hi:len(names) - lo]
+                else:
+                    names = [n for n in names if n.casefold().startswith(folded)]
+            total = len(names)
+            selected = [self._entries[n] for n in names[offset:None if limit is None else offset + limit]]
+        return total, [self._item(entry) for entry in selected]
+
+    def warm(self, path: str = None):
+        """
+        Computes page/variable counts for one file of the folder, or for every
+        file still missing them when path is None. Returns how many were computed.
+        """
+        self.refresh()
+        with self._lock:
+            if path is None:
+                entries = [e for e in self._entries.values() if e["details"] is None]
+            else:
+                entry = self._entries.get(os.path.basename(path))
+                entries = [entry] if entry is not None and entry["details"] is None else []
+        for entry in entries:
+            entry["details"] = self._details(entry)
+        return len(entries)
+
+    def stats(self):
+        with self._lock:
+            return {"files": len(self._entries), "scans": self.scans}
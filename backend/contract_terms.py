@@ -0,0 +1,213 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    from backend.text_extraction import extract_text
+    from backend.llm_cache import cached_completion, is_json_object
+    from backend.prompt_budget import fit_context, count_tokens, EXTRACTION_CONTEXT_TOKENS, CHARS_PER_TOKEN
+except ImportError:
+    from text_extraction import extract_text
+    from llm_cache import cached_completion, is_json_object
+    from prompt_budget import fit_context, count_tokens, EXTRACTION_CONTEXT_TOKENS, CHARS_PER_TOKEN
+
+FALLBACK_TERMS = ["Contract Title", "Parties Involved", "Effective Date"]
+# Segment size for chunked mode, derived from the extraction token budget
+CONTEXT_CHARS = EXTRACTION_CONTEXT_TOKENS * CHARS_PER_TOKEN
+# Chunked mode: contracts longer than CONTEXT_CHARS are split into overlapping
+# segments that are extracted in parallel and merged
+SEGMENT_OVERLAP = int(os.getenv("CONTRACT_SEGMENT_OVERLAP", "800"))
+SEGMENT_CONCURRENCY = int(os.getenv("CONTRACT_SEGMENT_CONCURRENCY", "4"))
+NOT_FOUND = "Not found"
+
+
+def load_key_terms(kt_path, fallback=None):
+    """Loads the standard contract terms from key_terms.json."""
+    try:
+        with open(kt_path, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"DEBUG: Failed to load key_terms.json: {e}")
+        return list(fallback or [])
+
+
+def build_extraction_prompt(terms, content, part=None):
+    if part:
+        header = f"Contract content (part {part[0]} of {part[1]}; other parts are analyzed separately):"
+    else:
+        header = f"Contract content (first {EXTRACTION_CONTEXT_TOKENS} tokens):"
+    return (
+        "You are a specialized legal data extractor. "
+        f"Analyze the following contract and extract exactly these terms: {', '.join(terms)}.\n\n"
+        "Format your response as a valid JSON object where keys are the terms and values are the extracted snippets.\n"
+        f"If a term is not found, use '{NOT_FOUND}'.\n\n"
+        f"{header}\n{fit_context(content, EXTRACTION_CONTEXT_TOKENS)}"
+    )
+
+
+def split_segments(content, size=CONTEXT_CHARS, overlap=SEGMENT_OVERLAP, max_tokens=EXTRACTION_CONTEXT_TOKENS):
+    """
+    Splits content into segments of at most `size` characters and
+    `max_tokens` tokens, each starting `overlap` characters before the
+    previous one ended. Cuts are moved back to the nearest line break (or
+    space) so clauses are not split mid-word. Token-sized segments pass
+    through the prompt's context cut whole, so no segment loses its tail.
+    """
+    if len(content) <= size and count_tokens(content) <= max_tokens:
+        return [content]
+    segments = []
+    start = 0
+    while start < len(content):
+        end = min(start + size, len(content))
+        if end < len(content):
+            cut = content.rfind("\n", start + size // 2, end)
+            if cut <= start:
+                cut = content.rfind(" ", start + size // 2, end)
+            if cut > start:
+                end = cut
+        # Dense text can hold more tokens than `size` characters suggest
+        fitted = fit_context(content[start:end], max_tokens)
+        if 0 < len(fitted) < end - start:
+            end = start + len(fitted)
+        segments.append(content[start:end])
+        if end >= len(content):
+            break
+        start = max(end - min(overlap, (end - start) // 2), start + 1)
+    return segments
+
+
+def _is_found(value):
+    if value is None:
+        return False
+    text = str(value).strip()
+    return bool(text) and text.rstrip(".").lower() not in ("not found", "n/a", "none", "not specified")
+
+
+def _specificity(value):
+    # Concrete figures (dates, amounts, durations) beat generic wording, then more detail beats less
+    text = value if isinstance(value, str) else json.dumps(value)
+    return (bool(re.search(r"\d", text)), len(set(re.findall(r"\w+", text.lower()))))
+
+
+def merge_segment_terms(terms, segment_results):
+    """
+    Deterministically reduces per-segment extractions into one result.
+
+    For each term the most specific found value wins; ties go to the earliest
+    segment. Terms no segment found are reported as "Not found".
+    """
+    merged = {}
+    for term in terms:
+        best = None
+        for index, result in enumerate(segment_results):
+            value = result.get(term)
+            if value is None:
+                # Tolerate the model changing the key's case
+                value = next((v for k, v in result.items() if k.strip().lower() == term.strip().lower()), None)
+            if not _is_found(value):
+                continue
+            rank = (_specificity(value), -index)
+            if best is None or rank > best[0]:
+                best = (rank, value)
+        merged[term] = best[1] if best else NOT_FOUND
+    return merged
+
+
+async def _extract_segment(client, cache, terms, content, bypass, part=None):
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    result, cache_status = await cached_completion(
+        client,
+        cache,
+        bypass=bypass,
+        content_hash=content_hash,
+        validate=is_json_object,
+        model="grok-3",
+        messages=[{"role": "user", "content": build_extraction_prompt(terms, content, part=part)}],
+        response_format={"type": "json_object"}
+    )
+    try:
+        extracted = json.loads(result)
+    except ValueError:
+        extracted = None
+    if not isinstance(extracted, dict):
+        # One unusable reply must not fail the whole contract: its terms merge as not found
+        print(f"DEBUG: Ignoring non-object extraction reply{f' for part {part[0]}' if part else ''}")
+        extracted = {}
+    return extracted, cache_status
+
+
+async def extract_contract_terms(client, cache, contract_path, terms, bypass=False, chunked=True, semaphore=None):
+    """
+    Extracts the given terms from one contract.
+
+    With chunked=True, contracts longer than CONTEXT_CHARS are split into
+    overlapping segments that are extracted in parallel and merged, instead
+    of being truncated. Every upstream call holds `semaphore` (default: a new
+    one allowing SEGMENT_CONCURRENCY calls), so callers extracting several
+    contracts can bound their combined calls in flight.
+
+    Returns:
+        (terms_dict, cache_status) where cache_status is HIT, MISS or BYPASS.
+
+    Raises:
+        FileNotFoundError, UnsupportedFormatError: If the contract cannot be read.
+    """
+    content = await run_in_threadpool(extract_text, contract_path)
+    segments = split_segments(content) if chunked else [content]
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max(1, SEGMENT_CONCURRENCY))
+    if len(segments) == 1:
+        async with semaphore:
+            return await _extract_segment(client, cache, terms, content, bypass)
+
+    print(f"DEBUG: Extracting {os.path.basename(contract_path)} in {len(segments)} segments")
+
+    async def run_segment(index, segment):
+        async with semaphore:
+            return await _extract_segment(client, cache, terms, segment, bypass, part=(index + 1, len(segments)))
+
+    outcomes = await asyncio.gather(*(run_segment(i, seg) for i, seg in enumerate(segments)))
+    statuses = {status for _, status in outcomes}
+    cache_status = "HIT" if statuses == {"HIT"} else ("BYPASS" if bypass else "MISS")
+    return merge_segment_terms(terms, [result for result, _ in outcomes]), cache_status
+
+
+async def extract_many(client, cache, contract_paths, terms, concurrency=4, bypass=False, chunked=True):
+    """
+    Extracts terms for many contracts with at most `concurrency` upstream
+    calls in flight (segments included), yielding one result dict per
+    contract as it finishes.
+    """
+    calls = asyncio.Semaphore(max(1, concurrency))
+    # Contracts being read and extracted at once; bounds the texts held in memory
+    contracts = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(path):
+        start = time.time()
+        async with contracts:
+            try:
+                extracted, cache_status = await extract_contract_terms(
+                    client, cache, path, terms, bypass=bypass, chunked=chunked, semaphore=calls
+                )
+                result = {"status": "ok", "terms": extracted, "cache": cache_status}
+            except FileNotFoundError:
+                result = {"status": "error", "error": "Contract not found"}
+            except Exception as e:
+                print(f"DEBUG: Batch extraction failed for {path}: {e}")
+                result = {"status": "error", "error": str(e)}
+        result["filename"] = os.path.basename(path)
+        result["elapsed"] = round(time.time() - start, 3)
+        return result
+
+    tasks = [asyncio.ensure_future(run_one(path)) for path in contract_paths]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # Client went away mid-stream: stop paying for the remaining calls
+        for task in tasks:
+            task.cancel()
@@ -1,85 +1,82 @@
-import pandas as pd
-from pypdf import PdfReader
-from docx import Document
 import os
+import hashlib
 from pathlib import Path
 
+def file_digest(filepath, chunk_size=1024 * 1024):
+    """Returns the sha256 hex digest of a file's content."""
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _extract_text(filepath):
+    # Imported lazily: text_extraction depends on this module for file_digest
+    try:
+        from backend.text_extraction import extract_text
+    except ImportError:
+        from text_extraction import extract_text
+    return extract_text(filepath)
+
 def read_excel(filepath):
     try:
-        df = pd.read_excel(filepath)
-        return df.to_csv(index=False)
+        return _extract_text(filepath)
     except Exception as e:
         return f"Error reading Excel {filepath}: {str(e)}"
 
 def read_csv(filepath):
     try:
-        # Use sep=None and engine='python' for auto-detection of delimiter
-        # Also try to handle decimal commas if they exist
-        df = pd.read_csv(filepath, sep=None, engine='python')
-        return df.to_csv(index=False)
+        return _extract_text(filepath)
     except Exception as e:
         return f"Error reading CSV {filepath}: {str(e)}"
 
 def read_pdf(filepath):
     try:
-        reader = PdfReader(filepath)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        return _extract_text(filepath)
     except Exception as e:
         return f"Error reading PDF {filepath}: {str(e)}"
 
 def read_word(filepath):
     try:
-        doc = Document(filepath)
-        full_text = []
-        # Paragraphs
-        for para in doc.paragraphs:
-            if para.text.strip():
-                full_text.append(para.text)
-        # Tables
-        for table in doc.tables:
-            for row in table.rows:
-                row_text = [cell.text for cell in row.cells]
-                full_text.append(" | ".join(row_text))
-        
-        return "\n".join(full_text)
+        return _extract_text(filepath)
     except Exception as e:
         return f"Error reading Word {filepath}: {str(e)}"
 
 def read_text(filepath):
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return f.read()
+        return _extract_text(filepath)
     except Exception as e:
         return f"Error reading Text {filepath}: {str(e)}"
 
+READERS = {
+    'xlsx': read_excel,
+    'xls': read_excel,
+    'csv': read_csv,
+    'pdf': read_pdf,
+    'docx': read_word,
+    'doc': read_word,
+    'txt': read_text,
+}
+
+def read_file(filepath):
+    """Dispatches to the reader for the file's extension. Returns '' if unsupported."""
+    ext = filepath.split('.')[-1].lower()
+    reader = READERS.get(ext)
+    return reader(filepath) if reader else ""
+
 def get_knowledge_base_content(base_path):
-    """Recursively walks through base_path and extracts text."""
-    context_text = ""
-    
+    """
+    Returns the extracted text of every file under base_path.
+
+    Served from a persisted extraction index, so only files that are new or
+    changed since the last call are re-parsed.
+    """
+    try:
+        from backend.kb_index import get_kb_index
+    except ImportError:
+        from kb_index import get_kb_index
+
     if not os.path.exists(base_path):
         return "No knowledge base found."
 
-    for root, dirs, files in os.walk(base_path):
-        for file in files:
-            file_path = os.path.join(root, file)
-            ext = file.split('.')[-1].lower()
-            
-            content = ""
-            if ext in ['xlsx', 'xls']:
-                content = read_excel(file_path)
-            elif ext == 'csv':
-                content = read_csv(file_path)
-            elif ext == 'pdf':
-                content = read_pdf(file_path)
-            elif ext in ['docx', 'doc']:
-                content = read_word(file_path)
-            elif ext == 'txt':
-                content = read_text(file_path)
-            
-            if content:
-                context_text += f"\n--- File: {file} ---\n{content}\n"
-    
-    return context_text
+    return get_kb_index(base_path).get_content()
@@ -1,43 +1,155 @@
 import os
+import io
+import re
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from docxtpl import DocxTemplate
 
-def generate_document(template_filename: str, user_data: dict) -> str:
-    """
-    Generates a contract document from a template using user provided data.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
 
-    Args:
-        template_filename: The filename of the template in backend/templates/
-        user_data: A dictionary where keys match the jinja tags in the template (e.g., {{ v1 }})
+# Bounds for the per-process caches below
+TEMPLATE_CACHE_SIZE = int(os.getenv("TEMPLATE_CACHE_SIZE", "16"))
+COMPILED_PART_CACHE_SIZE = int(os.getenv("COMPILED_PART_CACHE_SIZE", "128"))
 
-    Returns:
-        The absolute path to the generated document.
-    """
-    # Define paths
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    template_path = os.path.join(base_dir, "templates", template_filename)
-    output_dir = os.path.join(base_dir, "output")
 
-    # Ensure output directory exists
-    os.makedirs(output_dir, exist_ok=True)
+class _LRU:
+    """Small thread-safe LRU used for template bytes and compiled template parts."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_template_bytes = _LRU(TEMPLATE_CACHE_SIZE)  # (path, mtime_ns, size) -> template file bytes
+_patched_xml = _LRU(COMPILED_PART_CACHE_SIZE)  # sha1(raw part xml) -> jinja-ready xml
+_compiled_parts = _LRU(COMPILED_PART_CACHE_SIZE)  # sha1(jinja-ready xml) -> jinja2.Template
 
-    # Verify template exists
-    if not os.path.exists(template_path):
-        raise FileNotFoundError(f"Template not found at {template_path}")
 
-    # Initialize template
-    doc = DocxTemplate(template_path)
+def _xml_key(xml):
+    return hashlib.sha1(xml.encode("utf-8")).hexdigest()
 
-    # Render document with user data
+
+def _template_class():
+    """Builds the caching DocxTemplate subclass (docxtpl/jinja2 are imported on first use)."""
+    from docxtpl import DocxTemplate
+    from jinja2 import Environment
+
+    class CompiledTemplateEnvironment(Environment):
+        # Compiling the document XML is the costliest part of a render; reuse
+        # the compiled template whenever a part's source is byte-identical.
+        def from_string(self, source, globals=None, template_class=None):
+            key = _xml_key(source)
+            template = _compiled_parts.get(key)
+            if template is None:
+                template = super().from_string(source, globals, template_class)
+                _compiled_parts.put(key, template)
+            return template
+
+    class CachedDocxTemplate(DocxTemplate):
+        def patch_xml(self, src_xml):
+            key = _xml_key(src_xml)
+            patched = _patched_xml.get(key)
+            if patched is None:
+                patched = super().patch_xml(src_xml)
+                _patched_xml.put(key, patched)
+            return patched
+
+        def map_tree(self, tree):
+            # docxtpl grafts the rendered body into the existing document, which
+            # makes lxml reconcile namespaces node by node (over a second for
+            # large forms). Splicing the XML text and parsing the document once
+            # produces the same tree far faster.
+            try:
+                new_root = _splice_body(self.docx._element, tree)
+            except Exception as e:
+                print(f"DEBUG: Fast body swap failed ({e}); using docxtpl map_tree")
+                return super().map_tree(tree)
+            from docx.document import Document
+
+            part = self.docx._part
+            part._element = new_root
+            self.docx = Document(new_root, part)
+            part.__dict__["document"] = self.docx  # refresh the part's cached lazyproperty
+
+    return CachedDocxTemplate, CompiledTemplateEnvironment
+
+
+def _splice_body(root, body):
+    """Returns a new document root whose w:body is `body`, parsed with python-docx's parser."""
+    from lxml import etree
+    from docx.oxml import parse_xml
+
+    root_xml = etree.tostring(root, encoding="unicode")
+    start = root_xml.index("<w:body")
+    end = root_xml.rindex("</w:body>") + len("</w:body>")
+    body_xml = etree.tostring(body, encoding="unicode")
+    if not body.attrib and set(body.nsmap.items()) <= set(root.nsmap.items()):
+        # The body only repeats the root's declarations; drop them so the output matches docxtpl's
+        body_xml = re.sub(r"^<w:body[^>]*>", "<w:body>", body_xml, count=1)
+    return parse_xml(root_xml[:start] + body_xml + root_xml[end:])
+
+
+_classes = None
+
+
+def _load_template(template_path):
+    """Returns a fresh template object backed by the cached bytes of the current template version."""
+    global _classes
+    if _classes is None:
+        _classes = _template_class()
+    template_cls, env_cls = _classes
+
+    stat = os.stat(template_path)
+    version = (template_path, stat.st_mtime_ns, stat.st_size)
+    data = _template_bytes.get(version)
+    if data is None:
+        with open(template_path, "rb") as f:
+            data = f.read()
+        _template_bytes.put(version, data)
+    # Rendering mutates the document, so every call gets its own instance
+    return template_cls(io.BytesIO(data)), env_cls()
+
+
+def template_path_for(template_filename: str) -> str:
+    return os.path.join(TEMPLATES_DIR, template_filename)
+
+
+def expand_context(user_data: dict) -> dict:
     # KEY EXPANSION: Handle Case Sensitivity and Naming Variations
     # If we have 'v25', also create 'V25', 'ref25', 'Ref25', 'question25'
     expanded_context = user_data.copy()
-    
+
     for key, value in user_data.items():
         # Only process keys that start with 'v' followed by a number (e.g., v1, v25)
         if key.lower().startswith('v') and key[1:].isdigit():
             number = key[1:] # extract '25'
-            
+
             # Create variations to catch template mismatches
             expanded_context[f"V{number}"] = value       # V25
             expanded_context[f"ref{number}"] = value     # ref25
@@ -45,24 +157,80 @@ def generate_document(template_filename: str, user_data: dict) -> str:
             expanded_context[f"REF{number}"] = value     # REF25
             expanded_context[f"q{number}"] = value       # q25
             expanded_context[f"Q{number}"] = value       # Q25
+    return expanded_context
+
+
+def render_document(template_filename: str, user_data: dict) -> bytes:
+    """
+    Renders a template with user provided data entirely in memory.
+
+    Args:
+        template_filename: The filename of the template in backend/templates/
+        user_data: A dictionary where keys match the jinja tags in the template (e.g., {{ v1 }})
+
+    Returns:
+        The generated .docx file as bytes.
+    """
+    return render_template_file(template_path_for(template_filename), user_data)
+
+
+def render_template_file(template_path: str, user_data: dict) -> bytes:
+    """Same as render_document, for a template given by full path."""
+    # Verify template exists
+    if not os.path.exists(template_path):
+        raise FileNotFoundError(f"Template not found at {template_path}")
+
+    doc, jinja_env = _load_template(template_path)
 
     # Render with the expanded context
-    doc.render(expanded_context)
+    doc.render(expand_context(user_data), jinja_env)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
 
-    # Generate unique filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+def output_filename_for(template_filename: str) -> str:
+    # Microseconds keep same-second generations from overwriting each other
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
     # Base name without extension (assuming .docx)
     clean_name = os.path.splitext(template_filename)[0]
-    output_filename = f"{clean_name}_Final_{timestamp}.docx"
-    output_path = os.path.join(output_dir, output_filename)
+    return f"{clean_name}_Final_{timestamp}.docx"
 
-    # Save the document
-    doc.save(output_path)
-    
-    print(f"Document generated successfully: {output_path}")
 
+def save_output(template_filename: str, data: bytes) -> str:
+    """Writes generated bytes to backend/output/ and returns the path."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    output_path = os.path.join(OUTPUT_DIR, output_filename_for(template_filename))
+    # 'xb' never clobbers an existing document
+    with open(output_path, "xb") as f:
+        f.write(data)
+    print(f"Document generated successfully: {output_path}")
     return output_path
 
+
+def generate_document(template_filename: str, user_data: dict) -> str:
+    """
+    Generates a contract document from a template using user provided data.
+
+    Args:
+        template_filename: The filename of the template in backend/templates/
+        user_data: A dictionary where keys match the jinja tags in the template (e.g., {{ v1 }})
+
+    Returns:
+        The absolute path to the generated document.
+    """
+    return save_output(template_filename, render_document(template_filename, user_data))
+
+
+def cache_stats():
+    return {
+        "templates": len(_template_bytes),
+        "patched_parts": len(_patched_xml),
+        "compiled_parts": len(_compiled_parts),
+    }
+
+
 if __name__ == "__main__":
     # Example usage for testing
     # Note: This requires a valid template to exist in backend/templates/
@@ -0,0 +1,162 @@
+import os
+import json
+import hashlib
+import threading
+
+try:
+    from backend.file_utils import read_file
+except ImportError:
+    from file_utils import read_file
+
+INDEX_VERSION = 2  # bump when extraction output changes, to force a rebuild
+DEFAULT_INDEX_ROOT = os.getenv(
+    "KB_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "kb_index"),
+)
+
+
+class KnowledgeBaseIndex:
+    """
+    On-disk extraction index for a knowledge base folder.
+
+    Holds one entry per file, keyed by relative path and validated against
+    mtime and size. refresh() re-parses only new or changed files; the
+    extracted text lives in one blob per file next to a JSON manifest, so a
+    restarted process does not have to re-parse anything either.
+    """
+
+    def __init__(self, base_path: str, index_dir: str):
+        self.base_path = os.path.abspath(base_path)
+        self.index_dir = index_dir
+        self.manifest_path = os.path.join(index_dir, "manifest.json")
+        self.texts_dir = os.path.join(index_dir, "texts")
+        self.entries = {}  # relpath -> {"name", "mtime_ns", "size", "blob"}
+        self.version = 0  # bumped whenever the set of entries changes
+        self._texts = {}  # relpath -> extracted text (lazy loaded from blobs)
+        self._content = None
+        self._lock = threading.RLock()
+        self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == INDEX_VERSION and manifest.get("base_path") == self.base_path:
+                self.entries = manifest.get("files", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _save_manifest(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "base_path": self.base_path, "files": self.entries}, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _scan(self):
+        """Yields (relpath, name, stat) for every file under base_path in a stable order."""
+        for root, dirs, files in os.walk(self.base_path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.startswith("~$"):
+                    continue
+                file_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                yield os.path.relpath(file_path, self.base_path), name, stat
+
+    def refresh(self) -> bool:
+        """Re-parses new or changed files and drops deleted ones. Returns True if anything changed."""
+        with self._lock:
+            seen = set()
+            changed = False
+            for relpath, name, stat in self._scan():
+                seen.add(relpath)
+                entry = self.entries.get(relpath)
+                if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    continue
+                self._index_file(relpath, name, stat)
+                changed = True
+
+            for relpath in [p for p in self.entries if p not in seen]:
+                self._drop(relpath)
+                changed = True
+
+            if changed:
+                self.version += 1
+                self._content = None
+                self._save_manifest()
+            return changed
+
+    def _index_file(self, relpath, name, stat):
+        print(f"DEBUG: Indexing knowledge base file: {relpath}")
+        text = read_file(os.path.join(self.base_path, relpath))
+        blob = hashlib.sha1(relpath.encode("utf-8")).hexdigest() + ".txt"
+        os.makedirs(self.texts_dir, exist_ok=True)
+        with open(os.path.join(self.texts_dir, blob), "w", encoding="utf-8") as f:
+            f.write(text)
+        self.entries[relpath] = {"name": name, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "blob": blob}
+        self._texts[relpath] = text
+
+    def _drop(self, relpath):
+        entry = self.entries.pop(relpath)
+        self._texts.pop(relpath, None)
+        try:
+            os.remove(os.path.join(self.texts_dir, entry["blob"]))
+        except OSError:
+            pass
+
+    def snapshot(self) -> dict:
+        """A consistent copy of the entries, safe to iterate while other threads refresh."""
+        with self._lock:
+            return dict(self.entries)
+
+    def get_text(self, relpath: str) -> str:
+        """Returns the cached extracted text for one entry ("" if it was dropped meanwhile)."""
+        with self._lock:
+            text = self._texts.get(relpath)
+            if text is None:
+                entry = self.entries.get(relpath)
+                if entry is None:
+                    return ""
+                try:
+                    with open(os.path.join(self.texts_dir, entry["blob"]), "r", encoding="utf-8") as f:
+                        text = f.read()
+                except OSError:
+                    # Blob went missing: re-extract from the source file
+                    text = read_file(os.path.join(self.base_path, relpath))
+                self._texts[relpath] = text
+            return text
+
+    def iter_context(self):
+        """Yields one formatted context segment per indexed file."""
+        for relpath in sorted(self.entries):
+            text = self.get_text(relpath)
+            if text:
+                yield f"\n--- File: {self.entries[relpath]['name']} ---\n{text}\n"
+
+    def get_content(self) -> str:
+        """Returns the assembled knowledge base context, rebuilding it only after a change."""
+        with self._lock:
+            self.refresh()
+            if self._content is None:
+                self._content = "".join(self.iter_context())
+            return self._content
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_kb_index(base_path: str) -> KnowledgeBaseIndex:
+    """Returns the process-wide index for base_path, creating it on first use."""
+    base_path = os.path.abspath(base_path)
+    with _indexes_lock:
+        index = _indexes.get(base_path)
+        if index is None:
+            key = hashlib.sha1(base_path.encode("utf-8")).hexdigest()[:12]
+            index = KnowledgeBaseIndex(base_path, os.path.join(DEFAULT_INDEX_ROOT, key))
+            _indexes[base_path] = index
+        return index
@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    from backend.metrics import stage_timer, record_usage, record_llm_call
+except ImportError:
+    from metrics import stage_timer, record_usage, record_llm_call
+
+# The SQLite tier drops expired and surplus rows once per this many writes instead of on every write
+LLM_CACHE_PRUNE_EVERY = int(os.getenv("LLM_CACHE_PRUNE_EVERY", "100"))
+
+
+def normalize_messages(messages):
+    """Keeps only role/content and normalizes line endings and trailing whitespace."""
+    normalized = []
+    for message in messages:
+        content = str(message.get("content", "")).replace("\r\n", "\n")
+        content = "\n".join(line.rstrip() for line in content.split("\n")).strip()
+        normalized.append({"role": message.get("role"), "content": content})
+    return normalized
+
+
+class LLMResponseCache:
+    """
+    Cache of completion texts for deterministic prompts.
+
+    A bounded in-memory LRU tier with per-entry TTL, optionally backed by a
+    SQLite file so entries survive restarts and are shared between workers.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 86400, db_path: str = None, max_db_rows: int = 10000,
+                 prune_every: int = LLM_CACHE_PRUNE_EVERY):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_db_rows = max_db_rows
+        self.prune_every = max(1, prune_every)
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+                )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with conn:  # commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(model, messages, temperature=None, content_hash=None, **params) -> str:
+        payload = {
+            "model": model,
+            "messages": normalize_messages(messages),
+            "temperature": temperature,
+            "content_hash": content_hash,
+            "params": params,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+        if self.db_path:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row and row[1] > now:
+                self._remember(key, row[0], row[1])
+                with self._lock:
+                    self.hits += 1
+                return row[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: str):
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                    (key, value, expires_at, time.time()),
+                )
+                with self._lock:
+                    self._writes += 1
+                    prune = self._writes % self.prune_every == 0
+                if prune:
+                    self._prune(conn)
+
+    def _prune(self, conn):
+        conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM llm_cache WHERE key NOT IN "
+            "(SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT ?)",
+            (self.max_db_rows,),
+        )
+
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM llm_cache")
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._memory),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "persistent": bool(self.db_path),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+async def cached_completion(client, cache, bypass=False, content_hash=None, validate=None, **params):
+    """
+    Returns (content, cache_status) for a chat completion, calling the
+    upstream API only on a miss. With bypass=True the cache is not read but
+    the fresh response still replaces the stored one. If validate is given,
+    only responses it accepts are stored.
+    """
+    key = cache.make_key(
+        params.get("model"),
+        params.get("messages", []),
+        temperature=params.get("temperature"),
+        content_hash=content_hash,
+        **{k: v for k, v in params.items() if k not in ("model", "messages", "temperature")},
+    )
+    # The SQLite tier blocks: keep it off the event loop
+    persistent = bool(getattr(cache, "db_path", None))
+    if not bypass:
+        content = await run_in_threadpool(cache.get, key) if persistent else cache.get(key)
+        if content is not None:
+            record_llm_call("HIT")
+            return content, "HIT"
+
+    status = "BYPASS" if bypass else "MISS"
+    record_llm_call(status)
+    with stage_timer("llm"):
+        completion = await client.chat.completions.create(**params)
+    record_usage(completion)
+    content = completion.choices[0].message.content
+    if validate is None or validate(content):
+        if persistent:
+            await run_in_threadpool(cache.set, key, content)
+        else:
+            cache.set(key, content)
+    return content, status
+
+
+def is_json_object(content: str) -> bool:
+    try:
+        return isinstance(json.loads(content), dict)
+    except (TypeError, ValueError):
+        return False
+
+
+def wants_bypass(cache_bypass_header: str = None, cache_control_header: str = None) -> bool:
+    """True if the request asked to skip the response cache."""
+    if cache_bypass_header and cache_bypass_header.strip().lower() in ("1", "true", "yes"):
+        return True
+    return bool(cache_control_header and "no-cache" in cache_control_header.lower())
+
+
+llm_cache = LLMResponseCache(
+    maxsize=int(os.getenv("LLM_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("LLM_CACHE_TTL", "86400")),
+    db_path=os.getenv("LLM_CACHE_DB") or None,
+)
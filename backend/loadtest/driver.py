@@ -0,0 +1,173 @@
+"""
+Concurrency sweeps against a running backend: throughput, latency percentiles and error rates per endpoint.
+
+Usage (from the repo root, with the app pointed at the stub upstream):
+    python -m backend.loadtest.stub_upstream --port 9100 &
+    XAI_BASE_URL=http://127.0.0.1:9100/v1 uvicorn backend.main:app --port 8000 &
+    python -m backend.loadtest.driver --concurrency 1,8,32 --duration 15 [--endpoints /chat,/generate] [--stream]
+
+Each (endpoint, concurrency) level runs that many closed-loop clients for
+--duration seconds. Caches are bypassed by default so every request does the
+full work; pass --use-cache to measure the cached paths instead.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import Counter
+
+ENDPOINTS = ["/chat", "/template-chat", "/contract-chat", "/contracts/extract", "/generate"]
+PROJECT_BRIEF = (
+    "Project brief: replace the municipal fleet telematics system. Budget GBP 450,000 over 36 months. "
+    "Go-live by 1 April, 99.5% availability, 4 hour RTO, monthly reporting to the fleet manager."
+)
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of an unsorted list (q in 0..100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(endpoint, concurrency, samples, elapsed, exceptions=None):
+    """samples: [(seconds, ok)] for one level; exceptions: client-side failures counted by exception type."""
+    latencies = [seconds for seconds, _ in samples]
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "throughput": len(samples) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "exceptions": dict(exceptions or {}),
+    }
+
+
+def build_request(endpoint, n, template, contract, stream, use_cache):
+    """Returns (path, json body, headers) for the n-th request to an endpoint."""
+    headers = {} if use_cache else {"X-Cache-Bypass": "1"}
+    if endpoint == "/chat":
+        return endpoint, {"message": f"What are the payment terms? ({n})", "stream": stream}, headers
+    if endpoint == "/template-chat":
+        return endpoint, {"message": PROJECT_BRIEF, "filename": template, "stream": stream}, headers
+    if endpoint == "/contract-chat":
+        return endpoint, {"message": "Summarise the key terms.", "filename": contract, "stream": stream}, headers
+    if endpoint == "/contracts/extract":
+        return endpoint, {"filename": contract}, headers
+    if endpoint == "/generate":
+        # Distinct answers per request, so the output store cannot serve them either
+        answers = {f"v{i}": f"Load test answer {n}-{i}" for i in range(1, 21)}
+        return endpoint, {"filename": template, "answers": answers, "save_to_disk": False}, headers
+    raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+def response_ok(response, body):
+    """Chat endpoints report upstream failures as 200 {"response": "Error: ..."}; streams as error events."""
+    if response.status_code >= 400:
+        return False
+    content_type = response.headers.get("content-type", "")
+    if content_type.startswith("text/event-stream"):
+        return "event: error" not in body
+    if content_type.startswith("application/json"):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return False
+        return not (isinstance(data, dict) and str(data.get("response", "")).startswith("Error:"))
+    return True
+
+
+async def run_level(client, endpoint, concurrency, duration, template, contract, stream, use_cache):
+    samples = []
+    exceptions = Counter()
+    counter = iter(range(10 ** 9))
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            path, body, headers = build_request(endpoint, next(counter), template, contract, stream, use_cache)
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json=body, headers=headers)
+                ok = response_ok(response, response.text)
+            except Exception as e:
+                # Counted, not printed: a failing level would otherwise flood the report
+                exceptions[type(e).__name__] += 1
+                ok = False
+            samples.append((time.perf_counter() - start, ok))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(endpoint, concurrency, samples, time.perf_counter() - start, exceptions)
+
+
+async def sweep(base_url, endpoints, levels, duration, stream=False, use_cache=False, timeout=120.0):
+    try:
+        import httpx2 as httpx
+    except ImportError:
+        import httpx
+
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        templates = (await client.get("/templates")).json()
+        contracts = (await client.get("/contracts")).json()
+        template = templates[0]["id"] if templates else None
+        contract = contracts[0]["id"] if contracts else None
+        print(f"Template: {template}  Contract: {contract}")
+
+        results = []
+        for endpoint in endpoints:
+            for concurrency in levels:
+                result = await run_level(client, endpoint, concurrency, duration, template, contract, stream, use_cache)
+                results.append(result)
+                print(format_row(result))
+        return results
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:>8.0f}ms" if seconds is not None else f"{'-':>10}"
+
+
+def format_row(r):
+    return (
+        f"{r['endpoint']:<20} {r['concurrency']:>5} {r['requests']:>7} {r['throughput']:>8.1f}/s "
+        f"{_ms(r['p50'])} {_ms(r['p95'])} {_ms(r['p99'])} {r['error_rate'] * 100:>6.1f}%  "
+        + ", ".join(f"{name} x{count}" for name, count in sorted(r.get("exceptions", {}).items()))
+    ).rstrip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Comma-separated endpoints to load")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated client counts (default 1,4,16)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per level (default 10)")
+    parser.add_argument("--stream", action="store_true", help="Use SSE responses on the chat endpoints")
+    parser.add_argument("--use-cache", action="store_true", help="Do not send X-Cache-Bypass")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = [e for e in endpoints if e not in ENDPOINTS]
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(unknown)} (choose from {', '.join(ENDPOINTS)})")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    print(f"{'endpoint':<20} {'conc':>5} {'reqs':>7} {'throughput':>10} {'p50':>10} {'p95':>10} {'p99':>10} {'errors':>7}  exceptions")
+    results = asyncio.run(sweep(args.base_url, endpoints, levels, args.duration, args.stream, args.use_cache))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
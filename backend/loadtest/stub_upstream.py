@@ -0,0 +1,145 @@
+"""
+Local stand-in for the grok-3 API: an OpenAI-compatible /v1/chat/completions
+with configurable latency, streaming and JSON-mode replies, so load tests do
+not spend real quota.
+
+Usage (from the repo root):
+    python -m backend.loadtest.stub_upstream --port 9100 --latency 0.8 --tokens-per-second 60
+    XAI_BASE_URL=http://127.0.0.1:9100/v1 uvicorn backend.main:app --port 8000
+
+Latency is the time to the first token; the rest of the reply follows at
+--tokens-per-second (streamed) or is waited for before responding (not streamed).
+"""
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+REPLY_TEXT = (
+    "Based on the provided context, the supplier must deliver the services within the agreed service levels. "
+    "Payment is due within thirty days of a valid invoice, and either party may terminate with ninety days "
+    "written notice. Liability is capped at the annual contract value except for data protection breaches."
+)
+CHARS_PER_TOKEN = 4
+
+
+def json_reply():
+    """One object that satisfies every JSON-mode caller: chat, template extraction, term extraction and planning."""
+    return {
+        "response": REPLY_TEXT,
+        "extracted_data": {"v1": "Stub answer"},
+        "query": None,
+        "Payment Terms": "30 days from invoice",
+        "Termination": "90 days written notice",
+    }
+
+
+def split_tokens(text):
+    """Cuts the reply into ~token-sized pieces for streaming."""
+    return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+
+
+def create_app(latency=0.5, jitter=0.0, tokens_per_second=50.0, error_rate=0.0, seed=None):
+    app = FastAPI(title="Stub upstream")
+    rng = random.Random(seed)
+    app.state.requests = 0
+
+    def first_token_delay():
+        return max(0.0, latency + rng.uniform(-jitter, jitter))
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        if error_rate and rng.random() < error_rate:
+            await asyncio.sleep(first_token_delay())
+            return JSONResponse(
+                {"error": {"message": "Stub upstream error", "type": "server_error"}}, status_code=500
+            )
+
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        content = json.dumps(json_reply()) if json_mode else REPLY_TEXT
+        pieces = split_tokens(content)
+        usage = {
+            "prompt_tokens": sum(len(str(m.get("content") or "")) for m in body.get("messages", [])) // CHARS_PER_TOKEN + 1,
+            "completion_tokens": len(pieces),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = body.get("model", "grok-3")
+        token_delay = 1.0 / tokens_per_second if tokens_per_second > 0 else 0.0
+
+        if body.get("stream"):
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+            def chunk(delta, finish_reason=None, chunk_usage=None):
+                data = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [] if chunk_usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }
+                if chunk_usage:
+                    data["usage"] = chunk_usage
+                return f"data: {json.dumps(data)}\n\n"
+
+            async def events():
+                await asyncio.sleep(first_token_delay())
+                yield chunk({"role": "assistant", "content": ""})
+                for piece in pieces:
+                    yield chunk({"content": piece})
+                    if token_delay:
+                        await asyncio.sleep(token_delay)
+                yield chunk({}, finish_reason="stop")
+                if include_usage:
+                    yield chunk({}, chunk_usage=usage)
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(first_token_delay() + token_delay * len(pieces))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }
+
+    @app.get("/stats")
+    def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds to the first token (default 0.5)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- seconds added to the latency")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Generation speed (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--seed", type=int, help="Random seed for jitter and errors")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    app = create_app(args.latency, args.jitter, args.tokens_per_second, args.error_rate, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,51 +12,137 @@ except ImportError:
     print("Warning: python-dotenv not found. Assuming environment variables are set by the platform.")
 
 # DEBUG: Print environment info
-# DEBUG: Print environment info
-import os
 print(f"DEBUG: Starting Backend...")
 print(f"DEBUG: Current Directory: {os.getcwd()}")
 print(f"DEBUG: PORT env var: {os.environ.get('PORT', 'Not Set')}")
 print(f"DEBUG: XAI_API_KEY present: {'Yes' if os.environ.get('XAI_API_KEY') else 'No'}")
 
-# DEBUG: List static files
+# The static folder is loaded once, in the lifespan hook (see static_assets), not at import time
 static_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
-print(f"DEBUG: Checking static path: {static_path}")
-if os.path.exists(static_path):
-    print(f"DEBUG: Static folder contents: {os.listdir(static_path)}")
-    assets_path = os.path.join(static_path, "assets")
-    if os.path.exists(assets_path):
-        print(f"DEBUG: Assets folder contents: {os.listdir(assets_path)}")
-    else:
-        print("DEBUG: Assets folder NOT found inside static!")
-else:
-    print("DEBUG: Static folder NOT found!")
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
-from openai import OpenAI
+from fastapi.concurrency import run_in_threadpool
 # IMPORTS (Hybrid Strategy for Local vs Production)
 try:
     # Local Development (Repo Root is path)
-    from backend.analyzer import analyze_document
-    from backend.generator import generate_document
+    from backend.analysis_cache import analysis_cache
+    from backend.generator import render_document, template_path_for, save_output, output_filename_for, DOCX_MEDIA_TYPE
     from backend.file_utils import get_knowledge_base_content
+    from backend.retrieval import get_retriever, format_passages, cited_sources
+    from backend.streaming import completion_events, sse_event
+    from backend.text_extraction import extract_text, extract_text_prefix, extraction_cache, is_supported, UnsupportedFormatError
+    from backend.llm_cache import llm_cache, cached_completion, wants_bypass, is_json_object
+    from backend.contract_terms import load_key_terms, extract_contract_terms as extract_terms, extract_many, FALLBACK_TERMS
+    from backend.output_store import output_store
+    from backend.sheet_cache import sheet_cache
+    from backend.pdf_text import pdf_text_cache
+    from backend.sessions import session_store
+    from backend.static_assets import StaticAssets
+    from backend.catalog import Catalog
+    from backend.prewarm import Prewarmer, PREWARM_ENABLED
+    from backend.metrics import (
+        registry, stage_timer, observe_stage, record_usage, record_llm_call, stream_usage_options,
+        MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    )
+    from backend.prompt_budget import (
+        build_messages, fit_context, fit_items, context_allowance,
+        CONTRACT_CONTEXT_TOKENS, POLICY_CONTEXT_TOKENS, TEMPLATE_CONTEXT_TOKENS, CHARS_PER_TOKEN,
+    )
+    from backend.sheet_query import describe_sheets, build_planner_prompt, validate_query, run_query, format_result, QueryError
+    from backend.bulk_generate import stream_bulk_zip, get_pool, shutdown_pool, BULK_GENERATE_MAX_ITEMS
 except ImportError:
     # Production / Railway (Backend folder indicates root context)
     try:
-        from analyzer import analyze_document
-        from generator import generate_document
+        from analysis_cache import analysis_cache
+        from generator import render_document, template_path_for, save_output, output_filename_for, DOCX_MEDIA_TYPE
         from file_utils import get_knowledge_base_content
+        from retrieval import get_retriever, format_passages, cited_sources
+        from streaming import completion_events, sse_event
+        from text_extraction import extract_text, extract_text_prefix, extraction_cache, is_supported, UnsupportedFormatError
+        from llm_cache import llm_cache, cached_completion, wants_bypass, is_json_object
+        from contract_terms import load_key_terms, extract_contract_terms as extract_terms, extract_many, FALLBACK_TERMS
+        from output_store import output_store
+        from sheet_cache import sheet_cache
+        from pdf_text import pdf_text_cache
+        from sessions import session_store
+        from static_assets import StaticAssets
+        from catalog import Catalog
+        from prewarm import Prewarmer, PREWARM_ENABLED
+        from metrics import (
+            registry, stage_timer, observe_stage, record_usage, record_llm_call, stream_usage_options,
+            MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE,
+        )
+        from prompt_budget import (
+            build_messages, fit_context, fit_items, context_allowance,
+            CONTRACT_CONTEXT_TOKENS, POLICY_CONTEXT_TOKENS, TEMPLATE_CONTEXT_TOKENS, CHARS_PER_TOKEN,
+        )
+        from sheet_query import describe_sheets, build_planner_prompt, validate_query, run_query, format_result, QueryError
+        from bulk_generate import stream_bulk_zip, get_pool, shutdown_pool, BULK_GENERATE_MAX_ITEMS
     except ImportError as e:
         print(f"CRITICAL IMPORT ERROR: {e}")
         # Re-raise to crash logs so we can debug
         raise e
 
-app = FastAPI()
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+async def sweep_outputs_periodically():
+    while True:
+        try:
+            await run_in_threadpool(output_store.sweep)
+        except Exception as e:
+            print(f"DEBUG: Output sweep failed: {e}")
+        try:
+            # Expired sessions are also dropped lazily on access; this frees the idle ones nobody returns to
+            await run_in_threadpool(session_store.evict_idle)
+        except Exception as e:
+            print(f"DEBUG: Session eviction failed: {e}")
+        await asyncio.sleep(output_store.sweep_interval)
+
+# Import format libraries and the API client right after startup instead of on the first request that needs them
+STARTUP_PRELOAD = os.getenv("STARTUP_PRELOAD", "0").lower() in ("1", "true", "yes")
+PRELOAD_MODULES = ("pandas", "openpyxl", "pypdf", "docx", "docxtpl")
+
+# Frontend build served from memory with ETags and precompressed variants
+static_assets = StaticAssets(static_path)
+
+def preload_libraries():
+    import importlib
+
+    start = time.perf_counter()
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"DEBUG: Preload skipped {name}: {e}")
+    client.chat  # creates the AsyncOpenAI client
+    print(f"DEBUG: Preloaded format libraries in {time.perf_counter() - start:.2f}s")
+
+@asynccontextmanager
+async def lifespan(app):
+    if not await run_in_threadpool(static_assets.load):
+        print(f"DEBUG: Static folder NOT found or empty: {static_path}")
+    # Enforce the generated-document retention limits even when nothing is being generated
+    sweeper = asyncio.create_task(sweep_outputs_periodically())
+    preload = asyncio.create_task(run_in_threadpool(preload_libraries)) if STARTUP_PRELOAD else None
+    if PREWARM_ENABLED:
+        prewarmer.start()
+    yield
+    prewarmer.stop()
+    if preload is not None:
+        preload.cancel()
+    sweeper.cancel()
+    # Worker pools are created on first use; stop them with the app
+    shutdown_pool()
+    pdf_text_cache.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -70,26 +156,202 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Per-route request counts and latencies; also labels the stage timers below with the route
+app.add_middleware(MetricsMiddleware, routes_from=app.router)
+registry.register_collector(lambda: {
+    "analysis": analysis_cache.stats(),
+    "extraction": extraction_cache.stats(),
+    "llm": llm_cache.stats(),
+    "output_store": output_store.stats(),
+    "sheets": sheet_cache.stats(),
+    "pdf_pages": pdf_text_cache.stats(),
+    "sessions": session_store.stats(),
+    "prewarm": prewarmer.stats(),
+    "catalog_templates": template_catalog.stats(),
+    "catalog_contracts": contract_catalog.stats(),
+    "catalog_policies": policy_catalog.stats(),
+})
 
 XAI_API_KEY = os.getenv("XAI_API_KEY")
-client = OpenAI(api_key=XAI_API_KEY or "dummy_key", base_url="https://api.x.ai/v1")
+# Point at another OpenAI-compatible server, e.g. backend/loadtest/stub_upstream.py for load tests
+XAI_BASE_URL = os.getenv("XAI_BASE_URL", "https://api.x.ai/v1")
+
+class LazyClient:
+    """
+    Creates the client on first attribute access: importing openai is about
+    half of this module's import time, and many requests never call the API.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return getattr(self._client, name)
+
+def create_client():
+    from openai import AsyncOpenAI
+
+    # Async client: an in-flight completion no longer pins a worker thread for its whole duration
+    return AsyncOpenAI(api_key=XAI_API_KEY or "dummy_key", base_url=XAI_BASE_URL)
+
+client = LazyClient(create_client)
+
+# Keep a copy of every /generate result in backend/output (off by default: documents are streamed from memory)
+GENERATE_SAVE_OUTPUT = os.getenv("GENERATE_SAVE_OUTPUT", "0").lower() in ("1", "true", "yes")
+
+# Concurrent upstream calls for /contracts/extract-batch: the default, and the most a request may ask for
+CONTRACT_BATCH_CONCURRENCY = int(os.getenv("CONTRACT_BATCH_CONCURRENCY", "4"))
+CONTRACT_BATCH_MAX_CONCURRENCY = int(os.getenv("CONTRACT_BATCH_MAX_CONCURRENCY", str(CONTRACT_BATCH_CONCURRENCY)))
+
+# Retrieval settings for /chat: how many KB passages, and how many tokens of them, go into the prompt
+KB_TOP_K = int(os.getenv("KB_TOP_K", "8"))
+KB_CONTEXT_TOKENS = int(os.getenv("KB_CONTEXT_TOKENS", "3000"))
 
 class ChatRequest(BaseModel): 
     message: str
     filename: Optional[str] = None
     history: Optional[List[Dict[str, str]]] = []
+    stream: Optional[bool] = False  # Opt-in Server-Sent Events response
+    mode: Optional[str] = None  # /chat only: "data" computes spreadsheet answers locally
+    session_id: Optional[str] = None  # Server-held history and context; history can then be omitted
 class AnalyzeRequest(BaseModel): filename: str
-class GenerateRequest(BaseModel): filename: str; answers: Dict[str, str]
+class GenerateRequest(BaseModel):
+    filename: str
+    answers: Dict[str, str]
+    save_to_disk: Optional[bool] = None  # None = GENERATE_SAVE_OUTPUT setting
+class BulkGenerateRequest(BaseModel):
+    filename: str
+    items: List[Dict[str, str]]  # One answer set per document
+    names: Optional[List[str]] = None  # Optional file name per item inside the ZIP
 class DraftRequest(BaseModel): field_label: str; user_notes: str; context_files: Optional[str] = ""
+class ExtractRequest(BaseModel):
+    filename: str
+    chunked: Optional[bool] = True  # Map-reduce over segments instead of truncating long contracts
+class BatchExtractRequest(BaseModel):
+    filenames: Optional[List[str]] = None  # None = every contract in backend/Contracts
+    concurrency: Optional[int] = None
+    chunked: Optional[bool] = True
+
+KEY_TERMS_PATH = os.path.join(current_dir, "key_terms.json")
+
+def content_disposition(filename):
+    """Attachment header that survives non-ASCII template names."""
+    from urllib.parse import quote
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+def stream_chat_response(messages, json_field=None, done_payload=None, on_done=None, **kwargs):
+    """Streams a grok-3 completion to the client as Server-Sent Events."""
+    async def metered(stream, start):
+        # The llm stage of a streamed answer lasts until its last chunk
+        try:
+            async for chunk in stream:
+                record_usage(chunk)
+                yield chunk
+        finally:
+            observe_stage("llm", time.perf_counter() - start)
+
+    async def events():
+        start = time.perf_counter()
+        try:
+            stream = await client.chat.completions.create(
+                model="grok-3", messages=messages, stream=True, **stream_usage_options(), **kwargs
+            )
+        except Exception as e:
+            print(f"DEBUG: AI API failed: {e}")
+            record_llm_call("ERROR")
+            yield sse_event({"error": str(e)}, event="error")
+            return
+        record_llm_call("UNCACHED")
+        stream = metered(stream, start)
+        async for event in completion_events(stream, json_field=json_field, done_payload=done_payload, on_done=on_done):
+            yield event
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # --- ENDPOINTS ---
 
+async def start_session(request: ChatRequest):
+    """Returns (session, history): history sent by the client replaces the stored one, else the server's is used."""
+    if session_store.backend is not None:
+        # SESSION_DB: the lookup may read SQLite
+        session = await run_in_threadpool(session_store.resolve, request.session_id)
+    else:
+        session = session_store.resolve(request.session_id)
+    if request.history:
+        session.use_history(request.history)
+    return session, session.history
+
+async def finish_turn(session, request: ChatRequest, response_text):
+    session.add_turn(request.message, response_text)
+    if session_store.backend is not None:
+        await run_in_threadpool(session_store.save, session)
+    else:
+        session_store.save(session)
+
+def template_variable_lines(path):
+    return [f"{v['id']}: {v['context']}" for v in analysis_cache.get(path)]
+
+async def upstream_completion(**kwargs):
+    """Uncached grok-3 completion, timed as the llm stage with its token usage recorded."""
+    with stage_timer("llm"):
+        try:
+            completion = await client.chat.completions.create(model="grok-3", **kwargs)
+        except Exception:
+            record_llm_call("ERROR")
+            raise
+    record_llm_call("UNCACHED")
+    record_usage(completion)
+    return completion
+
+async def session_context(session, key, path, load):
+    """Returns a resolved document context held in the session, reloading it when the file changes."""
+    stat = os.stat(path)
+    fingerprint = [os.path.basename(path), stat.st_mtime_ns, stat.st_size]
+    value = session.get_context(key, fingerprint)
+    if value is None:
+        value = await run_in_threadpool(load, path)
+        session.set_context(key, fingerprint, value)
+    return value
+
 @app.post("/template-chat")
-def template_consultant_chat(request: ChatRequest):
-    import time
-    request_start = time.time()
+async def template_consultant_chat(request: ChatRequest):
     print(f"DEBUG: Endpoint /template-chat hit with message: {request.message[:50]}...")
+    session, history = await start_session(request)
     
+    def system_instruction_for(analysis_context):
+        return (
+            f"You are an Intelligent Document Analyst. Context: {analysis_context}. "
+            "Your Execution Logic:\n"
+            "1. Analyze Context: Read the list of variables/questions provided in the context.\n"
+            "2. Scan Input: Review the user's provided project brief or text.\n"
+            "3. Cross-Reference: For EACH variable, check if the user's text answers it. "
+            "Recognize that a single source section often answers multiple variables. Map data to ALL matching variables.\n"
+            "4. Extract: If YES, extract content into 'extracted_data' JSON key. "
+            "**High Fidelity Rules**:\n"
+            "   - Verbatim Retention: Do NOT summarize list items. If the source text contains bullet points, extract the entire list. Retain the richness.\n"
+            "   - Detail Preservation: If text mentions specific metrics (e.g., '4 hours RTO'), ensure these are explicitly preserved. Do not generalize.\n"
+            "5. Report: In the 'response' key, output a strict Status Report. Do NOT be conversational.\n\n"
+            "Response Format (Strictly Enforce This):\n"
+            "1. MAPPED VARIABLES:\n"
+            "   [Variable Name]: [Snippet of extracted text]\n...\n"
+            "2. GAP ANALYSIS (MISSING):\n"
+            "   [Variable Name]: [Brief description of what is needed]\n...\n\n"
+            "IMPORTANT: Output valid JSON with exactly two keys: 'response' and 'extracted_data'."
+        )
+
     # This is the endpoint that was missing
     analysis_context = "No template selected."
     if request.filename:
@@ -99,209 +361,321 @@ def template_consultant_chat(request: ChatRequest):
             file_path = os.path.join(current_dir, "templates", request.filename)
             if os.path.exists(file_path):
                 print(f"DEBUG: File found at {file_path}. Starting analysis...")
-                res = analyze_document(file_path)
-                print(f"DEBUG: Analysis complete. Result size: {len(str(res))}")
-                analysis_context = f"Variables found: {str(res)}"
+                # Resolved once per session and template version
+                with stage_timer("analysis"):
+                    variable_lines = await session_context(session, "template", file_path, template_variable_lines)
+                print(f"DEBUG: Analysis complete. Variables: {len(variable_lines)}")
+                with stage_timer("prompt"):
+                    allowance = context_allowance(
+                        TEMPLATE_CONTEXT_TOKENS, system_instruction_for(""), request.message, history=history
+                    )
+                    # One line per variable; long row contexts are shortened so every variable still fits,
+                    # or when even that is too much, the last variables are left out and counted
+                    lines = fit_items(
+                        variable_lines, max(allowance - len(variable_lines), 0),
+                        omitted="({n} more variables not shown)",
+                    )
+                analysis_context = "Variables found:\n" + "\n".join(lines)
             else:
                 print(f"DEBUG: File NOT found at {file_path}")
         except Exception as e:
             print(f"DEBUG: Analysis failed: {e}")
             pass
 
-    system_instruction = (
-        f"You are an Intelligent Document Analyst. Context: {analysis_context}. "
-        "Your Execution Logic:\n"
-        "1. Analyze Context: Read the list of variables/questions provided in the context.\n"
-        "2. Scan Input: Review the user's provided project brief or text.\n"
-        "3. Cross-Reference: For EACH variable, check if the user's text answers it. "
-        "Recognize that a single source section often answers multiple variables. Map data to ALL matching variables.\n"
-        "4. Extract: If YES, extract content into 'extracted_data' JSON key. "
-        "**High Fidelity Rules**:\n"
-        "   - Verbatim Retention: Do NOT summarize list items. If the source text contains bullet points, extract the entire list. Retain the richness.\n"
-        "   - Detail Preservation: If text mentions specific metrics (e.g., '4 hours RTO'), ensure these are explicitly preserved. Do not generalize.\n"
-        "5. Report: In the 'response' key, output a strict Status Report. Do NOT be conversational.\n\n"
-        "Response Format (Strictly Enforce This):\n"
-        "1. MAPPED VARIABLES:\n"
-        "   [Variable Name]: [Snippet of extracted text]\n...\n"
-        "2. GAP ANALYSIS (MISSING):\n"
-        "   [Variable Name]: [Brief description of what is needed]\n...\n\n"
-        "IMPORTANT: Output valid JSON with exactly two keys: 'response' and 'extracted_data'."
-    )
-    messages = [{"role": "system", "content": system_instruction}]
-    if request.history: messages.extend(request.history)
-    messages.append({"role": "user", "content": request.message})
+    with stage_timer("prompt"):
+        system_instruction = system_instruction_for(analysis_context)
+        messages = build_messages(system_instruction, request.message, history)
+
+    if request.stream:
+        return stream_chat_response(
+            messages, json_field="response", done_payload={"session_id": session.id},
+            on_done=lambda text: finish_turn(session, request, text),
+            temperature=0.7, response_format={"type": "json_object"}
+        )
 
     try:
         print("DEBUG: Sending request to AI API (grok-3)...")
-        api_start = time.time()
-        completion = client.chat.completions.create(
-            model="grok-3", 
+        completion = await upstream_completion(
             messages=messages,
             temperature=0.7,
             response_format={"type": "json_object"}
         )
-        api_duration = time.time() - api_start
-        print(f"DEBUG: AI API response received in {api_duration:.2f}s")
         import json
-        result = json.loads(completion.choices[0].message.content)
-        total_duration = time.time() - request_start
-        print(f"DEBUG: Total /template-chat duration: {total_duration:.2f}s")
+        with stage_timer("serialize"):
+            result = json.loads(completion.choices[0].message.content)
+            await finish_turn(session, request, result.get("response", ""))
+            result["session_id"] = session.id
         return result
     except Exception as e:
         print(f"DEBUG: AI API failed: {e}")
-        return {"response": f"Error: {str(e)}", "extracted_data": {}}
+        return {"response": f"Error: {str(e)}", "extracted_data": {}, "session_id": session.id}
+
+# Documents dropped into these folders are parsed in the background before anyone opens them
+PREWARM_KEY_TERMS = os.getenv("PREWARM_KEY_TERMS", "0").lower() in ("1", "true", "yes")
+prewarmer = Prewarmer(client_factory=create_client)
+
+def prewarm_template(path):
+    analysis_cache.get(path)
+    template_catalog.warm(path)
+
+def prewarm_contract(path):
+    # Page counts for the listing first: they are cheap and the sidebar shows them
+    contract_catalog.warm(path)
+    if not is_supported(path):
+        return
+    extract_text(path)
+    if PREWARM_KEY_TERMS:
+        # Fills the LLM cache that /contracts/extract reads (an upstream call per new contract)
+        terms = load_key_terms(KEY_TERMS_PATH, FALLBACK_TERMS)
+        prewarmer.run_async(lambda worker_client: extract_terms(worker_client, llm_cache, path, terms))
+
+def prewarm_knowledge_base(kb_path):
+    # Extracts changed files into the KB index and loads spreadsheets into the sheet cache
+    get_retriever(kb_path).refresh()
+    describe_sheets(kb_path)
+    policy_catalog.warm()
+
+prewarmer.watch(
+    "template", os.path.join(current_dir, "templates"), prewarm_template,
+    include=lambda path: path.endswith(".docx") and not os.path.basename(path).startswith("~$"),
+)
+prewarmer.watch("contract", os.path.join(current_dir, "Contracts"), prewarm_contract)
+prewarmer.watch(
+    "knowledge_base", os.path.join(current_dir, "knowledge_base"), prewarm_knowledge_base,
+    recursive=True, per_file=False,
+)
+
+# Listings are served from per-folder indexes refreshed by mtime (see catalog.py)
+template_catalog = Catalog(
+    os.path.join(current_dir, "templates"),
+    include=lambda f: f.endswith(".docx") and not f.startswith("~$"),
+    count_variables=lambda path: len(analysis_cache.get(path)),
+)
+contract_catalog = Catalog(os.path.join(current_dir, "Contracts"))
+policy_catalog = Catalog(os.path.join(current_dir, "knowledge_base", "policies"), author="Policy")
+
+def list_catalog(catalog, response, offset, limit, sort, order, prefix):
+    # The body stays a plain list (the frontend fetches without parameters); the match count goes in a header
+    try:
+        total, items = catalog.page(offset=offset, limit=limit, sort=sort, order=order, prefix=prefix)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers["X-Total-Count"] = str(total)
+    return items
 
 @app.get("/templates")
-def get_templates():
-    # FIX: Use relative path from main.py
-    templates_dir = os.path.join(current_dir, "templates")
-    if not os.path.exists(templates_dir): return []
-    return [{"id": f, "name": f, "size": "Unknown", "author": "System"} for f in os.listdir(templates_dir) if f.endswith(".docx") and not f.startswith("~$")]
+def get_templates(response: Response, offset: int = 0, limit: Optional[int] = None, sort: str = "name",
+                  order: str = "asc", prefix: Optional[str] = None):
+    return list_catalog(template_catalog, response, offset, limit, sort, order, prefix)
 
 @app.get("/contracts")
-def get_contracts():
-    # FIX: Use relative path from main.py
-    contracts_dir = os.path.join(current_dir, "Contracts")
-    if not os.path.exists(contracts_dir): return []
-    return [{"id": f, "name": f, "size": "Unknown", "author": "System"} for f in os.listdir(contracts_dir) if not f.startswith("~$")]
+def get_contracts(response: Response, offset: int = 0, limit: Optional[int] = None, sort: str = "name",
+                  order: str = "asc", prefix: Optional[str] = None):
+    return list_catalog(contract_catalog, response, offset, limit, sort, order, prefix)
 
 @app.get("/policies")
-def get_policies():
+def get_policies(response: Response, offset: int = 0, limit: Optional[int] = None, sort: str = "name",
+                 order: str = "asc", prefix: Optional[str] = None):
     """List documents in the knowledge_base/policies folder"""
-    import datetime
-    policies_dir = os.path.join(current_dir, "knowledge_base", "policies")
-    if not os.path.exists(policies_dir):
-        return []
-    
-    docs = []
-    for f in os.listdir(policies_dir):
-        if f.startswith("~$") or os.path.isdir(os.path.join(policies_dir, f)):
-            continue
-            
-        file_path = os.path.join(policies_dir, f)
-        stats = os.stat(file_path)
-        
-        # Format size
-        size_bytes = stats.st_size
-        if size_bytes < 1024:
-            size_str = f"{size_bytes} B"
-        elif size_bytes < 1024 * 1024:
-            size_str = f"{size_bytes / 1024:.1f} KB"
-        else:
-            size_str = f"{size_bytes / (1024 * 1024):.1f} MB"
-            
-        # Format date
-        mtime = datetime.datetime.fromtimestamp(stats.st_mtime)
-        date_str = mtime.strftime("%b %d, %Y")
-        
-        docs.append({
-            "id": f,
-            "name": f,
-            "date": date_str,
-            "size": size_str,
-            "author": "Policy"
-        })
-    return docs
+    return list_catalog(policy_catalog, response, offset, limit, sort, order, prefix)
 
 @app.post("/analyze")
 def analyze_template(request: AnalyzeRequest):
     try:
         # FIX: Use relative path from main.py
-        return analyze_document(os.path.join(current_dir, "templates", request.filename))
+        return analysis_cache.get(os.path.join(current_dir, "templates", request.filename))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Template not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/generate")
-def generate_doc(request: GenerateRequest):
+def generate_doc(
+    request: GenerateRequest,
+    x_cache_bypass: Optional[str] = Header(None),
+    cache_control: Optional[str] = Header(None),
+):
+    """
+    Fills a template with the given answers and returns the .docx.
+    Identical requests (same template version and answers) are served from the output store without rendering.
+    """
     try:
-        output_path = generate_document(request.filename, request.answers)
-        return FileResponse(output_path, filename=os.path.basename(output_path))
+        template_path = template_path_for(request.filename)
+        def render():
+            with stage_timer("render"):
+                return render_document(request.filename, request.answers)
+
+        if wants_bypass(x_cache_bypass, cache_control):
+            data, cache_status = render(), "BYPASS"
+        else:
+            data, cache_status = output_store.get_or_render(template_path, request.answers, render)
+        save = GENERATE_SAVE_OUTPUT if request.save_to_disk is None else request.save_to_disk
+        output_name = os.path.basename(save_output(request.filename, data)) if save else output_filename_for(request.filename)
+        return Response(
+            content=data,
+            media_type=DOCX_MEDIA_TYPE,
+            headers={"Content-Disposition": content_disposition(output_name), "X-Cache": cache_status},
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Template not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/generate/bulk")
+def generate_bulk(request: BulkGenerateRequest):
+    """
+    Fills one template once per answer set and streams back a ZIP archive.
+    Documents are rendered in a process pool and written to the archive as they
+    finish; manifest.json at the end lists the status (and error) of every item.
+    """
+    from datetime import datetime
+
+    template_path = os.path.join(current_dir, "templates", os.path.basename(request.filename))
+    if not os.path.isfile(template_path):
+        raise HTTPException(status_code=404, detail="Template not found")
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items to generate")
+    if len(request.items) > BULK_GENERATE_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_GENERATE_MAX_ITEMS} items per request")
+    if request.names is not None and len(request.names) != len(request.items):
+        raise HTTPException(status_code=400, detail="names must have one entry per item")
+
+    stem = os.path.splitext(os.path.basename(request.filename))[0]
+    archive_name = f"{stem}_Bulk_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return StreamingResponse(
+        stream_bulk_zip(template_path, request.items, names=request.names, executor=get_pool()),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(archive_name)},
+    )
+
 @app.post("/draft")
-def draft_content(request: DraftRequest):
+async def draft_content(
+    request: DraftRequest,
+    response: Response,
+    x_cache_bypass: Optional[str] = Header(None),
+    cache_control: Optional[str] = Header(None),
+):
     try:
-        completion = client.chat.completions.create(
+        draft_text, cache_status = await cached_completion(
+            client,
+            llm_cache,
+            bypass=wants_bypass(x_cache_bypass, cache_control),
             model="grok-3",
             messages=[
                 {"role": "system", "content": "You are an expert Bid Writer."},
                 {"role": "user", "content": f"Draft text for {request.field_label} based on: {request.user_notes}"}
             ]
         )
-        return {"draft_text": completion.choices[0].message.content}
+        response.headers["X-Cache"] = cache_status
+        return {"draft_text": draft_text}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/contracts/extract")
-def extract_contract_terms(request: AnalyzeRequest):
+async def extract_contract_terms(
+    request: ExtractRequest,
+    response: Response,
+    x_cache_bypass: Optional[str] = Header(None),
+    cache_control: Optional[str] = Header(None),
+):
     """
     Extracts predefined standard terms (from key_terms.json) using AI.
     This fulfills the requirement for the sidebar in the Contracts UI.
+    Responses are cached per contract content; send "X-Cache-Bypass: 1" to force a fresh extraction.
     """
-    import json
-    import time
-    
     # 1. Load keys from key_terms.json
-    try:
-        kt_path = os.path.join(current_dir, "key_terms.json")
-        with open(kt_path, "r") as f:
-            standard_terms = json.load(f)
-    except Exception as e:
-        print(f"DEBUG: Failed to load key_terms.json: {e}")
-        standard_terms = ["Contract Title", "Parties Involved", "Effective Date"] # Fallback
+    standard_terms = await run_in_threadpool(load_key_terms, KEY_TERMS_PATH, FALLBACK_TERMS)
 
-    # 2. Load contract content
+    # 2. Load contract content and call AI to extract SPECIFIC terms
     try:
         contract_path = os.path.join(current_dir, "Contracts", request.filename)
         if not os.path.exists(contract_path):
             raise HTTPException(status_code=404, detail="Contract not found")
-            
-        if contract_path.endswith('.txt'):
-            with open(contract_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        elif contract_path.endswith('.docx'):
-            from docx import Document
-            doc = Document(contract_path)
-            content = '\n'.join([para.text for para in doc.paragraphs])
-        else:
+
+        try:
+            result, cache_status = await extract_terms(
+                client, llm_cache, contract_path, standard_terms,
+                bypass=wants_bypass(x_cache_bypass, cache_control),
+                chunked=request.chunked
+            )
+        except UnsupportedFormatError:
             raise HTTPException(status_code=400, detail="Unsupported format")
-        
-        # 3. Call AI to extract SPECIFIC terms
-        prompt = (
-            "You are a specialized legal data extractor. "
-            f"Analyze the following contract and extract exactly these terms: {', '.join(standard_terms)}.\n\n"
-            "Format your response as a valid JSON object where keys are the terms and values are the extracted snippets.\n"
-            "If a term is not found, use 'Not found'.\n\n"
-            f"Contract content (first 8000 chars):\n{content[:8000]}"
-        )
-        
-        completion = client.chat.completions.create(
-            model="grok-3",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        
-        return json.loads(completion.choices[0].message.content)
+        response.headers["X-Cache"] = cache_status
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"DEBUG: Extraction failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/contracts/extract-batch")
+async def extract_contract_terms_batch(
+    request: BatchExtractRequest,
+    x_cache_bypass: Optional[str] = Header(None),
+    cache_control: Optional[str] = Header(None),
+):
+    """
+    Extracts the key_terms.json terms for many (or all) contracts.
+    Streams NDJSON: a "start" line, one "result" line per contract as it finishes, then a "done" summary.
+    """
+    import json
+    import time
+
+    if request.concurrency is not None and request.concurrency <= 0:
+        raise HTTPException(status_code=400, detail="concurrency must be a positive number")
+    concurrency = min(request.concurrency or CONTRACT_BATCH_CONCURRENCY, CONTRACT_BATCH_MAX_CONCURRENCY)
+
+    contracts_dir = os.path.join(current_dir, "Contracts")
+    if request.filenames is None:
+        filenames = sorted(
+            f for f in os.listdir(contracts_dir) if not f.startswith("~$") and is_supported(f)
+        ) if os.path.exists(contracts_dir) else []
+    else:
+        filenames = list(dict.fromkeys(request.filenames))
+    # Keep requested names inside the Contracts folder
+    paths = [os.path.join(contracts_dir, os.path.basename(f)) for f in filenames]
+
+    standard_terms = await run_in_threadpool(load_key_terms, KEY_TERMS_PATH, FALLBACK_TERMS)
+    bypass = wants_bypass(x_cache_bypass, cache_control)
+
+    async def lines():
+        start = time.time()
+        total = len(paths)
+        completed = failed = 0
+        yield json.dumps({"event": "start", "total": total, "concurrency": concurrency}) + "\n"
+        async for result in extract_many(
+            client, llm_cache, paths, standard_terms, concurrency=concurrency, bypass=bypass, chunked=request.chunked
+        ):
+            completed += 1
+            failed += result["status"] != "ok"
+            yield json.dumps({"event": "result", "completed": completed, "total": total, **result}) + "\n"
+        yield json.dumps({
+            "event": "done", "total": total, "failed": failed, "elapsed": round(time.time() - start, 3)
+        }) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @app.post("/contract-chat")
-def contract_chat(request: ChatRequest):
+async def contract_chat(request: ChatRequest):
     """Contract Assistant endpoint - handles questions about contracts"""
-    import time
-    import json
-    request_start = time.time()
     print(f"DEBUG: Endpoint /contract-chat hit with message: {request.message[:50]}...")
+    session, history = await start_session(request)
     
     # Load standardized terms for prompt awareness
-    try:
-        kt_path = os.path.join(current_dir, "key_terms.json")
-        with open(kt_path, "r") as f:
-            standard_terms = json.load(f)
-    except:
-        standard_terms = []
+    standard_terms = await run_in_threadpool(load_key_terms, KEY_TERMS_PATH)
+
+    def contract_system_prompt(contract_context):
+        return (
+            "You are a Contract Assistant specialized in analyzing procurement contracts. "
+            f"Context: {contract_context}\n\n"
+            "Your role is to:\n"
+            "1. Answer questions about the contract content.\n"
+            f"2. When extracting key terms, prioritize these Standard Categories: {', '.join(standard_terms)}.\n"
+            "3. **Strict Key Terms Rule**: If the user specifically asks for 'key terms', 'contract terms', or a summary of terms, you MUST provide ONLY the categories listed in the Standard Categories. Do NOT volunteer supplemental terms in this specific summary list.\n"
+            "4. However, you are still expected to answer questions about any other part of the contract (e.g., risks, specific clauses like Audit Rights) if the user asks about them specifically or if the question is broader than just 'show me the key terms'.\n"
+            "5. Provide clear, concise summaries.\n\n"
+            "If no specific contract is loaded, provide general contract analysis guidance."
+        )
 
     # Build context based on selected contract
     contract_context = "No specific contract selected."
@@ -311,17 +685,20 @@ def contract_chat(request: ChatRequest):
             contract_path = os.path.join(current_dir, "Contracts", request.filename)
             if os.path.exists(contract_path):
                 # Read contract content
-                if contract_path.endswith('.txt'):
-                    with open(contract_path, 'r', encoding='utf-8') as f:
-                        contract_content = f.read()
-                elif contract_path.endswith('.docx'):
-                    from docx import Document
-                    doc = Document(contract_path)
-                    contract_content = '\n'.join([para.text for para in doc.paragraphs])
-                else:
+                try:
+                    # Only what the context budget can use is extracted, once per session and file version
+                    with stage_timer("parse"):
+                        contract_content = await session_context(
+                            session, "contract", contract_path,
+                            lambda path: extract_text_prefix(path, 2 * CONTRACT_CONTEXT_TOKENS * CHARS_PER_TOKEN)
+                        )
+                except UnsupportedFormatError:
                     contract_content = "Unsupported file format"
                 
-                contract_context = f"Contract: {request.filename}\n\nContent:\n{contract_content[:5000]}"  # Limit to first 5000 chars
+                allowance = context_allowance(
+                    CONTRACT_CONTEXT_TOKENS, contract_system_prompt(""), request.message, history=history
+                )
+                contract_context = f"Contract: {request.filename}\n\nContent:\n{fit_context(contract_content, allowance)}"
                 print(f"DEBUG: Contract loaded successfully. Length: {len(contract_content)}")
             else:
                 print(f"DEBUG: Contract file NOT found at {contract_path}")
@@ -329,49 +706,47 @@ def contract_chat(request: ChatRequest):
             print(f"DEBUG: Error loading contract: {e}")
             contract_context = f"Error loading contract: {str(e)}"
     
-    system_prompt = (
-        "You are a Contract Assistant specialized in analyzing procurement contracts. "
-        f"Context: {contract_context}\n\n"
-        "Your role is to:\n"
-        "1. Answer questions about the contract content.\n"
-        f"2. When extracting key terms, prioritize these Standard Categories: {', '.join(standard_terms)}.\n"
-        "3. **Strict Key Terms Rule**: If the user specifically asks for 'key terms', 'contract terms', or a summary of terms, you MUST provide ONLY the categories listed in the Standard Categories. Do NOT volunteer supplemental terms in this specific summary list.\n"
-        "4. However, you are still expected to answer questions about any other part of the contract (e.g., risks, specific clauses like Audit Rights) if the user asks about them specifically or if the question is broader than just 'show me the key terms'.\n"
-        "5. Provide clear, concise summaries.\n\n"
-        "If no specific contract is loaded, provide general contract analysis guidance."
-    )
-    
-    messages = [{"role": "system", "content": system_prompt}]
-    if request.history:
-        messages.extend(request.history)
-    messages.append({"role": "user", "content": request.message})
+    with stage_timer("prompt"):
+        system_prompt = contract_system_prompt(contract_context)
+        messages = build_messages(system_prompt, request.message, history)
+
+    if request.stream:
+        return stream_chat_response(
+            messages, done_payload={"session_id": session.id},
+            on_done=lambda text: finish_turn(session, request, text), temperature=0.7
+        )
     
     try:
         print("DEBUG: Sending request to AI API (grok-3)...")
-        api_start = time.time()
-        completion = client.chat.completions.create(
-            model="grok-3",
+        completion = await upstream_completion(
             messages=messages,
             temperature=0.7
         )
-        api_duration = time.time() - api_start
-        print(f"DEBUG: AI API response received in {api_duration:.2f}s")
         
-        result = {"response": completion.choices[0].message.content}
-        total_duration = time.time() - request_start
-        print(f"DEBUG: Total /contract-chat duration: {total_duration:.2f}s")
+        result = {"response": completion.choices[0].message.content, "session_id": session.id}
+        await finish_turn(session, request, result["response"])
         return result
     except Exception as e:
         print(f"DEBUG: AI API failed: {e}")
-        return {"response": f"Error: {str(e)}"}
+        return {"response": f"Error: {str(e)}", "session_id": session.id}
 
 @app.post("/policy-chat")
-def policy_chat(request: ChatRequest):
+async def policy_chat(request: ChatRequest):
     """Policy Assistant endpoint - handles questions about policy documents"""
-    import time
-    request_start = time.time()
     print(f"DEBUG: Endpoint /policy-chat hit with message: {request.message[:50]}...")
+    session, history = await start_session(request)
     
+    def policy_system_prompt(policy_context):
+        return (
+            "You are a Policy Assistant specialized in answering questions about company policies and procedures. "
+            f"Context: {policy_context}\n\n"
+            "Your role is to:\n"
+            "1. Answer user questions based STRICTLY on the provided policy document.\n"
+            "2. If the policy does not contain the answer, state that explicitly.\n"
+            "3. Provide clear, direct answers citing the relevant section if possible.\n"
+            "4. maintain a professional and helpful tone."
+        )
+
     # Build context based on selected policy
     policy_context = "No specific policy selected."
     if request.filename:
@@ -380,32 +755,22 @@ def policy_chat(request: ChatRequest):
             # Policy documents are in backend/knowledge_base/policies
             policy_path = os.path.join(current_dir, "knowledge_base", "policies", request.filename)
             if os.path.exists(policy_path):
-                # Read policy content
-                # Support .txt, .pdf (if we had text extraction), .docx
-                # For now, reuse the same logic as contracts (txt/docx) or generic
-                if policy_path.endswith('.txt'):
-                    with open(policy_path, 'r', encoding='utf-8') as f:
-                        policy_content = f.read()
-                elif policy_path.endswith('.docx'):
-                    from docx import Document
-                    doc = Document(policy_path)
-                    policy_content = '\n'.join([para.text for para in doc.paragraphs])
-                elif policy_path.endswith('.pdf'):
-                     # Basic PDF support using pypdf if available, else placeholder
-                    try:
-                        from pypdf import PdfReader
-                        reader = PdfReader(policy_path)
-                        policy_content = ""
-                        for page in reader.pages:
-                            policy_content += page.extract_text() + "\n"
-                    except ImportError:
-                        policy_content = "PDF support requires pypdf. Please install it."
-                    except Exception as e:
-                        policy_content = f"Error reading PDF: {str(e)}"
-                else:
+                allowance = context_allowance(
+                    POLICY_CONTEXT_TOKENS, policy_system_prompt(""), request.message, history=history
+                )
+                # Read policy content (.txt, .docx, .pdf, spreadsheets)
+                try:
+                    # PDFs are only parsed as far as the budget reaches (2x headroom for the real tokenizer),
+                    # once per session and file version
+                    with stage_timer("parse"):
+                        policy_content = await session_context(
+                            session, "policy", policy_path,
+                            lambda path: extract_text_prefix(path, 2 * POLICY_CONTEXT_TOKENS * CHARS_PER_TOKEN)
+                        )
+                except UnsupportedFormatError:
                     policy_content = "Unsupported file format"
                 
-                policy_context = f"Policy Document: {request.filename}\n\nContent:\n{policy_content[:10000]}"  # Limit to first 10000 chars
+                policy_context = f"Policy Document: {request.filename}\n\nContent:\n{fit_context(policy_content, allowance)}"
                 print(f"DEBUG: Policy loaded successfully. Length: {len(policy_content)}")
             else:
                 print(f"DEBUG: Policy file NOT found at {policy_path}")
@@ -413,48 +778,112 @@ def policy_chat(request: ChatRequest):
             print(f"DEBUG: Error loading policy: {e}")
             policy_context = f"Error loading policy: {str(e)}"
     
-    system_prompt = (
-        "You are a Policy Assistant specialized in answering questions about company policies and procedures. "
-        f"Context: {policy_context}\n\n"
-        "Your role is to:\n"
-        "1. Answer user questions based STRICTLY on the provided policy document.\n"
-        "2. If the policy does not contain the answer, state that explicitly.\n"
-        "3. Provide clear, direct answers citing the relevant section if possible.\n"
-        "4. maintain a professional and helpful tone."
-    )
-    
-    messages = [{"role": "system", "content": system_prompt}]
-    if request.history:
-        messages.extend(request.history)
-    messages.append({"role": "user", "content": request.message})
+    with stage_timer("prompt"):
+        system_prompt = policy_system_prompt(policy_context)
+        messages = build_messages(system_prompt, request.message, history)
+
+    if request.stream:
+        return stream_chat_response(
+            messages, done_payload={"session_id": session.id},
+            on_done=lambda text: finish_turn(session, request, text), temperature=0.5
+        )
     
     try:
         print("DEBUG: Sending request to AI API (grok-3)...")
-        api_start = time.time()
-        completion = client.chat.completions.create(
-            model="grok-3",
+        completion = await upstream_completion(
             messages=messages,
             temperature=0.5 # Lower temperature for more accurate policy answers
         )
-        api_duration = time.time() - api_start
-        print(f"DEBUG: AI API response received in {api_duration:.2f}s")
         
-        result = {"response": completion.choices[0].message.content}
-        total_duration = time.time() - request_start
-        print(f"DEBUG: Total /policy-chat duration: {total_duration:.2f}s")
+        result = {"response": completion.choices[0].message.content, "session_id": session.id}
+        await finish_turn(session, request, result["response"])
         return result
     except Exception as e:
         print(f"DEBUG: AI API failed: {e}")
-        return {"response": f"Error: {str(e)}"}
+        return {"response": f"Error: {str(e)}", "session_id": session.id}
+
+async def answer_from_sheets(request: ChatRequest, kb_path: str, session):
+    """
+    Data mode for /chat: the model sees only sheet schemas and sample rows and
+    plans a JSON query, which runs locally over the cached frames. Only the
+    result table goes into the answer prompt. Returns None when no query fits
+    the question, so the caller can fall back to retrieval.
+    """
+    import json
+
+    with stage_timer("parse"):
+        schemas = await run_in_threadpool(describe_sheets, kb_path)
+    if not schemas:
+        return None
+
+    planner_messages = build_messages(build_planner_prompt(schemas), request.message, session.history)
+    plan = None
+    try:
+        plan_text, _ = await cached_completion(
+            client,
+            llm_cache,
+            validate=is_json_object,
+            model="grok-3",
+            messages=planner_messages,
+            response_format={"type": "json_object"},
+            temperature=0,
+        )
+        plan = json.loads(plan_text).get("query")
+        if not plan:
+            print("DEBUG: /chat data mode: no query planned for this question")
+            return None
+        query = validate_query(plan, schemas)
+        with stage_timer("query"):
+            result = await run_in_threadpool(run_query, kb_path, query)
+    except QueryError as e:
+        print(f"DEBUG: /chat data mode: rejected query {plan}: {e}")
+        return None
+    except Exception as e:
+        # Whatever went wrong with the plan, retrieval can still answer
+        print(f"DEBUG: /chat data mode failed, falling back to retrieval: {e}")
+        return None
+    print(f"DEBUG: /chat data mode: {result['total_rows']} result rows from {query['sheet']}")
+
+    system_prompt = (
+        "You are a Data Analyst. The table below was computed exactly from the spreadsheet "
+        f"'{query['sheet']}' with this query:\n{json.dumps(query)}\n\n"
+        f"Result:\n{format_result(result)}\n\n"
+        "Answer the user's question using these figures as given; do not recalculate them."
+    )
+    messages = build_messages(system_prompt, request.message, session.history)
+
+    payload = {"sources": [query["sheet"]], "query": query, "result": result, "session_id": session.id}
+    if request.stream:
+        return stream_chat_response(
+            messages, done_payload=payload, on_done=lambda text: finish_turn(session, request, text)
+        )
+
+    completion = await upstream_completion(messages=messages)
+    response = completion.choices[0].message.content
+    await finish_turn(session, request, response)
+    return {"response": response, **payload}
 
 @app.post("/chat")
-def chat_agent(request: ChatRequest):
+async def chat_agent(request: ChatRequest):
     # Basic Chat
     try:
         # Load Knowledge Base Context
         # FIX: Use relative path from main.py
         kb_path = os.path.join(current_dir, "knowledge_base")
-        kb_context = get_knowledge_base_content(kb_path)
+        session, history = await start_session(request)
+        if request.mode == "data":
+            answer = await answer_from_sheets(request, kb_path, session)
+            if answer is not None:
+                return answer
+
+        token_budget = context_allowance(KB_CONTEXT_TOKENS, request.message, history=history)
+        with stage_timer("retrieval"):
+            passages = await run_in_threadpool(
+                get_retriever(kb_path).search, request.message, k=KB_TOP_K, token_budget=token_budget
+            )
+        kb_context = format_passages(passages)
+        sources = cited_sources(passages)
+        print(f"DEBUG: /chat retrieved {len(passages)} passages from {sources}")
 
         system_prompt = (
             "You are a Data Analyst. Answer the user's question based strictly on the following context:\n\n"
@@ -462,18 +891,27 @@ def chat_agent(request: ChatRequest):
             "If the answer is not in the context, say you don't have that information."
         )
 
-        messages = [{"role": "system", "content": system_prompt}]
-        if request.history: messages.extend(request.history)
-        messages.append({"role": "user", "content": request.message})
+        with stage_timer("prompt"):
+            messages = build_messages(system_prompt, request.message, history)
 
-        completion = client.chat.completions.create(
-             model="grok-3",
-             messages=messages
-        )
-        return {"response": completion.choices[0].message.content}
+        if request.stream:
+            return stream_chat_response(
+                messages, done_payload={"sources": sources, "session_id": session.id},
+                on_done=lambda text: finish_turn(session, request, text)
+            )
+
+        completion = await upstream_completion(messages=messages)
+        response = completion.choices[0].message.content
+        await finish_turn(session, request, response)
+        return {"response": response, "sources": sources, "session_id": session.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition: request and stage latency histograms, token counters, cache gauges."""
+    return Response(content=registry.expose(), media_type=METRICS_CONTENT_TYPE)
+
 @app.get("/debug")
 def debug_server():
     import glob
@@ -493,36 +931,33 @@ def debug_server():
         "env_vars": {k: v for k, v in os.environ.items() if k in ["PORT", "XAI_API_KEY", "RAILWAY_STATIC_URL"]},
         "static_exists": os.path.exists(static_dir),
         "static_content": os.listdir(static_dir) if os.path.exists(static_dir) else "NOT FOUND",
+        "analysis_cache": analysis_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "sessions": session_store.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "output_store": output_store.stats(),
+        "sheet_cache": sheet_cache.stats(),
+        "pdf_text_cache": pdf_text_cache.stats(),
+        "static_assets": static_assets.stats(),
+        "prewarm": prewarmer.stats(),
+        "catalogs": {
+            "templates": template_catalog.stats(),
+            "contracts": contract_catalog.stats(),
+            "policies": policy_catalog.stats(),
+        },
     }
 
-# Mount the assets folder (JS/CSS)
-# FIX: Use relative path from main.py
-static_assets_path = os.path.join(current_dir, "static", "assets")
-if os.path.exists(static_assets_path):
-    app.mount("/assets", StaticFiles(directory=static_assets_path), name="assets")
-
 # Catch-All Route for React Router (Must be the last route)
 # Note: "full_path" captures everything. "/{full_path:path}" will capture empty string too if configured, 
 # but FastAPI often treats root separate. We can use a catch-all that defaults to index.html.
 
 @app.get("/{full_path:path}")
-async def serve_react_app(full_path: str):
-    # FIX: Use relative path from main.py
-    static_file_path = os.path.join(current_dir, "static", full_path)
-    
-    # 1. Try to serve specific file if it exists (e.g., favicon.ico, robot.txt)
-    if full_path and os.path.exists(static_file_path) and os.path.isfile(static_file_path):
-        return FileResponse(static_file_path)
-    
-    # DEBUG: Log missed asset requests
-    if full_path.startswith("assets/"):
-        print(f"DEBUG: 404 for asset: {full_path} (Looked at: {static_file_path})")
-    
-    # 2. Otherwise/Default: serve index.html (SPA routing)
-    index_path = os.path.join(current_dir, "static", "index.html")
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
-    
+async def serve_react_app(full_path: str, request: Request):
+    # Files of the build (assets/*, favicon.ico, ...) by manifest lookup; any other path gets index.html.
+    # Hashed assets are cached as immutable, index.html is revalidated (304 via ETag).
+    response = static_assets.response(full_path, request.headers)
+    if response is not None:
+        return response
     return {"error": "Frontend not built. Run 'npm run build' and move dist to backend/static"}
 
 if __name__ == "__main__":
@@ -0,0 +1,267 @@
+import os
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from cache hits up to slow upstream completions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Ask the upstream API for token usage on streamed completions too (needs stream_options support)
+LLM_STREAM_USAGE = os.getenv("LLM_STREAM_USAGE", "0").lower() in ("1", "true", "yes")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Route template of the request being handled, set by MetricsMiddleware
+current_endpoint = contextvars.ContextVar("current_endpoint", default="none")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._sample_lines(key, value) for key, value in items)
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _sample_lines(self, key, value):
+        return f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts plus one overflow slot, then sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state[0]) if state else 0
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _sample_lines(self, key, state):
+        counts, total = state
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return "\n".join(lines)
+
+
+class Registry:
+    """Holds metrics and collectors and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collect):
+        """collect() returns {source name: stats dict}; numeric entries are exported as gauges."""
+        self._collectors.append(collect)
+
+    def _collected(self):
+        gauges = {}
+        for collect in self._collectors:
+            try:
+                sources = collect()
+            except Exception as e:
+                print(f"DEBUG: Metrics collector failed: {e}")
+                continue
+            for source, stats in sources.items():
+                for key, value in stats.items():
+                    if isinstance(value, bool) or not isinstance(value, (int, float)):
+                        continue
+                    gauges.setdefault(f"procure_cache_{key}", []).append((source, value))
+        lines = []
+        for name, samples in sorted(gauges.items()):
+            lines.append(f"# HELP {name} Current '{name[len('procure_cache_'):]}' value reported by each cache's stats()")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f'{name}{{cache="{_escape(source)}"}} {_format_value(value)}' for source, value in samples)
+        return lines
+
+    def expose(self) -> str:
+        parts = [metric.expose() for metric in self._metrics]
+        parts.extend(self._collected())
+        return "\n".join(parts) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.counter(
+    "procure_http_requests_total", "HTTP requests by route template, method and status", ("endpoint", "method", "status")
+)
+HTTP_SECONDS = registry.histogram(
+    "procure_http_request_duration_seconds",
+    "Time until the response is sent (streamed bodies included)", ("endpoint", "method"),
+)
+STAGE_SECONDS = registry.histogram(
+    "procure_stage_duration_seconds",
+    "Time spent per request stage (parse, analysis, prompt, llm, render, serialize)", ("endpoint", "stage"),
+)
+LLM_TOKENS = registry.counter(
+    "procure_llm_tokens_total", "Tokens reported by the upstream API", ("endpoint", "kind")
+)
+LLM_REQUESTS = registry.counter(
+    "procure_llm_requests_total",
+    "Completion requests by outcome (HIT, MISS, BYPASS for cached calls; UNCACHED; ERROR)", ("endpoint", "status"),
+)
+
+
+@contextmanager
+def stage_timer(stage: str, endpoint: str = None):
+    """Times a block as one stage of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint or current_endpoint.get(), stage=stage)
+
+
+def observe_stage(stage: str, seconds: float, endpoint: str = None):
+    STAGE_SECONDS.observe(seconds, endpoint=endpoint or current_endpoint.get(), stage=stage)
+
+
+def record_llm_call(status: str, endpoint: str = None):
+    LLM_REQUESTS.inc(endpoint=endpoint or current_endpoint.get(), status=status)
+
+
+def record_usage(response, endpoint: str = None):
+    """Adds the prompt/completion token counts of a completion (or final stream chunk), if it carries usage."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    endpoint = endpoint or current_endpoint.get()
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if tokens:
+            LLM_TOKENS.inc(tokens, endpoint=endpoint, kind=kind)
+
+
+def stream_usage_options():
+    """Extra create() arguments that make streamed completions end with a usage chunk."""
+    return {"stream_options": {"include_usage": True}} if LLM_STREAM_USAGE else {}
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that labels each request with its route template (so
+    path parameters do not explode the label set), makes that label available
+    to stage timers via current_endpoint, and records count and duration.
+    """
+
+    def __init__(self, app, routes_from=None):
+        self.app = app
+        self.routes_from = routes_from
+
+    def _endpoint(self, scope):
+        from starlette.routing import Match
+
+        for route in getattr(self.routes_from, "routes", []):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", None) or "other"
+        return "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        endpoint = self._endpoint(scope)
+        token = current_endpoint.set(endpoint)
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, method=scope["method"])
+            HTTP_REQUESTS.inc(endpoint=endpoint, method=scope["method"], status=status["code"])
+            current_endpoint.reset(token)
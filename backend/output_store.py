@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+try:
+    from backend.file_utils import file_digest
+except ImportError:
+    from file_utils import file_digest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+
+# Bump when rendering changes in a way that should invalidate stored documents
+STORE_VERSION = 1
+
+# Retention: total size of generated documents, and days since a document was last served
+OUTPUT_MAX_BYTES = int(os.getenv("OUTPUT_MAX_BYTES", str(512 * 1024 * 1024)))
+OUTPUT_MAX_AGE_DAYS = float(os.getenv("OUTPUT_MAX_AGE_DAYS", "30"))
+# Minimum seconds between two sweeps
+OUTPUT_SWEEP_INTERVAL = int(os.getenv("OUTPUT_SWEEP_INTERVAL", "3600"))
+
+
+def canonical_answers(answers: dict) -> str:
+    """Serializes answers so that equal dicts always give the same string."""
+    return json.dumps(answers, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+class OutputStore:
+    """
+    Content-addressed store for generated documents.
+
+    A document lives at <root>/<key[:2]>/<key>.docx, where the key hashes the
+    template's content digest and the canonical answers, so identical
+    requests map to the same file and an edited template never reuses stale
+    output. A hit refreshes the file's mtime; the sweeper removes files unused
+    for max_age_days, then the least recently used ones until the output
+    folder is under max_bytes.
+    """
+
+    def __init__(self, root, sweep_dir=None, max_bytes=OUTPUT_MAX_BYTES,
+                 max_age_days=OUTPUT_MAX_AGE_DAYS, sweep_interval=OUTPUT_SWEEP_INTERVAL):
+        self.root = root
+        # Folders the sweeper covers; the store itself is always included
+        self.sweep_dirs = [sweep_dir or root]
+        if os.path.commonpath([os.path.abspath(root), os.path.abspath(self.sweep_dirs[0])]) != os.path.abspath(self.sweep_dirs[0]):
+            self.sweep_dirs.append(root)
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.sweep_interval = sweep_interval
+        self._digests = {}  # template path -> (mtime_ns, size, sha256)
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.removed = 0
+
+    def template_version(self, template_path: str) -> str:
+        """Content digest of the template, recomputed only when its mtime or size changes."""
+        stat = os.stat(template_path)
+        cached = self._digests.get(template_path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        digest = file_digest(template_path)
+        self._digests[template_path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def make_key(self, template_path: str, answers: dict) -> str:
+        payload = f"{STORE_VERSION}\n{self.template_version(template_path)}\n{canonical_answers(answers)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + ".docx")
+
+    def get(self, key: str):
+        """Returns the stored document bytes, or None."""
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used for retention
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> str:
+        """Stores a document atomically and returns its path."""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.maybe_sweep()
+        return path
+
+    def get_or_render(self, template_path: str, answers: dict, render):
+        """Returns (bytes, "HIT"|"MISS"), calling render() only when nothing is stored."""
+        key = self.make_key(template_path, answers)
+        data = self.get(key)
+        if data is not None:
+            return data, "HIT"
+        data = render()
+        self.put(key, data)
+        return data, "MISS"
+
+    def maybe_sweep(self):
+        if time.time() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def _files(self):
+        for sweep_dir in self.sweep_dirs:
+            for root, _, files in os.walk(sweep_dir):
+                for name in files:
+                    # Only generated documents; in-flight .tmp files are left alone
+                    if not name.endswith(".docx"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_mtime, stat.st_size
+
+    def sweep(self) -> int:
+        """Applies the age and size limits to every generated document. Returns how many were removed."""
+        with self._lock:
+            self._last_sweep = time.time()
+            cutoff = self._last_sweep - self.max_age_days * 86400
+            files = sorted(self._files(), key=lambda f: f[1])  # oldest first
+            total = sum(size for _, _, size in files)
+            removed = 0
+            for path, mtime, size in files:
+                if mtime >= cutoff and total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            if removed:
+                print(f"DEBUG: Output sweep removed {removed} documents ({total} bytes kept)")
+            self.removed += removed
+            return removed
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "removed": self.removed,
+            "max_bytes": self.max_bytes,
+            "max_age_days": self.max_age_days,
+        }
+
+
+# Also apply retention to the timestamped copies saved directly in backend/output (save_to_disk)
+OUTPUT_SWEEP_SAVED_COPIES = os.getenv("OUTPUT_SWEEP_SAVED_COPIES", "0").lower() in ("1", "true", "yes")
+
+# Process-wide store
+output_store = OutputStore(
+    os.getenv("OUTPUT_STORE_DIR", os.path.join(OUTPUT_DIR, "store")),
+    sweep_dir=OUTPUT_DIR if OUTPUT_SWEEP_SAVED_COPIES else None,
+)
@@ -0,0 +1,165 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# Worker processes for full-document extraction (0 or 1 = extract in the calling thread)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Below this many uncached pages a worker round-trip costs more than it saves
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+# ...and below this estimated sequential time (from timing the first few pages)
+PDF_PARALLEL_MIN_SECONDS = float(os.getenv("PDF_PARALLEL_MIN_SECONDS", "1.0"))
+PROBE_PAGES = 4
+# Documents whose page texts are kept in memory
+PDF_CACHE_DOCS = int(os.getenv("PDF_CACHE_DOCS", "32"))
+CHARS_PER_TOKEN = 4
+
+
+def _open(path):
+    from pypdf import PdfReader
+
+    return PdfReader(path)
+
+
+def _extract_pages(path, page_numbers, reader=None):
+    """Extracts the given pages (runs in a worker process for large documents)."""
+    reader = reader or _open(path)
+    return [(n, reader.pages[n].extract_text() or "") for n in page_numbers]
+
+
+class PdfTextCache:
+    """
+    Per-page text cache for PDFs, keyed by the file's (path, mtime, size).
+
+    extract() walks pages in order and stops as soon as a character budget is
+    met, so a question about a long manual only parses its first pages. When
+    the full text is needed, uncached pages are split across a process pool.
+    """
+
+    def __init__(self, max_docs=PDF_CACHE_DOCS, workers=PDF_WORKERS, parallel_min_pages=PDF_PARALLEL_MIN_PAGES,
+                 parallel_min_seconds=PDF_PARALLEL_MIN_SECONDS):
+        self.max_docs = max_docs
+        self.workers = workers
+        self.parallel_min_pages = parallel_min_pages
+        self.parallel_min_seconds = parallel_min_seconds
+        self._docs = OrderedDict()  # fingerprint -> {"pages": int, "texts": {page: text}}
+        self._lock = threading.Lock()
+        self._pool = None
+        self.pages_extracted = 0
+        self.pages_cached = 0
+
+    def _document(self, path):
+        """Returns (doc, reader); reader is the one opened to count pages, or None for a known document."""
+        stat = os.stat(path)
+        fingerprint = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            doc = self._docs.get(fingerprint)
+            if doc is not None:
+                self._docs.move_to_end(fingerprint)
+                return doc, None
+        reader = _open(path)
+        doc = {"pages": len(reader.pages), "texts": {}}
+        with self._lock:
+            # Drop entries for older versions of the same file
+            for key in [k for k in self._docs if k[0] == path]:
+                del self._docs[key]
+            self._docs[fingerprint] = doc
+            while len(self._docs) > self.max_docs:
+                self._docs.popitem(last=False)
+        return doc, reader
+
+    def _store(self, doc, results):
+        with self._lock:
+            for n, text in results:
+                doc["texts"][n] = text
+            self.pages_extracted += len(results)
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None or getattr(self._pool, "_broken", False):
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _extract_parallel(self, path, doc, missing):
+        # Contiguous ranges keep each worker's object lookups local
+        size = -(-len(missing) // self.workers)
+        batches = [missing[i:i + size] for i in range(0, len(missing), size)]
+        try:
+            pool = self._get_pool()
+            for results in pool.map(_extract_pages, [path] * len(batches), batches):
+                self._store(doc, results)
+        except Exception as e:
+            print(f"DEBUG: Parallel PDF extraction failed ({e}); continuing in-process")
+            self._store(doc, _extract_pages(path, [n for n in missing if n not in doc["texts"]]))
+
+    def extract(self, path: str, max_chars: int = None) -> str:
+        """
+        Returns the document text with pages joined by newlines.
+
+        With max_chars, pages are read in order only until that many
+        characters are collected and the result is cut to max_chars.
+        """
+        path = os.path.abspath(path)
+        doc, reader = self._document(path)
+        texts = doc["texts"]
+
+        if max_chars is None:
+            missing = [n for n in range(doc["pages"]) if n not in texts]
+            self.pages_cached += doc["pages"] - len(missing)
+            if missing and self.workers > 1 and len(missing) >= self.parallel_min_pages:
+                # Time a few pages first: simple text pages are cheaper to parse here than to ship to workers
+                reader = reader or _open(path)
+                start = time.time()
+                self._store(doc, _extract_pages(path, missing[:PROBE_PAGES], reader))
+                missing = missing[PROBE_PAGES:]
+                estimate = (time.time() - start) / PROBE_PAGES * len(missing)
+                if estimate >= self.parallel_min_seconds:
+                    print(f"DEBUG: Extracting {len(missing)} PDF pages with {self.workers} workers (~{estimate:.1f}s sequential)")
+                    self._extract_parallel(path, doc, missing)
+                    missing = []
+            if missing:
+                self._store(doc, _extract_pages(path, missing, reader))
+            return "\n".join(texts[n] for n in range(doc["pages"]))
+
+        parts = []
+        length = 0
+        for n in range(doc["pages"]):
+            if length >= max_chars:
+                break
+            text = texts.get(n)
+            if text is None:
+                reader = reader or _open(path)
+                text = reader.pages[n].extract_text() or ""
+                self._store(doc, [(n, text)])
+            else:
+                self.pages_cached += 1
+            parts.append(text)
+            length += len(text) + 1
+        return "\n".join(parts)[:max_chars]
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": len(self._docs),
+                "pages_extracted": self.pages_extracted,
+                "pages_cached": self.pages_cached,
+            }
+
+
+pdf_text_cache = PdfTextCache()
+
+
+def extract_pdf_text(path: str, max_chars: int = None, max_tokens: int = None) -> str:
+    """Extracts PDF text, optionally only up to a character or (estimated) token budget."""
+    if max_tokens is not None:
+        budget = max_tokens * CHARS_PER_TOKEN
+        max_chars = budget if max_chars is None else min(max_chars, budget)
+    return pdf_text_cache.extract(path, max_chars=max_chars)
@@ -0,0 +1,229 @@
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+
+# Background warming of the parse/extraction caches when documents arrive or change
+PREWARM_ENABLED = os.getenv("PREWARM", "1").lower() in ("1", "true", "yes")
+# Folder polling interval; with watchdog installed, file events trigger a poll immediately
+PREWARM_POLL_SECONDS = float(os.getenv("PREWARM_POLL_SECONDS", "2"))
+# Also warm the files already present at startup (the in-memory caches start empty)
+PREWARM_ON_START = os.getenv("PREWARM_ON_START", "1").lower() in ("1", "true", "yes")
+# Pause between jobs so warming never holds the GIL for long stretches while requests are served
+PREWARM_PAUSE_SECONDS = float(os.getenv("PREWARM_PAUSE_SECONDS", "0.05"))
+# Scheduling priority of the worker thread (Linux; 19 = lowest)
+PREWARM_NICE = int(os.getenv("PREWARM_NICE", "10"))
+
+
+def _observer(directories, wake):
+    """A watchdog observer that wakes the poller on any file event, or None without watchdog."""
+    try:
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+    except ImportError:
+        return None
+
+    class WakeHandler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            wake.set()
+
+    observer = Observer()
+    for directory in directories:
+        if os.path.isdir(directory):
+            observer.schedule(WakeHandler(), directory, recursive=True)
+    observer.daemon = True
+    return observer
+
+
+class Watch:
+    """
+    A folder and the job for its files. With per_file=False the job receives
+    the folder instead, once per batch of changes (including deletions).
+    """
+
+    def __init__(self, name, directory, handler, include=None, recursive=False, per_file=True):
+        self.name = name
+        self.directory = directory
+        self.handler = handler
+        self.include = include or (lambda path: not os.path.basename(path).startswith(("~$", ".")))
+        self.recursive = recursive
+        self.per_file = per_file
+        self.files = None  # path -> (mtime_ns, size) as of the last poll
+
+    def snapshot(self):
+        files = {}
+        if not os.path.isdir(self.directory):
+            return files
+        for root, dirs, names in os.walk(self.directory):
+            if not self.recursive:
+                dirs[:] = []
+            for name in names:
+                path = os.path.join(root, name)
+                if not self.include(path):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files[path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+
+class Prewarmer:
+    """
+    Polls the watched folders and queues new or changed files for their job,
+    run one at a time by a low-priority worker thread so the first interactive
+    request for the file is a cache hit.
+
+    A file is queued once its size and mtime are unchanged between two polls,
+    so copies in progress are not parsed half-written. Jobs may be coroutine
+    functions taking an API client: run_async() runs them on the worker's own
+    event loop with a client from client_factory (async clients cannot be
+    shared across event loops).
+    """
+
+    def __init__(self, poll_seconds=PREWARM_POLL_SECONDS, pause_seconds=PREWARM_PAUSE_SECONDS, client_factory=None):
+        self.poll_seconds = poll_seconds
+        self.pause_seconds = pause_seconds
+        self.client_factory = client_factory
+        self.watches = []
+        self._pending = {}  # (watch name, path) -> signature seen changing, queued once stable
+        self._queue = OrderedDict()  # (watch name, path) -> watch
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._observer = None
+        self._loop = None
+        self._client = None
+        self.warmed = 0
+        self.failed = 0
+        self.polls = 0
+
+    def watch(self, name, directory, handler, **options):
+        self.watches.append(Watch(name, directory, handler, **options))
+
+    def poll(self, initial=False):
+        """Diffs every watch against its last snapshot and queues the files that have settled."""
+        self.polls += 1
+        for watch in self.watches:
+            files = watch.snapshot()
+            previous, watch.files = watch.files, files
+            if watch.per_file:
+                current = files
+            else:
+                # The whole folder is one item, its signature the set of file signatures
+                current = {watch.directory: tuple(sorted(files.items()))}
+                previous = None if previous is None else {watch.directory: tuple(sorted(previous.items()))}
+
+            # Queue the changes seen last poll that have not changed since
+            for key in [k for k in self._pending if k[0] == watch.name]:
+                signature = current.get(key[1])
+                if signature is None:
+                    del self._pending[key]
+                elif signature == self._pending[key]:
+                    del self._pending[key]
+                    self._enqueue(watch, key[1])
+                else:
+                    self._pending[key] = signature
+
+            if previous is None:
+                # First poll: existing files are complete; warm them only when asked to
+                if initial and files:
+                    for path in current:
+                        self._enqueue(watch, path)
+                continue
+            for path, signature in current.items():
+                if previous.get(path) != signature and (watch.name, path) not in self._pending:
+                    self._pending[(watch.name, path)] = signature
+
+    def _enqueue(self, watch, path):
+        with self._cond:
+            self._queue[(watch.name, path)] = watch
+            self._queue.move_to_end((watch.name, path))
+            self._cond.notify()
+
+    def run_async(self, job):
+        """Runs job(client) -> coroutine to completion on the worker's event loop."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        if self._client is None and self.client_factory is not None:
+            self._client = self.client_factory()
+        return self._loop.run_until_complete(job(self._client))
+
+    def _lower_priority(self):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PREWARM_NICE)
+        except (AttributeError, OSError) as e:
+            print(f"DEBUG: Prewarm worker runs at normal priority: {e}")
+
+    def _work(self):
+        self._lower_priority()
+        while not self._stop.is_set():
+            with self._cond:
+                while not self._queue and not self._stop.is_set():
+                    self._cond.wait(timeout=1.0)
+                if self._stop.is_set():
+                    break
+                (name, path), watch = self._queue.popitem(last=False)
+            start = time.perf_counter()
+            try:
+                watch.handler(path)
+                self.warmed += 1
+                print(f"DEBUG: Prewarmed {name} {os.path.basename(path)} in {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                self.failed += 1
+                print(f"DEBUG: Prewarm of {name} {os.path.basename(path)} failed: {e}")
+            self._stop.wait(self.pause_seconds)
+        if self._loop is not None:
+            self._loop.close()
+
+    def _poll_loop(self, initial):
+        try:
+            self.poll(initial=initial)
+        except Exception as e:
+            print(f"DEBUG: Prewarm poll failed: {e}")
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"DEBUG: Prewarm poll failed: {e}")
+
+    def start(self, initial=PREWARM_ON_START):
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._poll_loop, args=(initial,), name="prewarm-poll", daemon=True),
+            threading.Thread(target=self._work, name="prewarm-worker", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        self._observer = _observer([w.directory for w in self.watches], self._wake)
+        if self._observer is not None:
+            self._observer.start()
+        print(f"DEBUG: Prewarm watching {len(self.watches)} folders ({'watchdog' if self._observer else 'polling'})")
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+        for thread in self._threads:
+            # A job in progress is not interrupted; the threads are daemons
+            thread.join(timeout)
+        self._threads = []
+
+    def stats(self):
+        with self._cond:
+            queued = len(self._queue)
+        return {"queued": queued, "pending": len(self._pending), "warmed": self.warmed, "failed": self.failed,
+                "polls": self.polls}
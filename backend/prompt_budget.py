@@ -0,0 +1,179 @@
+import os
+import threading
+
+# Total input tokens per request (system prompt + document context + history + user message)
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "16000"))
+# Upper bound for conversation history within that total
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "4000"))
+# Room for the condensed note that replaces dropped turns
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", "200"))
+# Document context budgets (the previous 5000/10000/8000-character slices at ~4 characters per token)
+CONTRACT_CONTEXT_TOKENS = int(os.getenv("CONTRACT_CONTEXT_TOKENS", "1250"))
+POLICY_CONTEXT_TOKENS = int(os.getenv("POLICY_CONTEXT_TOKENS", "2500"))
+EXTRACTION_CONTEXT_TOKENS = int(os.getenv("EXTRACTION_CONTEXT_TOKENS", "2000"))
+TEMPLATE_CONTEXT_TOKENS = int(os.getenv("TEMPLATE_CONTEXT_TOKENS", "8000"))
+TIKTOKEN_ENCODING = os.getenv("TIKTOKEN_ENCODING", "cl100k_base")
+
+CHARS_PER_TOKEN = 4
+# Per-message framing tokens added by the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+# fit_items drops trailing items rather than cutting any item below this
+MIN_ITEM_TOKENS = 8
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """
+    Returns the tiktoken encoding (tiktoken is in requirements.txt), or False
+    when it cannot be loaded: not installed, or the encoding file cannot be
+    downloaded on first use. Counts then fall back to ~4 characters per token.
+    """
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+
+                    _encoding = tiktoken.get_encoding(TIKTOKEN_ENCODING)
+                except Exception as e:
+                    print(f"DEBUG: tiktoken unavailable ({e}); estimating tokens from length")
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def message_tokens(message) -> int:
+    return count_tokens(str(message.get("content") or "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+def history_tokens(history) -> int:
+    return sum(message_tokens(m) for m in history or [])
+
+
+def fit_context(text: str, max_tokens: int) -> str:
+    """Cuts text to at most max_tokens, preferring a line or word boundary near the end."""
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding:
+        cut = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        cut = text[:max(0, (max_tokens - 1) * CHARS_PER_TOKEN)]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    return cut[:boundary] if boundary > len(cut) * 0.9 else cut
+
+
+def fit_items(texts, max_tokens: int, min_item_tokens: int = MIN_ITEM_TOKENS, omitted="({n} more not shown)"):
+    """
+    Fits a list of texts into max_tokens: short texts stay whole and the long
+    ones share what is left equally. When the budget cannot give every item
+    at least min_item_tokens, the trailing items are dropped instead and a
+    note (`omitted`, formatted with their count n) is appended.
+    """
+    max_tokens = max(max_tokens, 0)
+    costs = [count_tokens(t) for t in texts]
+    if sum(costs) <= max_tokens:
+        return list(texts)
+
+    keep, note = len(texts), []
+    if sum(min(cost, min_item_tokens) for cost in costs) > max_tokens:
+        keep, used = 0, 0
+        while keep < len(texts):
+            note_tokens = count_tokens(omitted.format(n=len(texts) - keep - 1)) if keep + 1 < len(texts) else 0
+            if used + min(costs[keep], min_item_tokens) + note_tokens > max_tokens:
+                break
+            used += min(costs[keep], min_item_tokens)
+            keep += 1
+        note = [omitted.format(n=len(texts) - keep)]
+        max_tokens -= count_tokens(note[0])
+        texts, costs = texts[:keep], costs[:keep]
+
+    caps = [0] * len(texts)
+    remaining = max(max_tokens, 0)
+    order = sorted(range(len(texts)), key=costs.__getitem__)
+    for position, index in enumerate(order):
+        caps[index] = min(costs[index], remaining // (len(order) - position))
+        remaining -= caps[index]
+    return [t if caps[i] >= costs[i] else fit_context(t, caps[i]) for i, t in enumerate(texts)] + note
+
+
+def context_allowance(max_context_tokens, *fixed_texts, history=None,
+                      max_tokens=PROMPT_MAX_TOKENS, max_history_tokens=HISTORY_MAX_TOKENS) -> int:
+    """
+    Tokens a document context may use: its own cap, limited by what the fixed
+    prompt parts leave over after reserving room for recent history (at most
+    half of the remainder).
+    """
+    fixed = sum(count_tokens(t) + MESSAGE_OVERHEAD_TOKENS for t in fixed_texts)
+    remaining = max_tokens - fixed
+    reserve = min(history_tokens(history), max_history_tokens, max(remaining, 0) // 2)
+    return max(0, min(max_context_tokens, remaining - reserve))
+
+
+def _summarize_dropped(dropped, max_tokens):
+    """Condenses dropped turns into one note listing the earlier user questions, newest first."""
+    questions = [str(m.get("content") or "").strip() for m in dropped if m.get("role") == "user"]
+    lines = []
+    used = count_tokens("Earlier in this conversation the user asked:")
+    for question in reversed(questions):
+        line = "- " + (question if len(question) <= 160 else question[:157] + "...")
+        cost = count_tokens(line)
+        if used + cost > max_tokens:
+            break
+        lines.append(line)
+        used += cost
+    if not lines:
+        return None
+    return {"role": "system", "content": "Earlier in this conversation the user asked:\n" + "\n".join(reversed(lines))}
+
+
+def trim_history(history, max_tokens: int, summarize: bool = True):
+    """
+    Keeps the most recent turns that fit in max_tokens. Older turns are
+    dropped; with summarize=True they are replaced by a short note of the
+    questions asked, so follow-ups keep their thread.
+    """
+    history = [m for m in history or [] if isinstance(m, dict) and m.get("content")]
+    if history_tokens(history) <= max_tokens:
+        return history
+    summary_budget = min(HISTORY_SUMMARY_TOKENS, max_tokens // 4) if summarize else 0
+    kept = []
+    used = 0
+    for message in reversed(history):
+        cost = message_tokens(message)
+        if used + cost > max_tokens - summary_budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    dropped = history[:len(history) - len(kept)]
+    note = _summarize_dropped(dropped, summary_budget - MESSAGE_OVERHEAD_TOKENS) if summary_budget else None
+    print(f"DEBUG: Prompt budget: dropped {len(dropped)} of {len(history)} history messages")
+    return ([note] if note else []) + kept
+
+
+def build_messages(system_prompt: str, user_message: str, history=None,
+                   max_tokens=PROMPT_MAX_TOKENS, max_history_tokens=HISTORY_MAX_TOKENS):
+    """
+    Assembles [system, *history, user], trimming history to whatever the
+    system prompt and user message leave of max_tokens.
+    """
+    fixed = count_tokens(system_prompt) + count_tokens(user_message) + 2 * MESSAGE_OVERHEAD_TOKENS
+    allowance = max(0, min(max_history_tokens, max_tokens - fixed))
+    messages = [{"role": "system", "content": system_prompt}]
+    messages.extend(trim_history(history, allowance))
+    messages.append({"role": "user", "content": user_message})
+    return messages
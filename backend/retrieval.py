@@ -0,0 +1,214 @@
+import os
+import re
+import math
+import threading
+from collections import Counter
+
+try:
+    from backend.kb_index import get_kb_index
+except ImportError:
+    from kb_index import get_kb_index
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "of", "on", "or", "that", "the", "this", "to", "was", "were", "what", "which", "with",
+}
+TABULAR_EXTENSIONS = {"xlsx", "xls", "csv"}
+
+
+def tokenize(text: str):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting English prose and CSV
+    return len(text) // 4 + 1
+
+
+def split_chunks(text: str, tabular: bool = False, chunk_chars: int = 1500):
+    """
+    Splits extracted text into passages of roughly chunk_chars characters.
+
+    Tabular text repeats its header row in every chunk so each passage can be
+    read on its own; prose chunks overlap by one line.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return []
+
+    header = lines[0] if tabular else None
+    body = lines[1:] if tabular else lines
+
+    # Break overlong lines (e.g. a docx paragraph) at whitespace
+    pieces = []
+    for line in body:
+        while len(line) > chunk_chars:
+            cut = line.rfind(" ", 0, chunk_chars)
+            cut = cut if cut > 0 else chunk_chars
+            pieces.append(line[:cut])
+            line = line[cut:].lstrip()
+        if line:
+            pieces.append(line)
+
+    chunks = []
+    current = []
+    size = 0
+    for piece in pieces:
+        if current and size + len(piece) > chunk_chars:
+            chunks.append(current)
+            current = [] if tabular else current[-1:]
+            size = sum(len(p) + 1 for p in current)
+        current.append(piece)
+        size += len(piece) + 1
+    if current:
+        chunks.append(current)
+
+    if header is not None:
+        return ["\n".join([header] + chunk) for chunk in chunks] or [header]
+    return ["\n".join(chunk) for chunk in chunks]
+
+
+class RetrievalIndex:
+    """
+    BM25 index over knowledge base passages.
+
+    Built on top of the extraction index: only files whose entry changed are
+    re-chunked, and document frequencies are updated incrementally.
+    """
+
+    def __init__(self, kb_index, chunk_chars: int = 1500, k1: float = 1.5, b: float = 0.75):
+        self.kb_index = kb_index
+        self.chunk_chars = chunk_chars
+        self.k1 = k1
+        self.b = b
+        self._files = {}  # relpath -> {"signature", "chunks": [(text, term_counts, length)]}
+        self._df = Counter()
+        self._total_length = 0
+        self._chunk_count = 0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        self.kb_index.refresh()
+        # Another thread may refresh the KB index meanwhile: work from a copy of its entries
+        entries = self.kb_index.snapshot()
+        with self._lock:
+            for relpath in [p for p in self._files if p not in entries]:
+                self._remove_file(relpath)
+            for relpath, entry in entries.items():
+                signature = (entry["mtime_ns"], entry["size"])
+                known = self._files.get(relpath)
+                if known and known["signature"] == signature:
+                    continue
+                if known:
+                    self._remove_file(relpath)
+                self._add_file(relpath, entry, signature)
+
+    def _add_file(self, relpath, entry, signature):
+        text = self.kb_index.get_text(relpath)
+        tabular = entry["name"].split(".")[-1].lower() in TABULAR_EXTENSIONS
+        chunks = []
+        for chunk in split_chunks(text, tabular=tabular, chunk_chars=self.chunk_chars):
+            terms = Counter(tokenize(chunk))
+            length = sum(terms.values())
+            chunks.append((chunk, terms, length))
+            self._df.update(terms.keys())
+            self._total_length += length
+        self._chunk_count += len(chunks)
+        self._files[relpath] = {"signature": signature, "name": entry["name"], "chunks": chunks}
+
+    def _remove_file(self, relpath):
+        for chunk, terms, length in self._files.pop(relpath)["chunks"]:
+            self._df.subtract(terms.keys())
+            self._total_length -= length
+            self._chunk_count -= 1
+        self._df += Counter()  # drop zero counts
+
+    def search(self, query: str, k: int = 8, token_budget: int = 3000):
+        """
+        Returns up to k passages that fit within token_budget, best first.
+
+        Each passage is a dict with "source", "text", "score" and "position".
+        If the whole knowledge base fits in the budget, or nothing in it
+        matches the query, passages are returned in document order instead.
+        """
+        self.refresh()
+        with self._lock:
+            candidates = []
+            for relpath in sorted(self._files):
+                info = self._files[relpath]
+                for position, (text, terms, length) in enumerate(info["chunks"]):
+                    candidates.append({"source": info["name"], "relpath": relpath, "position": position,
+                                       "text": text, "terms": terms, "length": length, "score": 0.0})
+
+            if sum(estimate_tokens(c["text"]) for c in candidates) <= token_budget:
+                return [_public(c) for c in candidates]
+
+            query_terms = set(tokenize(query))
+            avg_length = self._total_length / self._chunk_count if self._chunk_count else 0.0
+            for c in candidates:
+                c["score"] = self._bm25(query_terms, c["terms"], c["length"], avg_length)
+
+        ranked = sorted(candidates, key=lambda c: -c["score"])
+        if not ranked or ranked[0]["score"] <= 0:
+            ranked = candidates
+
+        selected = []
+        used = 0
+        for c in ranked:
+            if len(selected) >= k:
+                break
+            if ranked is not candidates and c["score"] <= 0:
+                break
+            cost = estimate_tokens(c["text"])
+            if used + cost > token_budget:
+                continue
+            selected.append(c)
+            used += cost
+
+        # Present the winners in reading order so neighbouring passages stay coherent
+        selected.sort(key=lambda c: (c["relpath"], c["position"]))
+        return [_public(c) for c in selected]
+
+    def _bm25(self, query_terms, terms, length, avg_length):
+        score = 0.0
+        n = self._chunk_count
+        for term in query_terms:
+            tf = terms.get(term)
+            if not tf:
+                continue
+            df = self._df.get(term, 0)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            norm = tf + self.k1 * (1 - self.b + self.b * length / (avg_length or 1))
+            score += idf * tf * (self.k1 + 1) / norm
+        return score
+
+
+def _public(candidate):
+    return {key: candidate[key] for key in ("source", "text", "score", "position")}
+
+
+def format_passages(passages) -> str:
+    """Renders passages as prompt context, labelled with their source file."""
+    if not passages:
+        return "No relevant knowledge base content found."
+    return "".join(f"\n--- File: {p['source']} (passage {p['position'] + 1}) ---\n{p['text']}\n" for p in passages)
+
+
+def cited_sources(passages):
+    return sorted({p["source"] for p in passages})
+
+
+_retrievers = {}
+_retrievers_lock = threading.Lock()
+
+
+def get_retriever(base_path: str) -> RetrievalIndex:
+    """Returns the process-wide retrieval index for a knowledge base folder."""
+    base_path = os.path.abspath(base_path)
+    with _retrievers_lock:
+        retriever = _retrievers.get(base_path)
+        if retriever is None:
+            retriever = RetrievalIndex(get_kb_index(base_path))
+            _retrievers[base_path] = retriever
+        return retriever
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    from backend.prompt_budget import trim_history, HISTORY_MAX_TOKENS
+except ImportError:
+    from prompt_budget import trim_history, HISTORY_MAX_TOKENS
+
+SESSION_MAX = int(os.getenv("SESSION_MAX", "1000"))
+# Seconds without a request before a session is evicted
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", str(2 * 3600)))
+# History kept per session; prompts trim further to their own budget
+SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", str(2 * HISTORY_MAX_TOKENS)))
+# Optional SQLite file so sessions survive restarts and are shared between workers
+SESSION_DB = os.getenv("SESSION_DB")
+
+
+class Session:
+    """
+    Server-held conversation state: trimmed history plus resolved document
+    contexts, each keyed by a name and the source file's fingerprint.
+    """
+
+    def __init__(self, session_id, history=None, contexts=None, created=None, last_seen=None):
+        self.id = session_id
+        self.history = history or []
+        self.contexts = contexts or {}  # key -> {"fingerprint": [...], "value": ...}
+        self.created = created or time.time()
+        self.last_seen = last_seen or self.created
+
+    def get_context(self, key, fingerprint):
+        entry = self.contexts.get(key)
+        if entry and entry["fingerprint"] == list(fingerprint):
+            return entry["value"]
+        return None
+
+    def set_context(self, key, fingerprint, value):
+        self.contexts[key] = {"fingerprint": list(fingerprint), "value": value}
+
+    def use_history(self, history, max_tokens=SESSION_HISTORY_TOKENS):
+        """Replaces the stored history, e.g. with the full conversation sent by an older client."""
+        self.history = trim_history(list(history), max_tokens)
+
+    def add_turn(self, user_message, response, max_tokens=SESSION_HISTORY_TOKENS):
+        self.history.append({"role": "user", "content": user_message})
+        self.history.append({"role": "assistant", "content": response or ""})
+        self.history = trim_history(self.history, max_tokens)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "history": self.history,
+            "contexts": self.contexts,
+            "created": self.created,
+            "last_seen": self.last_seen,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["id"], data.get("history"), data.get("contexts"), data.get("created"), data.get("last_seen"))
+
+
+class SQLiteSessionBackend:
+    """Persists sessions as JSON rows; any object with load/save/delete/purge can replace it."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(id TEXT PRIMARY KEY, data TEXT NOT NULL, last_seen REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with conn:  # commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def load(self, session_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, data):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, last_seen) VALUES (?, ?, ?)",
+                (data["id"], json.dumps(data), data["last_seen"]),
+            )
+
+    def delete(self, session_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def purge(self, older_than):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM sessions WHERE last_seen < ?", (older_than,)).rowcount
+
+
+class SessionStore:
+    """
+    Bounded LRU of sessions with idle eviction. With a backend, sessions
+    evicted from memory (or created by another worker) are reloaded on demand.
+    """
+
+    def __init__(self, maxsize=SESSION_MAX, idle_ttl=SESSION_IDLE_TTL, backend=None):
+        self.maxsize = maxsize
+        self.idle_ttl = idle_ttl
+        self.backend = backend
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+
+    def _expired(self, session, now):
+        return now - session.last_seen > self.idle_ttl
+
+    def get(self, session_id):
+        """Returns the live session, or None if it is unknown or idle-expired."""
+        if not session_id:
+            return None
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                if self._expired(session, now):
+                    del self._sessions[session_id]
+                    self.evicted += 1
+                    return None
+                self._sessions.move_to_end(session_id)
+                return session
+        if self.backend is None:
+            return None
+        data = self.backend.load(session_id)
+        if not data:
+            return None
+        session = Session.from_dict(data)
+        if self._expired(session, now):
+            self.backend.delete(session_id)
+            return None
+        self._remember(session)
+        return session
+
+    def resolve(self, session_id=None):
+        """Returns the requested session, or a new one when it does not exist (any more)."""
+        session = self.get(session_id)
+        if session is None:
+            session = Session(uuid.uuid4().hex)
+            with self._lock:
+                self.created += 1
+            self._remember(session)
+        session.last_seen = time.time()
+        return session
+
+    def _remember(self, session):
+        with self._lock:
+            self._sessions[session.id] = session
+            self._sessions.move_to_end(session.id)
+            while len(self._sessions) > self.maxsize:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+
+    def save(self, session):
+        session.last_seen = time.time()
+        if self.backend is not None:
+            self.backend.save(session.to_dict())
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        if self.backend is not None:
+            self.backend.delete(session_id)
+
+    def evict_idle(self):
+        """Drops sessions idle for longer than idle_ttl. Returns how many were removed from memory."""
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, s in self._sessions.items() if self._expired(s, now)]
+            for sid in expired:
+                del self._sessions[sid]
+            self.evicted += len(expired)
+        if self.backend is not None:
+            self.backend.purge(now - self.idle_ttl)
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._sessions),
+                "maxsize": self.maxsize,
+                "created": self.created,
+                "evicted": self.evicted,
+                "persistent": self.backend is not None,
+            }
+
+
+session_store = SessionStore(backend=SQLiteSessionBackend(SESSION_DB) if SESSION_DB else None)
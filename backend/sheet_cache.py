@@ -0,0 +1,265 @@
+import os
+import csv
+import json
+import shutil
+import hashlib
+import threading
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_ROOT = os.getenv(
+    "SHEET_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "sheets"),
+)
+SNIFF_BYTES = 64 * 1024
+CSV_DELIMITERS = ",;\t|"
+
+# numpy dtype kinds stored as raw .npy arrays (bool, ints, floats, complex, timedelta, datetime)
+NUMPY_KINDS = "biufcmM"
+
+
+def sniff_delimiter(path: str) -> str:
+    """Detects a CSV delimiter from the start of the file; falls back to a comma."""
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        sample = f.read(SNIFF_BYTES)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        return ","
+
+
+def read_source_frame(path: str):
+    """Parses a spreadsheet with pandas. Returns (frame, delimiter or None)."""
+    import pandas as pd
+
+    if path.lower().endswith(".csv"):
+        delimiter = sniff_delimiter(path)
+        try:
+            # The C engine is several times faster than sep=None's python engine
+            return pd.read_csv(path, sep=delimiter), delimiter
+        except pd.errors.ParserError:
+            print(f"DEBUG: C parser rejected {path} with {delimiter!r}; retrying with delimiter detection")
+            return pd.read_csv(path, sep=None, engine="python"), None
+    return pd.read_excel(path), None
+
+
+class SheetTable:
+    """
+    One cached spreadsheet: meta.json plus one file per column.
+
+    Numeric, boolean and datetime columns are .npy arrays opened with
+    mmap_mode="r", so they are paged in from disk instead of copied. Text
+    columns are a single UTF-8 blob with an int64 offsets array (character
+    positions in the decoded blob) and an optional null mask.
+    """
+
+    def __init__(self, directory: str, meta: dict):
+        self.directory = directory
+        self.meta = meta
+        self._columns = {}
+
+    @property
+    def columns(self):
+        return [c["name"] for c in self.meta["columns"]]
+
+    @property
+    def nrows(self):
+        return self.meta["nrows"]
+
+    def _column_meta(self, name):
+        for column in self.meta["columns"]:
+            if column["name"] == name:
+                return column
+        raise KeyError(name)
+
+    def column(self, name):
+        """Returns a column as a numpy array (memory-mapped for numeric kinds)."""
+        values = self._columns.get(name)
+        if values is not None:
+            return values
+        import numpy as np
+
+        column = self._column_meta(name)
+        base = os.path.join(self.directory, column["file"])
+        if column["storage"] == "npy":
+            values = np.load(base + ".npy", mmap_mode="r")
+        else:
+            with open(base + ".bin", "rb") as f:
+                blob = f.read().decode("utf-8")
+            offsets = np.load(base + ".off.npy").tolist()
+            values = np.empty(len(offsets) - 1, dtype=object)
+            values[:] = [blob[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+            if column.get("nulls"):
+                values[np.load(base + ".null.npy")] = None
+        self._columns[name] = values
+        return values
+
+    def frame(self, columns=None):
+        """Builds a DataFrame from the cached columns (all, or only the requested ones)."""
+        import pandas as pd
+
+        names = self.columns if columns is None else list(columns)
+        data = {}
+        for name in names:
+            column = self._column_meta(name)
+            values = self.column(name)
+            if column["storage"] == "npy":
+                data[name] = pd.Series(values, name=name, copy=False)
+            else:
+                try:
+                    data[name] = pd.Series(values, name=name, dtype=column["dtype"])
+                except (TypeError, ValueError):
+                    data[name] = pd.Series(values, name=name, dtype=object)
+        return pd.DataFrame(data, columns=names, copy=False)
+
+    def summary(self):
+        """Row count, dtypes and min/max/mean of numeric columns, computed on the mapped arrays."""
+        import numpy as np
+
+        columns = []
+        for column in self.meta["columns"]:
+            info = {"name": column["name"], "dtype": column["dtype"]}
+            if column["storage"] == "npy" and column["kind"] in "iuf":
+                values = self.column(column["name"])
+                if column["kind"] == "f":
+                    values = values[~np.isnan(values)]
+                if len(values):
+                    info.update(min=float(values.min()), max=float(values.max()), mean=float(values.mean()))
+            columns.append(info)
+        return {"rows": self.nrows, "delimiter": self.meta.get("delimiter"), "columns": columns}
+
+
+def _write_table(directory: str, frame, source_stat, delimiter):
+    import numpy as np
+
+    os.makedirs(directory)
+    columns = []
+    for index, name in enumerate(frame.columns):
+        series = frame.iloc[:, index]
+        dtype = series.dtype
+        column = {"name": str(name), "dtype": str(dtype), "file": f"col{index}"}
+        base = os.path.join(directory, column["file"])
+        if isinstance(dtype, np.dtype) and dtype.kind in NUMPY_KINDS:
+            column.update(storage="npy", kind=dtype.kind)
+            np.save(base + ".npy", series.to_numpy())
+        else:
+            nulls = series.isna().to_numpy()
+            texts = ["" if null else str(value) for value, null in zip(series.tolist(), nulls)]
+            offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+            if texts:
+                np.cumsum([len(t) for t in texts], out=offsets[1:])
+            with open(base + ".bin", "wb") as f:
+                f.write("".join(texts).encode("utf-8"))
+            np.save(base + ".off.npy", offsets)
+            column.update(storage="text", kind="O", nulls=bool(nulls.any()))
+            if column["nulls"]:
+                np.save(base + ".null.npy", nulls)
+        columns.append(column)
+
+    meta = {
+        "version": CACHE_VERSION,
+        "mtime_ns": source_stat.st_mtime_ns,
+        "size": source_stat.st_size,
+        "delimiter": delimiter,
+        "nrows": len(frame),
+        "columns": columns,
+    }
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return meta
+
+
+class SheetCache:
+    """
+    Converts spreadsheets (xlsx, xls, csv) once into a columnar on-disk cache.
+
+    Each source file gets a folder under `root`, invalidated when the file's
+    mtime or size changes. Opened tables are memoized in memory as well, so a
+    repeat read costs one os.stat.
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_ROOT):
+        self.root = root
+        self.conversions = 0
+        self.hits = 0
+        self._tables = {}  # abspath -> SheetTable
+        self._path_locks = {}  # abspath -> lock held while that file is loaded or converted
+        self._lock = threading.Lock()
+
+    def _directory(self, path):
+        return os.path.join(self.root, hashlib.sha1(path.encode("utf-8")).hexdigest()[:16])
+
+    @staticmethod
+    def _is_current(meta, stat):
+        return (
+            meta.get("version") == CACHE_VERSION
+            and meta.get("mtime_ns") == stat.st_mtime_ns
+            and meta.get("size") == stat.st_size
+        )
+
+    def load(self, path: str) -> SheetTable:
+        """Returns the cached table for a spreadsheet, converting it first if needed."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        table = self._current(path, stat)
+        if table is not None:
+            return table
+
+        # One loader per file: concurrent requests for it wait for that conversion, other files proceed
+        with self._lock:
+            path_lock = self._path_locks.setdefault(path, threading.Lock())
+        with path_lock:
+            table = self._current(path, stat)
+            if table is not None:
+                return table
+            directory = self._directory(path)
+            try:
+                with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {}
+            if self._is_current(meta, stat):
+                with self._lock:
+                    self.hits += 1
+            else:
+                meta = self._convert(path, directory, stat)
+            table = SheetTable(directory, meta)
+            with self._lock:
+                self._tables[path] = table
+            return table
+
+    def _current(self, path, stat):
+        with self._lock:
+            table = self._tables.get(path)
+            if table is not None and self._is_current(table.meta, stat):
+                self.hits += 1
+                return table
+        return None
+
+    def _convert(self, path, directory, stat):
+        print(f"DEBUG: Building columnar cache for {os.path.basename(path)}")
+        frame, delimiter = read_source_frame(path)
+        tmp_dir = f"{directory}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        meta = _write_table(tmp_dir, frame, stat, delimiter)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+        with self._lock:
+            self.conversions += 1
+        return meta
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            return {"tables": len(self._tables), "hits": self.hits, "conversions": self.conversions}
+
+
+sheet_cache = SheetCache()
+
+
+def load_frame(path: str, columns=None):
+    """Returns a spreadsheet as a DataFrame, served from the columnar cache."""
+    return sheet_cache.load(path).frame(columns)
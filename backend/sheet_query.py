@@ -0,0 +1,329 @@
+import os
+import json
+import threading
+
+try:
+    from backend.kb_index import get_kb_index
+    from backend.sheet_cache import sheet_cache
+    from backend.retrieval import TABULAR_EXTENSIONS
+except ImportError:
+    from kb_index import get_kb_index
+    from sheet_cache import sheet_cache
+    from retrieval import TABULAR_EXTENSIONS
+
+# Largest result table handed back to the model
+SHEET_QUERY_MAX_ROWS = int(os.getenv("SHEET_QUERY_MAX_ROWS", "50"))
+SAMPLE_ROWS = 5
+# Text columns with at most this many distinct values list them in the schema
+MAX_LISTED_VALUES = 20
+
+FILTER_OPS = {"==", "!=", ">", ">=", "<", "<=", "in", "not_in", "between", "contains", "startswith", "is_null", "not_null"}
+AGGREGATIONS = {"sum", "mean", "median", "min", "max", "count", "nunique"}
+ROW_COUNT = "__rows__"
+
+# Sheet descriptions, rebuilt only when the cached table changes: abspath -> (table signature, schema)
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+
+class QueryError(ValueError):
+    """The planned query does not fit the schema or the query language."""
+
+
+def list_sheets(kb_path: str):
+    """Relative paths of the spreadsheets in the knowledge base."""
+    index = get_kb_index(kb_path)
+    index.refresh()
+    return sorted(p for p in index.snapshot() if p.rsplit(".", 1)[-1].lower() in TABULAR_EXTENSIONS)
+
+
+def _records(frame):
+    # to_json handles numpy scalars, NaN and timestamps
+    return json.loads(frame.to_json(orient="records", date_format="iso"))
+
+
+def sheet_schema(kb_path: str, relpath: str):
+    """
+    Compact description of one sheet for the planner: columns, dtypes, sample rows.
+    Built once per version of the file; the returned dict is shared, do not modify it.
+    """
+    path = os.path.abspath(os.path.join(kb_path, relpath))
+    table = sheet_cache.load(path)
+    signature = (relpath, table.meta["version"], table.meta["mtime_ns"], table.meta["size"])
+    with _schemas_lock:
+        cached = _schemas.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    schema = _build_schema(table, relpath)
+    with _schemas_lock:
+        _schemas[path] = (signature, schema)
+    return schema
+
+
+def _build_schema(table, relpath):
+    summary = {c["name"]: c for c in table.summary()["columns"]}
+    columns = []
+    for column in table.meta["columns"]:
+        info = dict(summary[column["name"]])
+        if column["storage"] == "text":
+            distinct = {v for v in table.column(column["name"]) if v is not None}
+            if len(distinct) <= MAX_LISTED_VALUES:
+                info["values"] = sorted(distinct)
+        columns.append(info)
+    sample = table.frame().head(SAMPLE_ROWS)
+    return {"sheet": relpath, "rows": table.nrows, "columns": columns, "sample": _records(sample)}
+
+
+def describe_sheets(kb_path: str):
+    schemas = [sheet_schema(kb_path, relpath) for relpath in list_sheets(kb_path)]
+    with _schemas_lock:
+        # Forget sheets that left the knowledge base
+        live = {os.path.abspath(os.path.join(kb_path, s["sheet"])) for s in schemas}
+        root = os.path.join(os.path.abspath(kb_path), "")
+        for path in [p for p in _schemas if p.startswith(root) and p not in live]:
+            del _schemas[path]
+    return schemas
+
+
+def build_planner_prompt(schemas) -> str:
+    return (
+        "You translate questions about spreadsheet data into a JSON query. You never compute answers yourself.\n"
+        "Available sheets (columns, dtypes, numeric ranges, sample rows):\n"
+        f"{json.dumps(schemas, default=str)}\n\n"
+        "Respond with a JSON object {\"query\": {...}} using only these keys:\n"
+        "  sheet: one of the sheet names above\n"
+        "  filters: [{\"column\", \"op\", \"value\"}], op one of "
+        f"{', '.join(sorted(FILTER_OPS))} (value is a list for in/not_in/between; omitted for is_null/not_null)\n"
+        "  group_by: [column, ...]\n"
+        "  aggregations: [{\"column\", \"func\", \"as\"}], func one of "
+        f"{', '.join(sorted(AGGREGATIONS))} (count without a column counts rows)\n"
+        "  columns: [column, ...] to return when there are no aggregations\n"
+        "  sort: [{\"column\", \"order\": \"asc\"|\"desc\"}] over the output columns\n"
+        f"  limit: number of rows to return (at most {SHEET_QUERY_MAX_ROWS})\n"
+        "If the question cannot be answered from these sheets, respond with {\"query\": null}."
+    )
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def validate_query(query, schemas):
+    """
+    Checks a planned query against the sheet schemas and returns a normalized copy.
+
+    Raises:
+        QueryError: On unknown sheets, columns, operators or functions, or clashing aggregation aliases.
+    """
+    if not isinstance(query, dict):
+        raise QueryError("Query must be an object")
+    by_sheet = {s["sheet"]: s for s in schemas}
+    sheet = query.get("sheet")
+    if sheet not in by_sheet and len(by_sheet) == 1 and not sheet:
+        sheet = next(iter(by_sheet))
+    if sheet not in by_sheet:
+        raise QueryError(f"Unknown sheet: {sheet}")
+    dtypes = {c["name"]: c["dtype"] for c in by_sheet[sheet]["columns"]}
+
+    def column(name, where):
+        if name not in dtypes:
+            raise QueryError(f"Unknown column in {where}: {name}")
+        return name
+
+    filters = []
+    for f in _as_list(query.get("filters")):
+        if not isinstance(f, dict) or f.get("op") not in FILTER_OPS:
+            raise QueryError(f"Invalid filter: {f}")
+        values = _as_list(f.get("value"))
+        if f["op"] == "between" and len(values) != 2:
+            raise QueryError("between needs [low, high]")
+        if f["op"] not in ("is_null", "not_null", "in", "not_in", "between") and len(values) != 1:
+            raise QueryError(f"{f['op']} needs a single value")
+        filters.append({"column": column(f.get("column"), "filters"), "op": f["op"], "value": f.get("value")})
+
+    group_by = [column(c, "group_by") for c in _as_list(query.get("group_by"))]
+
+    aggregations = []
+    for a in _as_list(query.get("aggregations")):
+        if not isinstance(a, dict) or a.get("func") not in AGGREGATIONS:
+            raise QueryError(f"Invalid aggregation: {a}")
+        if a.get("column") in (None, "", "*"):
+            if a["func"] != "count":
+                raise QueryError(f"{a['func']} needs a column")
+            source = ROW_COUNT
+        else:
+            source = column(a["column"], "aggregations")
+        alias = str(a.get("as") or (f"{a['func']}_{a['column']}" if source != ROW_COUNT else "count"))
+        aggregations.append({"column": source, "func": a["func"], "as": alias})
+    if group_by and not aggregations:
+        aggregations.append({"column": ROW_COUNT, "func": "count", "as": "count"})
+    # Output columns are named by group_by columns and aliases: they must not collide
+    aliases = [a["as"] for a in aggregations]
+    for alias in aliases:
+        if aliases.count(alias) > 1 or alias in group_by or alias == ROW_COUNT:
+            raise QueryError(f"Aggregation alias must be unique and not a group_by column: {alias}")
+
+    columns = [column(c, "columns") for c in _as_list(query.get("columns"))]
+    output = group_by + [a["as"] for a in aggregations] if aggregations else (columns or list(dtypes))
+
+    sort = []
+    for s in _as_list(query.get("sort")):
+        if isinstance(s, str):
+            s = {"column": s}
+        if not isinstance(s, dict) or s.get("column") not in output:
+            raise QueryError(f"Sort column must be an output column: {s}")
+        sort.append({"column": s["column"], "order": "asc" if str(s.get("order", "asc")).lower() == "asc" else "desc"})
+
+    try:
+        limit = int(query.get("limit") or SHEET_QUERY_MAX_ROWS)
+    except (TypeError, ValueError):
+        raise QueryError("limit must be a number")
+
+    return {
+        "sheet": sheet,
+        "filters": filters,
+        "group_by": group_by,
+        "aggregations": aggregations,
+        "columns": columns,
+        "sort": sort,
+        "limit": max(1, min(limit, SHEET_QUERY_MAX_ROWS)),
+    }
+
+
+def _coerce(series, value):
+    """Converts a JSON filter value to the column's type so comparisons stay vectorized."""
+    import pandas as pd
+
+    kind = series.dtype.kind if hasattr(series.dtype, "kind") else "O"
+    try:
+        if kind in "iuf":
+            return float(value)
+        if kind == "M":
+            return pd.Timestamp(value)
+        if kind == "b":
+            return str(value).lower() in ("1", "true", "yes") if isinstance(value, str) else bool(value)
+    except (TypeError, ValueError):
+        raise QueryError(f"Value {value!r} does not match column {series.name}")
+    return str(value).casefold()
+
+
+def _filter_mask(frame, f):
+    series = frame[f["column"]]
+    op = f["op"]
+    if op == "is_null":
+        return series.isna()
+    if op == "not_null":
+        return series.notna()
+    text = series.dtype.kind not in "biufM" if hasattr(series.dtype, "kind") else True
+    # Text matching is case-insensitive so the planner does not have to guess capitalization
+    target = series.astype(str).str.casefold().where(series.notna()) if text else series
+    values = [_coerce(series, v) for v in _as_list(f["value"])]
+    if op in ("in", "not_in"):
+        mask = target.isin(values)
+        return ~mask if op == "not_in" else mask
+    if op == "between":
+        return target.between(values[0], values[1])
+    if op == "contains":
+        return target.str.contains(str(values[0]), regex=False, na=False) if text else target == values[0]
+    if op == "startswith":
+        return target.str.startswith(str(values[0]), na=False) if text else target == values[0]
+    value = values[0]
+    if op == "==":
+        return target == value
+    if op == "!=":
+        return target != value
+    if op == ">":
+        return target > value
+    if op == ">=":
+        return target >= value
+    if op == "<":
+        return target < value
+    return target <= value
+
+
+def run_query(kb_path: str, query: dict):
+    """
+    Executes a validated query with vectorized pandas over the cached sheet.
+
+    Returns:
+        {"sheet", "columns", "rows", "total_rows", "truncated"} where rows is a
+        list of lists (at most query["limit"]).
+    """
+    import pandas as pd
+
+    if query["aggregations"] or query["columns"]:
+        needed = [f["column"] for f in query["filters"]] + query["group_by"] + query["columns"]
+        needed += [a["column"] for a in query["aggregations"] if a["column"] != ROW_COUNT]
+        if not query["aggregations"]:
+            needed += [s["column"] for s in query["sort"]]
+        needed = list(dict.fromkeys(needed))
+    else:
+        # No projection: every column is output, not just the filtered ones
+        needed = None
+    frame = sheet_cache.load(os.path.join(kb_path, query["sheet"])).frame(needed)
+
+    if query["filters"]:
+        mask = pd.Series(True, index=frame.index)
+        for f in query["filters"]:
+            try:
+                mask &= _filter_mask(frame, f).fillna(False).astype(bool)
+            except QueryError:
+                raise
+            except (TypeError, ValueError) as e:
+                raise QueryError(f"Cannot apply {f['op']} to {f['column']}: {e}")
+        frame = frame[mask]
+
+    aggregations = query["aggregations"]
+    if aggregations:
+        frame = frame.assign(**{ROW_COUNT: 1})
+        named = {
+            a["as"]: (a["column"], "sum" if a["column"] == ROW_COUNT else a["func"]) for a in aggregations
+        }
+        try:
+            if query["group_by"]:
+                result = frame.groupby(query["group_by"], sort=False, dropna=False).agg(**named).reset_index()
+            else:
+                result = pd.DataFrame({alias: [frame[col].agg(func)] for alias, (col, func) in named.items()})
+        except (TypeError, ValueError) as e:
+            raise QueryError(f"Aggregation failed: {e}")
+    else:
+        result = frame[query["columns"]] if query["columns"] else frame
+
+    if query["sort"]:
+        try:
+            result = result.sort_values(
+                [s["column"] for s in query["sort"]],
+                ascending=[s["order"] == "asc" for s in query["sort"]],
+                kind="stable",
+            )
+        except KeyError as e:
+            raise QueryError(f"Sort column is not an output column: {e}")
+    total = len(result)
+    result = result.head(query["limit"])
+    return {
+        "sheet": query["sheet"],
+        "columns": [str(c) for c in result.columns],
+        "rows": [list(r.values()) for r in _records(result)],
+        "total_rows": total,
+        "truncated": total > len(result),
+    }
+
+
+def _format_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:,.2f}".rstrip("0").rstrip(".")
+    return str(value)
+
+
+def format_result(result) -> str:
+    """Renders a result as a pipe-separated table for the answer prompt."""
+    lines = [" | ".join(result["columns"])]
+    for row in result["rows"]:
+        lines.append(" | ".join(_format_cell(v) for v in row))
+    if result["truncated"]:
+        lines.append(f"({result['total_rows'] - len(result['rows'])} more rows not shown)")
+    return "\n".join(lines)
@@ -0,0 +1,210 @@
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+import threading
+
+# Files at least this large get compressed variants
+STATIC_COMPRESS_MIN_BYTES = int(os.getenv("STATIC_COMPRESS_MIN_BYTES", "1024"))
+STATIC_BROTLI_QUALITY = int(os.getenv("STATIC_BROTLI_QUALITY", "9"))
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml")
+# Vite writes bundles to assets/ as name-<8 character hash>.ext (index-D8f1umxu.js): safe to cache forever.
+# Files copied from public/ keep their names and are revalidated instead.
+HASHED_NAME_RE = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# Preference order when the client accepts several encodings equally
+ENCODINGS = ("br", "gzip")
+PRECOMPRESSED_SUFFIXES = {".br": "br", ".gz": "gzip"}
+
+
+def _brotli():
+    try:
+        import brotli
+
+        return brotli
+    except ImportError:
+        return None
+
+
+def content_type_for(path: str) -> str:
+    if path.endswith((".js", ".mjs")):
+        return "application/javascript"
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in ("application/json", "image/svg+xml"):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def parse_accept_encoding(header: str):
+    """Returns the set of codings with q > 0 ("*" expands to all known ones)."""
+    accepted, rejected = set(), set()
+    for item in (header or "").split(","):
+        parts = [p.strip() for p in item.split(";")]
+        coding = parts[0].lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        (accepted if q > 0 else rejected).add(coding)
+    if "*" in accepted:
+        accepted |= set(ENCODINGS) - rejected
+    return accepted
+
+
+def etag_matches(if_none_match: str, etags) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+class StaticAsset:
+    """One file of the frontend build: headers, ETag and (for text types) its bytes and compressed variants."""
+
+    def __init__(self, path: str, relpath: str, data: bytes = None, size: int = 0):
+        self.path = path
+        self.relpath = relpath
+        self.content_type = content_type_for(relpath)
+        self.size = size
+        self.immutable = bool(HASHED_NAME_RE.match(relpath))
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if self.immutable else REVALIDATE_CACHE_CONTROL
+        self.data = data  # None: large or binary, streamed from disk
+        self.variants = {}  # encoding -> bytes
+        digest = hashlib.sha1(data).hexdigest() if data is not None else f"{size:x}-{os.stat(path).st_mtime_ns:x}"
+        self.etag = f'"{digest[:20]}"'
+
+    @property
+    def compressible(self):
+        return self.content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def etag_for(self, encoding=None):
+        # Each representation needs its own strong validator
+        return self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+
+    def all_etags(self):
+        return [self.etag] + [self.etag_for(e) for e in self.variants]
+
+    def choose_encoding(self, accept_encoding: str):
+        if not self.variants:
+            return None
+        accepted = parse_accept_encoding(accept_encoding)
+        return next((e for e in ENCODINGS if e in self.variants and e in accepted), None)
+
+
+class StaticAssets:
+    """
+    In-memory manifest of the frontend build, loaded once (lifespan hook or
+    first request). Responses come from memory; only large binary files are
+    read from disk per request.
+    """
+
+    def __init__(self, root: str, inline_max_bytes: int = 8 * 1024 * 1024):
+        self.root = root
+        self.inline_max_bytes = inline_max_bytes
+        self._assets = None
+        self._lock = threading.Lock()
+        self.not_modified = 0
+        self.served = 0
+
+    def _build(self):
+        assets = {}
+        brotli = _brotli()
+        precompressed = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                relpath = os.path.relpath(path, self.root).replace(os.sep, "/")
+                stem, suffix = os.path.splitext(relpath)
+                if suffix in PRECOMPRESSED_SUFFIXES and os.path.exists(os.path.join(self.root, stem)):
+                    precompressed.append((stem, PRECOMPRESSED_SUFFIXES[suffix], path))
+                    continue
+                size = os.path.getsize(path)
+                data = None
+                if size <= self.inline_max_bytes and content_type_for(relpath).startswith(COMPRESSIBLE_TYPES):
+                    with open(path, "rb") as f:
+                        data = f.read()
+                asset = StaticAsset(path, relpath, data, size)
+                if data is not None and size >= STATIC_COMPRESS_MIN_BYTES:
+                    asset.variants["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+                    if brotli is not None:
+                        asset.variants["br"] = brotli.compress(data, quality=STATIC_BROTLI_QUALITY)
+                assets[relpath] = asset
+        # Variants shipped by the build (e.g. vite-plugin-compression) replace the computed ones
+        for relpath, encoding, path in precompressed:
+            asset = assets.get(relpath)
+            if asset is not None and asset.data is not None:
+                with open(path, "rb") as f:
+                    asset.variants[encoding] = f.read()
+        for asset in assets.values():
+            # A variant is only worth serving if it is smaller
+            asset.variants = {e: v for e, v in asset.variants.items() if len(v) < asset.size}
+        return assets
+
+    def load(self):
+        """(Re)builds the manifest. Returns the number of files."""
+        assets = self._build() if os.path.isdir(self.root) else {}
+        with self._lock:
+            self._assets = assets
+        compressed = sum(1 for a in assets.values() if a.variants)
+        print(f"DEBUG: Static manifest: {len(assets)} files, {compressed} with compressed variants")
+        return len(assets)
+
+    @property
+    def assets(self):
+        if self._assets is None:
+            self.load()
+        return self._assets
+
+    def get(self, relpath: str):
+        return self.assets.get(relpath)
+
+    def response(self, relpath: str, headers):
+        """
+        Builds the response for a request path. Unknown paths outside assets/
+        get index.html (SPA routing); returns None when there is nothing to serve.
+        """
+        from fastapi.responses import FileResponse, Response
+
+        asset = self.get(relpath) if relpath else None
+        if asset is None:
+            if relpath.startswith("assets/"):
+                print(f"DEBUG: 404 for asset: {relpath}")
+                return Response(status_code=404)
+            asset = self.get("index.html")
+            if asset is None:
+                return None
+
+        encoding = asset.choose_encoding(headers.get("accept-encoding"))
+        response_headers = {"Cache-Control": asset.cache_control, "ETag": asset.etag_for(encoding)}
+        if asset.compressible and asset.variants:
+            response_headers["Vary"] = "Accept-Encoding"
+        if etag_matches(headers.get("if-none-match"), asset.all_etags()):
+            self.not_modified += 1
+            return Response(status_code=304, headers=response_headers)
+
+        self.served += 1
+        if asset.data is None:
+            return FileResponse(asset.path, media_type=asset.content_type, headers=response_headers)
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+            return Response(asset.variants[encoding], media_type=asset.content_type, headers=response_headers)
+        return Response(asset.data, media_type=asset.content_type, headers=response_headers)
+
+    def stats(self):
+        assets = self._assets or {}
+        return {
+            "files": len(assets),
+            "bytes": sum(a.size for a in assets.values()),
+            "compressed_bytes": sum(len(min(a.variants.values(), key=len)) for a in assets.values() if a.variants),
+            "served": self.served,
+            "not_modified": self.not_modified,
+        }
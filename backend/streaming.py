@@ -0,0 +1,130 @@
+import re
+import inspect
+import json
+
+
+def sse_event(data, event: str = None) -> str:
+    """Formats one Server-Sent Event with a JSON payload."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+class JsonStringFieldStreamer:
+    """
+    Incrementally decodes one top-level string field of a JSON object that is
+    still being generated, e.g. the "response" key of a JSON-mode completion.
+
+    feed() returns the newly decoded characters of the field's value. Escape
+    sequences split across chunks are held back until they are complete.
+    """
+
+    def __init__(self, field: str = "response"):
+        self._key_re = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ""
+        self._pos = None
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far (the raw JSON document)."""
+        return self._buffer
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        if self.done:
+            return ""
+        if self._pos is None:
+            match = self._key_re.search(self._buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        buf = self._buffer
+        i = safe = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if ch == "\\":
+                if i + 1 >= len(buf):
+                    break
+                if buf[i + 1] == "u":
+                    if i + 6 > len(buf):
+                        break
+                    try:
+                        code = int(buf[i + 2:i + 6], 16)
+                    except ValueError:
+                        code = 0
+                    # A high surrogate is only decodable together with its pair
+                    width = 12 if 0xD800 <= code < 0xDC00 else 6
+                    if i + width > len(buf):
+                        break
+                    i += width
+                else:
+                    i += 2
+                safe = i
+            elif ch == '"':
+                self.done = True
+                break
+            else:
+                i += 1
+                safe = i
+
+        piece = buf[self._pos:safe]
+        self._pos = safe
+        if not piece:
+            return ""
+        try:
+            return json.loads('"' + piece + '"')
+        except ValueError:
+            return piece
+
+
+async def completion_events(chunks, json_field: str = None, done_payload: dict = None, on_done=None):
+    """
+    Turns a streamed chat completion into SSE events.
+
+    Plain mode emits {"delta": ...} events followed by a "done" event. With
+    json_field set (JSON mode), only that field's text is streamed as deltas;
+    once the completion ends the parsed object is sent as an "extracted_data"
+    event before "done". on_done, if given, is called (and awaited, if it
+    returns an awaitable) with the final response text just before the
+    "done" event.
+    """
+    streamer = JsonStringFieldStreamer(json_field) if json_field else None
+    parts = []
+    try:
+        async for chunk in chunks:
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if not content:
+                continue
+            if streamer:
+                content = streamer.feed(content)
+            else:
+                parts.append(content)
+            if content:
+                yield sse_event({"delta": content})
+    except Exception as e:
+        print(f"DEBUG: Streaming failed: {e}")
+        yield sse_event({"error": str(e)}, event="error")
+        return
+
+    payload = dict(done_payload or {})
+    if streamer:
+        try:
+            result = json.loads(streamer.text)
+        except ValueError as e:
+            yield sse_event({"error": f"Invalid JSON from model: {e}"}, event="error")
+            return
+        yield sse_event(result.get("extracted_data", {}), event="extracted_data")
+        payload["response"] = result.get(json_field, "")
+    else:
+        payload["response"] = "".join(parts)
+    if on_done:
+        try:
+            result = on_done(payload["response"])
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            print(f"DEBUG: Stream completion hook failed: {e}")
+    yield sse_event(payload, event="done")
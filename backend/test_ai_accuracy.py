@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import asyncio
 from dotenv import load_dotenv
 
 # Add backend to path
@@ -30,14 +31,14 @@ def test_ai_accuracy():
     )
     
     print("Sending request to AI...")
-    completion = client.chat.completions.create(
+    completion = asyncio.run(client.chat.completions.create(
         model="grok-3",
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": message}
         ],
         temperature=0.0 # Strict for math
-    )
+    ))
     
     print("\nAI Response:")
     print(completion.choices[0].message.content)
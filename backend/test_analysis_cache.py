@@ -0,0 +1,53 @@
+import os
+import docx
+from backend.analysis_cache import AnalysisCache
+
+def make_template(path, text):
+    doc = docx.Document()
+    doc.add_paragraph(text)
+    doc.save(path)
+
+def test_cache_hits_and_invalidation(tmp_path):
+    path = str(tmp_path / "template.docx")
+    make_template(path, "Supplier {{ v1 }} signed on {{ V2 }}.")
+    cache = AnalysisCache(maxsize=4)
+
+    first = cache.get(path)
+    assert [v["id"] for v in first] == ["v1", "v2"]
+    assert cache.get(path) == first
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    # Mutating a returned result must not leak into the cache
+    first[0]["context"] = "changed"
+    assert cache.get(path)[0]["context"] != "changed"
+
+    # Content change is detected through mtime/size and hash
+    make_template(path, "Only {{ v3 }} now.")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    assert [v["id"] for v in cache.get(path)] == ["v3"]
+    assert cache.stats()["misses"] == 2
+
+    cache.invalidate(path)
+    cache.get(path)
+    assert cache.stats()["misses"] == 3
+
+def test_lru_eviction(tmp_path):
+    cache = AnalysisCache(maxsize=2)
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f"t{i}.docx")
+        make_template(path, f"{{{{ v{i + 1} }}}}")
+        paths.append(path)
+
+    cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])  # paths[0] becomes most recently used
+    cache.get(paths[2])  # evicts paths[1]
+    assert cache.stats()["size"] == 2
+
+    misses = cache.stats()["misses"]
+    cache.get(paths[0])
+    assert cache.stats()["misses"] == misses
+    cache.get(paths[1])
+    assert cache.stats()["misses"] == misses + 1
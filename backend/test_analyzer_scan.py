@@ -0,0 +1,58 @@
+import docx
+from docx.oxml import parse_xml
+from backend.analyzer import analyze_document_docx, scan_docx_variables, analyze_document
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+def build_template(path):
+    doc = docx.Document()
+    doc.sections[0].header.paragraphs[0].text = "Ref: {{ v40 }}"
+    doc.add_paragraph("Contract for {{ v1 }} made on {{ V2 }}.")
+
+    para = doc.add_paragraph()
+    para._p.append(parse_xml(f'<w:hyperlink {W}><w:r><w:t>Portal {{{{ v3 }}}}</w:t></w:r></w:hyperlink>'))
+    para._p.append(parse_xml(f'<w:r {W}><w:br/><w:t>line two</w:t><w:tab/><w:br w:type="page"/></w:r>'))
+
+    table = doc.add_table(rows=4, cols=3)
+    table.rows[0].cells[0].text = "Item"
+    table.rows[0].cells[1].text = "Description"
+    table.rows[0].cells[2].text = "Cost"
+    # Horizontal merge: the merged cell is repeated in row.cells
+    merged = table.rows[1].cells[0].merge(table.rows[1].cells[1])
+    merged.text = "Scope of services {{ v4 }}"
+    table.rows[1].cells[2].text = "{{ v5 }}"
+    # Vertical merge: continuation rows resolve to the top cell
+    tall = table.rows[2].cells[0].merge(table.rows[3].cells[0])
+    tall.text = "Milestones"
+    table.rows[2].cells[1].text = "Phase 1 {{ v6 }}"
+    table.rows[3].cells[1].text = "Phase 2 {{ v7 }}"
+    table.rows[3].cells[2].text = "\xa0{{ v1 }}"  # also in a paragraph: the table row wins
+
+    inner = table.rows[0].cells[2].add_table(rows=1, cols=1)
+    inner.rows[0].cells[0].text = "nested {{ v99 }} is not a top-level row"
+    doc.save(path)
+
+def test_streaming_scanner_matches_python_docx(tmp_path):
+    path = str(tmp_path / "template.docx")
+    build_template(path)
+
+    expected = analyze_document_docx(path)
+    assert scan_docx_variables(path) == expected
+    assert analyze_document(path) == expected
+
+    by_id = {v["id"]: v for v in expected}
+    assert [v["id"] for v in expected] == ["v1", "v2", "v3", "v4", "v5", "v6", "v7", "v40"]
+    assert by_id["v4"]["context"] == "Scope of services {{ v4 }} | Scope of services {{ v4 }} | {{ v5 }}"
+    assert by_id["v7"]["context"] == "Milestones | Phase 2 {{ v7 }} | {{ v1 }}"
+    assert by_id["v1"]["type"] == "table_row"
+    assert by_id["v2"]["original_tag"] == "V2"
+    assert by_id["v40"] == {"id": "v40", "original_tag": "v40", "context": "Ref: {{ v40 }}", "type": "paragraph"}
+
+def test_falls_back_to_python_docx_for_unreadable_xml(tmp_path, monkeypatch):
+    path = str(tmp_path / "template.docx")
+    build_template(path)
+
+    def broken(_):
+        raise ValueError("boom")
+    monkeypatch.setattr("backend.analyzer.scan_docx_variables", broken)
+    assert analyze_document(path) == analyze_document_docx(path)
@@ -0,0 +1,30 @@
+from backend.analyzer import analyze_document
+from backend.benchmarks import corpus
+from backend.benchmarks.run import compare
+from backend.pdf_text import _extract_pages
+
+def test_template_has_requested_variables(tmp_path):
+    path = corpus.build_template(str(tmp_path / "t.docx"), variables=30, rows=10)
+    assert sorted(v["id"] for v in analyze_document(path)) == sorted(f"v{i}" for i in range(1, 31))
+
+def test_pdf_pages_are_readable(tmp_path):
+    path = corpus.build_pdf(str(tmp_path / "m.pdf"), pages=3, lines_per_page=5)
+    pages = _extract_pages(path, range(3))
+    assert len(pages) == 3 and all(len(text.splitlines()) == 5 for _, text in pages)
+
+def test_compare_flags_regressions_above_threshold_and_noise_floor():
+    baseline = {"results": {"slow": {"median": 0.100}, "fast": {"median": 0.001}, "better": {"median": 0.2}}}
+    current = {"results": {"slow": {"median": 0.150}, "fast": {"median": 0.002}, "better": {"median": 0.1},
+                           "new": {"median": 1.0}}}
+    verdicts = {name: verdict for name, _, _, _, verdict in compare(current, baseline, threshold=0.25)}
+    assert verdicts == {"slow": "REGRESSION", "fast": "ok", "better": "improved"}
+
+def test_importtime_output_is_parsed_with_depth():
+    from backend.benchmarks.startup import parse_importtime
+
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   backend.streaming\n"
+        "import time:      5000 |       5120 | backend.main\n"
+    )
+    assert parse_importtime(stderr) == [("backend.streaming", 120, 120, 1), ("backend.main", 5000, 5120, 0)]
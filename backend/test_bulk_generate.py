@@ -0,0 +1,40 @@
+import io
+import json
+import asyncio
+import zipfile
+import docx
+from concurrent.futures import ProcessPoolExecutor
+from fastapi.testclient import TestClient
+from backend.bulk_generate import stream_bulk_zip, archive_names
+from backend.main import app
+
+def make_template(path):
+    doc = docx.Document()
+    doc.add_paragraph("Supplier: {{ v1 }}")
+    doc.save(str(path))
+
+async def collect(stream):
+    return b"".join([chunk async for chunk in stream])
+
+def test_bulk_zip_reports_item_errors(tmp_path):
+    template = tmp_path / "form.docx"
+    make_template(template)
+    items = [{"v1": "Acme"}, None, {"v1": "Beta"}]
+
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        data = asyncio.run(collect(stream_bulk_zip(str(template), items, names=["acme", "", "acme"], executor=pool)))
+
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    manifest = json.loads(archive.read("manifest.json"))
+    assert manifest["succeeded"] == 2 and manifest["failed"] == 1
+    assert [item["status"] for item in manifest["items"]] == ["ok", "error", "ok"]
+    assert sorted(archive.namelist()) == ["acme.docx", "acme_2.docx", "manifest.json"]
+    doc = docx.Document(io.BytesIO(archive.read("acme_2.docx")))
+    assert doc.paragraphs[0].text == "Supplier: Beta"
+
+def test_archive_names_strip_paths():
+    assert archive_names("form.docx", 2, ["../../etc/passwd", None]) == ["passwd.docx", "form_002.docx"]
+
+def test_bulk_endpoint_validation():
+    client = TestClient(app)
+    assert client.post("/generate/bulk", json={"filename": "missing.docx", "items": [{}]}).status_code == 404
@@ -0,0 +1,78 @@
+import os
+import zipfile
+
+from fastapi.testclient import TestClient
+
+from backend.catalog import Catalog, page_count
+from backend.benchmarks.corpus import build_pdf
+from backend.main import app, template_catalog
+
+def write(path, size, mtime):
+    path.write_bytes(b"x" * size)
+    os.utime(path, (mtime, mtime))
+
+def test_pages_sort_and_prefix(tmp_path):
+    for i, name in enumerate(["beta.txt", "Alpha.txt", "alpine.txt", "gamma.txt", "~$lock.txt"]):
+        write(tmp_path / name, size=100 * (5 - i), mtime=1_700_000_000 + i)
+    catalog = Catalog(str(tmp_path))
+
+    total, items = catalog.page(limit=2)
+    assert total == 4
+    assert [i["name"] for i in items] == ["Alpha.txt", "alpine.txt"]
+    assert catalog.page(offset=2, limit=2)[1][0]["name"] == "beta.txt"
+    assert [i["name"] for i in catalog.page(sort="date", order="desc")[1]] == ["gamma.txt", "alpine.txt", "Alpha.txt", "beta.txt"]
+    assert catalog.page(sort="size")[1][0]["size"] == "200 B"
+
+    assert [i["name"] for i in catalog.page(prefix="al")[1]] == ["Alpha.txt", "alpine.txt"]
+    assert [i["name"] for i in catalog.page(prefix="AL", order="desc")[1]] == ["alpine.txt", "Alpha.txt"]
+    assert catalog.page(prefix="al", sort="size", limit=1)[0] == 2
+    item = catalog.page(prefix="gamma")[1][0]
+    assert item["format"] == "TXT" and item["author"] == "System" and item["pages"] is None
+
+def test_refresh_is_incremental(tmp_path):
+    write(tmp_path / "a.txt", 10, 1_700_000_000)
+    catalog = Catalog(str(tmp_path), refresh_seconds=3600)
+    catalog.page()
+    entry = catalog._entries["a.txt"]
+    catalog.page()
+    assert catalog.scans == 1  # folder unchanged within the interval
+
+    write(tmp_path / "b.txt", 20, 1_700_000_000)
+    os.utime(tmp_path, (1_700_000_100, 1_700_000_100))
+    total, _ = catalog.page()
+    assert total == 2 and catalog.scans == 2
+    assert catalog._entries["a.txt"] is entry  # unchanged file keeps its entry and details
+
+def test_listing_never_computes_details(tmp_path):
+    write(tmp_path / "a.docx", 10, 1_700_000_000)
+    write(tmp_path / "b.docx", 10, 1_700_000_000)
+    counted = []
+    catalog = Catalog(str(tmp_path), count_variables=lambda path: counted.append(path) or 3)
+    assert [i["variables"] for i in catalog.page()[1]] == [None, None]
+    assert not counted
+
+    assert catalog.warm(str(tmp_path / "a.docx")) == 1
+    assert [i["variables"] for i in catalog.page()[1]] == [3, None]
+    assert catalog.warm() == 1 and catalog.warm() == 0
+    assert len(counted) == 2
+
+def test_page_counts(tmp_path):
+    build_pdf(str(tmp_path / "doc.pdf"), pages=3, lines_per_page=2)
+    with zipfile.ZipFile(tmp_path / "doc.docx", "w") as package:
+        package.writestr("docProps/app.xml", "<Properties><Pages>7</Pages></Properties>")
+    assert page_count(str(tmp_path / "doc.pdf")) == 3
+    assert page_count(str(tmp_path / "doc.docx")) == 7
+
+def test_listing_endpoints_paginate():
+    client = TestClient(app)
+    response = client.get("/contracts", params={"limit": 2, "sort": "size", "order": "desc"})
+    assert response.status_code == 200
+    assert len(response.json()) == min(2, int(response.headers["x-total-count"]))
+
+    templates = client.get("/templates").json()
+    assert templates and all(t["name"].endswith(".docx") and not t["name"].startswith("~$") for t in templates)
+    template_catalog.warm(templates[0]["id"])
+    warmed = client.get("/templates", params={"prefix": templates[0]["id"]}).json()[0]
+    assert warmed["variables"] == len(client.post("/analyze", json={"filename": templates[0]["id"]}).json())
+    assert template_catalog.page(prefix="~$")[0] == 0
+    assert client.get("/policies", params={"sort": "pages"}).status_code == 400
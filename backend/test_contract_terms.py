@@ -0,0 +1,121 @@
+import json
+import asyncio
+from unittest.mock import MagicMock, patch
+from backend.llm_cache import LLMResponseCache
+from backend.contract_terms import extract_many, split_segments, merge_segment_terms
+
+def test_extract_many_bounds_concurrency_and_reports_errors(tmp_path):
+    for i in range(5):
+        (tmp_path / f"c{i}.txt").write_text(f"Contract {i}: price {i * 10} EUR", encoding="utf-8")
+    paths = [str(tmp_path / f"c{i}.txt") for i in range(5)] + [str(tmp_path / "missing.txt")]
+
+    in_flight = 0
+    peak = 0
+
+    async def create(**params):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        completion = MagicMock()
+        completion.choices[0].message.content = json.dumps({"Price": params["messages"][0]["content"][-10:]})
+        return completion
+
+    client = MagicMock()
+    client.chat.completions.create = create
+
+    async def run():
+        return [r async for r in extract_many(client, LLMResponseCache(), paths, ["Price"], concurrency=2)]
+
+    results = asyncio.run(run())
+    assert peak == 2
+    assert len(results) == 6
+    by_name = {r["filename"]: r for r in results}
+    assert by_name["missing.txt"]["status"] == "error"
+    assert by_name["missing.txt"]["error"] == "Contract not found"
+    assert by_name["c3.txt"]["status"] == "ok"
+    assert "30 EUR" in by_name["c3.txt"]["terms"]["Price"]
+
+def test_segments_share_the_batch_concurrency_limit(tmp_path):
+    content = "\n".join(f"Clause {i}: " + "lorem ipsum " * 20 for i in range(100))
+    paths = []
+    for i in range(3):
+        (tmp_path / f"long{i}.txt").write_text(f"Contract {i}\n" + content, encoding="utf-8")
+        paths.append(str(tmp_path / f"long{i}.txt"))
+    in_flight = peak = calls = 0
+
+    async def create(**params):
+        nonlocal in_flight, peak, calls
+        in_flight += 1
+        calls += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        completion = MagicMock()
+        completion.choices[0].message.content = json.dumps({"Price": "Not found"})
+        return completion
+
+    client = MagicMock()
+    client.chat.completions.create = create
+
+    async def run():
+        with patch("backend.contract_terms.split_segments", lambda c: split_segments(c, size=2000, overlap=300)):
+            return [r async for r in extract_many(client, LLMResponseCache(), paths, ["Price"], concurrency=2)]
+
+    assert all(r["status"] == "ok" for r in asyncio.run(run()))
+    assert calls > 3 and peak == 2
+
+def test_split_segments_overlap_and_cover_content():
+    content = "\n".join(f"Clause {i}: " + "lorem ipsum " * 20 for i in range(100))
+    segments = split_segments(content, size=2000, overlap=300)
+    assert len(segments) > 1
+    assert all(len(seg) <= 2000 for seg in segments)
+    assert segments[0].startswith("Clause 0:")
+    assert segments[-1].endswith(content[-50:])
+    # Consecutive segments overlap
+    assert segments[1][:100] in segments[0]
+
+def test_merge_prefers_most_specific_hit():
+    terms = ["Price", "Payment Terms", "Termination Clause"]
+    merged = merge_segment_terms(terms, [
+        {"Price": "As agreed", "Payment Terms": "Not found", "Termination Clause": "Not found"},
+        {"price": "EUR 120,000 per year", "Payment Terms": "Net 30 days", "Termination Clause": "Not found."},
+        {"Price": "EUR 99 per unit", "Payment Terms": "Net 45 days"},
+    ])
+    assert merged == {
+        "Price": "EUR 120,000 per year",
+        "Payment Terms": "Net 30 days",  # tie on specificity: earliest segment wins
+        "Termination Clause": "Not found",
+    }
+
+def test_segments_fit_the_token_budget():
+    from backend.prompt_budget import count_tokens
+    content = "\n".join(f"Clause {i}: " + "lorem ipsum " * 20 for i in range(100))
+    segments = split_segments(content, size=8000, overlap=300, max_tokens=300)
+    assert len(segments) > 1
+    assert all(count_tokens(seg) <= 300 for seg in segments)
+    assert segments[-1].endswith(content[-50:])
+
+def test_invalid_segment_reply_does_not_fail_the_contract(tmp_path):
+    content = "\n".join(f"Clause {i}: " + "lorem ipsum " * 20 for i in range(100))
+    (tmp_path / "long.txt").write_text("Price EUR 500\n" + content, encoding="utf-8")
+    replies = iter([json.dumps({"Price": "EUR 500"})])
+
+    async def create(**params):
+        completion = MagicMock()
+        # First segment answers; every other segment replies with something unusable
+        completion.choices[0].message.content = next(replies, "not json at all")
+        return completion
+
+    client = MagicMock()
+    client.chat.completions.create = create
+
+    async def run():
+        with patch("backend.contract_terms.split_segments", lambda c: split_segments(c, size=2000, overlap=300)):
+            return [r async for r in extract_many(client, LLMResponseCache(), [str(tmp_path / "long.txt")],
+                                                  ["Price", "Term"], concurrency=1)]
+
+    [result] = asyncio.run(run())
+    assert result["status"] == "ok"
+    assert result["terms"] == {"Price": "EUR 500", "Term": "Not found"}
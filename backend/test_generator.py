@@ -0,0 +1,60 @@
+import io
+import docx
+import zipfile
+from unittest.mock import patch
+import backend.generator as generator
+
+def make_template(templates_dir, name):
+    doc = docx.Document()
+    doc.add_paragraph("Supplier: {{ v1 }}")
+    table = doc.add_table(rows=1, cols=2)
+    table.rows[0].cells[0].text = "Budget"
+    table.rows[0].cells[1].text = "{{ V2 }}"
+    doc.save(str(templates_dir / name))
+
+def rendered_text(data):
+    doc = docx.Document(io.BytesIO(data))
+    return [p.text for p in doc.paragraphs] + [c.text for row in doc.tables[0].rows for c in row.cells]
+
+def test_render_in_memory_reuses_compiled_template(tmp_path):
+    make_template(tmp_path, "form.docx")
+    with patch.object(generator, "TEMPLATES_DIR", str(tmp_path)):
+        first = generator.render_document("form.docx", {"v1": "Acme Sons", "v2": "EUR 5,000"})
+        compiled = len(generator._compiled_parts)
+        second = generator.render_document("form.docx", {"v1": "Beta Ltd", "v2": "EUR 7,500"})
+
+    assert zipfile.is_zipfile(io.BytesIO(first))
+    assert "Supplier: Acme Sons" in rendered_text(first)
+    assert "EUR 5,000" in rendered_text(first)
+    assert "Supplier: Beta Ltd" in rendered_text(second)
+    assert len(generator._compiled_parts) == compiled
+
+def test_saved_outputs_do_not_collide(tmp_path):
+    with patch.object(generator, "OUTPUT_DIR", str(tmp_path)):
+        paths = {generator.save_output("form.docx", b"data") for _ in range(5)}
+    assert len(paths) == 5
+
+def test_fast_body_splice_matches_docxtpl(tmp_path):
+    # Guards the private docxtpl/python-docx internals used by the fast path (see the pins in requirements.txt)
+    import os
+    from docxtpl import DocxTemplate
+    make_template(tmp_path, "form.docx")
+    shipped = os.path.join(os.path.dirname(generator.__file__), "templates")
+    paths = [str(tmp_path / "form.docx")] + [
+        os.path.join(shipped, n) for n in sorted(os.listdir(shipped)) if n.endswith(".docx") and not n.startswith("~$")
+    ][:1]
+    answers = {f"v{i}": f"Answer {i} & <more>" for i in range(1, 60)}
+
+    for path in paths:
+        with patch.object(DocxTemplate, "map_tree", side_effect=AssertionError("fell back to docxtpl map_tree")):
+            cached = generator.render_template_file(path, answers)
+        plain = DocxTemplate(path)
+        plain.render(generator.expand_context(answers))
+        buffer = io.BytesIO()
+        plain.save(buffer)
+
+        def document_xml(data):
+            with zipfile.ZipFile(io.BytesIO(data)) as package:
+                return package.read("word/document.xml")
+
+        assert document_xml(cached) == document_xml(buffer.getvalue()), os.path.basename(path)
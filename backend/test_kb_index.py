@@ -0,0 +1,40 @@
+import os
+from unittest.mock import patch
+from backend.kb_index import KnowledgeBaseIndex
+
+def test_only_changed_files_are_reparsed(tmp_path):
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    (kb / "a.txt").write_text("alpha", encoding="utf-8")
+    (kb / "b.txt").write_text("bravo", encoding="utf-8")
+    index_dir = str(tmp_path / "index")
+
+    index = KnowledgeBaseIndex(str(kb), index_dir)
+    content = index.get_content()
+    assert "--- File: a.txt ---\nalpha" in content
+    assert "--- File: b.txt ---\nbravo" in content
+
+    with patch("backend.kb_index.read_file") as reader:
+        assert index.get_content() is content
+        reader.assert_not_called()
+
+        reader.return_value = "bravo v2"
+        (kb / "b.txt").write_text("bravo v2", encoding="utf-8")
+        os.utime(kb / "b.txt", ns=(0, os.stat(kb / "b.txt").st_mtime_ns + 1))
+        assert "bravo v2" in index.get_content()
+        reader.assert_called_once()
+
+    (kb / "a.txt").unlink()
+    assert "alpha" not in index.get_content()
+
+def test_index_is_persisted(tmp_path):
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    (kb / "a.txt").write_text("alpha", encoding="utf-8")
+    index_dir = str(tmp_path / "index")
+    KnowledgeBaseIndex(str(kb), index_dir).refresh()
+
+    with patch("backend.kb_index.read_file") as reader:
+        reloaded = KnowledgeBaseIndex(str(kb), index_dir)
+        assert "alpha" in reloaded.get_content()
+        reader.assert_not_called()
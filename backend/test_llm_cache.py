@@ -0,0 +1,58 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from backend.llm_cache import LLMResponseCache, cached_completion
+
+def fake_client(content):
+    completion = MagicMock()
+    completion.choices[0].message.content = content
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(return_value=completion)
+    return client
+
+def test_key_normalizes_messages():
+    a = LLMResponseCache.make_key("grok-3", [{"role": "user", "content": "Terms:\r\nPrice  \n"}], content_hash="h1")
+    b = LLMResponseCache.make_key("grok-3", [{"role": "user", "content": "Terms:\nPrice"}], content_hash="h1")
+    c = LLMResponseCache.make_key("grok-3", [{"role": "user", "content": "Terms:\nPrice"}], content_hash="h2")
+    assert a == b
+    assert a != c
+
+def test_hit_miss_bypass_and_persistence(tmp_path):
+    db_path = str(tmp_path / "llm.sqlite3")
+    cache = LLMResponseCache(maxsize=2, ttl=60, db_path=db_path)
+    client = fake_client('{"Price": "100"}')
+    params = {"model": "grok-3", "messages": [{"role": "user", "content": "extract"}]}
+
+    assert asyncio.run(cached_completion(client, cache, **params)) == ('{"Price": "100"}', "MISS")
+    assert asyncio.run(cached_completion(client, cache, **params))[1] == "HIT"
+    assert asyncio.run(cached_completion(client, cache, bypass=True, **params))[1] == "BYPASS"
+    assert client.chat.completions.create.await_count == 2
+
+    # A new process (empty memory tier) is served from SQLite
+    restarted = LLMResponseCache(maxsize=2, ttl=60, db_path=db_path)
+    assert asyncio.run(cached_completion(client, restarted, **params))[1] == "HIT"
+
+def test_ttl_and_size_eviction():
+    cache = LLMResponseCache(maxsize=2, ttl=-1)
+    cache.set("a", "1")
+    assert cache.get("a") is None  # already expired
+
+    cache = LLMResponseCache(maxsize=2, ttl=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    assert cache.get("a") is None
+    assert cache.get("c") == "c"
+
+def test_sqlite_tier_is_pruned_every_n_writes(tmp_path):
+    import sqlite3
+    db_path = str(tmp_path / "llm.sqlite3")
+    cache = LLMResponseCache(maxsize=2, ttl=60, db_path=db_path, max_db_rows=2, prune_every=3)
+
+    def rows():
+        with sqlite3.connect(db_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    for key in ("a", "b", "c", "d"):
+        cache.set(key, key)
+        if key == "b":
+            assert rows() == 2
+    assert rows() == 3  # pruned to 2 on the third write, then one more
@@ -0,0 +1,60 @@
+import json
+import asyncio
+
+from openai import AsyncOpenAI
+
+from backend.loadtest.stub_upstream import create_app, REPLY_TEXT
+from backend.loadtest.driver import percentile, summarize, format_row
+
+def stub_client(**options):
+    try:
+        import httpx2 as httpx
+    except ImportError:
+        import httpx
+    transport = httpx.ASGITransport(app=create_app(latency=0, tokens_per_second=0, **options))
+    return AsyncOpenAI(
+        api_key="test", base_url="http://stub/v1", max_retries=0,
+        http_client=httpx.AsyncClient(transport=transport, base_url="http://stub"),
+    )
+
+def test_stub_speaks_the_openai_protocol():
+    async def scenario():
+        client = stub_client()
+        plain = await client.chat.completions.create(model="grok-3", messages=[{"role": "user", "content": "hi"}])
+        json_mode = await client.chat.completions.create(
+            model="grok-3", messages=[{"role": "user", "content": "hi"}], response_format={"type": "json_object"}
+        )
+        stream = await client.chat.completions.create(
+            model="grok-3", messages=[{"role": "user", "content": "hi"}], stream=True,
+            stream_options={"include_usage": True},
+        )
+        parts, usage = [], None
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            usage = chunk.usage or usage
+        return plain, json_mode, "".join(parts), usage
+
+    plain, json_mode, streamed, usage = asyncio.run(scenario())
+    assert plain.choices[0].message.content == REPLY_TEXT
+    assert plain.usage.completion_tokens > 0
+    assert "extracted_data" in json.loads(json_mode.choices[0].message.content)
+    assert streamed == REPLY_TEXT
+    assert usage.prompt_tokens > 0
+
+def test_stub_error_rate():
+    async def scenario():
+        try:
+            await stub_client(error_rate=1.0).chat.completions.create(model="grok-3", messages=[])
+        except Exception as e:
+            return e
+
+    assert getattr(asyncio.run(scenario()), "status_code", None) == 500
+
+def test_summary_percentiles():
+    samples = [(i / 100, i % 10 != 0) for i in range(1, 101)]
+    summary = summarize("/chat", 4, samples, elapsed=10.0, exceptions={"ReadTimeout": 3})
+    assert summary["p50"] == 0.5 and summary["p95"] == 0.95 and summary["p99"] == 0.99
+    assert summary["errors"] == 10 and summary["throughput"] == 10.0
+    assert format_row(summary).endswith("ReadTimeout x3")
+    assert percentile([], 50) is None
@@ -53,5 +53,13 @@ def test_endpoints():
     assert response.status_code == 404
     print("[PASS] POST /generate (404 handled)")
 
+def test_batch_concurrency_is_bounded():
+    import json
+    from backend.main import CONTRACT_BATCH_MAX_CONCURRENCY
+    assert client.post("/contracts/extract-batch", json={"filenames": [], "concurrency": 0}).status_code == 400
+    response = client.post("/contracts/extract-batch", json={"filenames": [], "concurrency": 10000})
+    start = json.loads(response.text.splitlines()[0])
+    assert start["concurrency"] == CONTRACT_BATCH_MAX_CONCURRENCY
+
 if __name__ == "__main__":
     test_endpoints()
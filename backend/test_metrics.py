@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+from backend.metrics import Counter, Histogram, Registry, record_usage, LLM_TOKENS, current_endpoint
+
+def test_histogram_exposition_is_cumulative():
+    histogram = Histogram("test_seconds", "Test latency", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, stage="llm")
+    text = histogram.expose()
+
+    assert "# TYPE test_seconds histogram" in text
+    assert 'test_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{stage="llm",le="1"} 3' in text
+    assert 'test_seconds_bucket{stage="llm",le="+Inf"} 4' in text
+    assert 'test_seconds_count{stage="llm"} 4' in text
+    assert 'test_seconds_sum{stage="llm"} 6.05' in text
+
+def test_counter_labels_are_checked_and_escaped():
+    counter = Counter("test_total", "Test counter", ("endpoint",))
+    counter.inc(endpoint='/a"b')
+    counter.inc(2, endpoint='/a"b')
+    assert 'test_total{endpoint="/a\\"b"} 3' in counter.expose()
+    try:
+        counter.inc(path="/x")
+        assert False, "unknown label accepted"
+    except ValueError:
+        pass
+
+def test_collectors_export_numeric_stats_as_gauges():
+    registry = Registry()
+    registry.register_collector(lambda: {"llm": {"hits": 3, "hit_rate": 0.75, "persistent": True, "path": "x"}})
+    text = registry.expose()
+    assert 'procure_cache_hits{cache="llm"} 3' in text
+    assert 'procure_cache_hit_rate{cache="llm"} 0.75' in text
+    assert "persistent" not in text and "path" not in text
+
+def test_usage_is_recorded_for_current_endpoint():
+    token = current_endpoint.set("/test-usage")
+    try:
+        record_usage(SimpleNamespace(usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30)))
+        record_usage(SimpleNamespace(usage=None))
+    finally:
+        current_endpoint.reset(token)
+    assert LLM_TOKENS.value(endpoint="/test-usage", kind="prompt") == 120
+    assert LLM_TOKENS.value(endpoint="/test-usage", kind="completion") == 30
@@ -0,0 +1,33 @@
+import os
+import time
+from backend.output_store import OutputStore
+
+def test_identical_requests_are_served_from_store(tmp_path):
+    template = tmp_path / "form.docx"
+    template.write_bytes(b"template v1")
+    store = OutputStore(str(tmp_path / "store"))
+    renders = []
+
+    def render():
+        renders.append(1)
+        return b"doc %d" % len(renders)
+
+    assert store.get_or_render(str(template), {"v1": "a", "v2": "b"}, render) == (b"doc 1", "MISS")
+    # Key order does not matter
+    assert store.get_or_render(str(template), {"v2": "b", "v1": "a"}, render) == (b"doc 1", "HIT")
+
+    # A new template version renders again
+    template.write_bytes(b"template v2 (edited)")
+    assert store.get_or_render(str(template), {"v1": "a", "v2": "b"}, render) == (b"doc 2", "MISS")
+
+def test_sweep_applies_age_then_size_limits(tmp_path):
+    store = OutputStore(str(tmp_path), max_bytes=250, max_age_days=1)
+    now = time.time()
+    ages = {"old": 3 * 86400, "a": 300, "b": 200, "c": 100}
+    for name, age in ages.items():
+        path = tmp_path / f"{name}.docx"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (now - age, now - age))
+
+    assert store.sweep() == 2
+    assert sorted(os.listdir(tmp_path)) == ["b.docx", "c.docx"]
@@ -0,0 +1,48 @@
+from backend.pdf_text import PdfTextCache
+
+def write_pdf(path, page_texts):
+    """Writes a minimal PDF with one line of Helvetica text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    path.write_bytes(out)
+
+def test_budget_stops_early_and_pages_are_cached(tmp_path):
+    pdf = tmp_path / "manual.pdf"
+    write_pdf(pdf, [f"Section {i} text" for i in range(10)])
+    cache = PdfTextCache(workers=1)
+
+    assert cache.extract(str(pdf), max_chars=20) == "Section 0 text\nSecti"
+    assert cache.stats()["pages_extracted"] == 2
+
+    full = cache.extract(str(pdf))
+    assert full.splitlines() == [f"Section {i} text" for i in range(10)]
+    # Only the pages not read by the budgeted call were parsed
+    assert cache.stats()["pages_extracted"] == 10
+
+def test_parallel_extraction_matches_sequential(tmp_path):
+    pdf = tmp_path / "manual.pdf"
+    write_pdf(pdf, [f"Clause {i}" for i in range(12)])
+    parallel = PdfTextCache(workers=2, parallel_min_pages=4, parallel_min_seconds=0)
+    try:
+        assert parallel.extract(str(pdf)) == PdfTextCache(workers=1).extract(str(pdf))
+    finally:
+        parallel.shutdown()
@@ -0,0 +1,51 @@
+import os
+import time
+import asyncio
+
+from backend.prewarm import Prewarmer
+
+def test_files_are_queued_once_settled(tmp_path):
+    prewarmer = Prewarmer()
+    prewarmer.watch("doc", str(tmp_path), lambda path: None)
+    (tmp_path / "old.txt").write_text("already here")
+    prewarmer.poll()
+    assert prewarmer.stats()["queued"] == 0  # existing files only with initial=True
+
+    (tmp_path / "new.txt").write_text("half")
+    (tmp_path / "~$lock.txt").write_text("ignored")
+    prewarmer.poll()
+    assert prewarmer.stats()["pending"] == 1 and prewarmer.stats()["queued"] == 0
+
+    (tmp_path / "new.txt").write_text("half written")  # still being copied
+    prewarmer.poll()
+    assert prewarmer.stats()["pending"] == 1
+    prewarmer.poll()
+    assert prewarmer.stats() | {"polls": 0} == {"queued": 1, "pending": 0, "warmed": 0, "failed": 0, "polls": 0}
+
+def test_worker_warms_new_files_and_folders(tmp_path):
+    docs, kb = tmp_path / "docs", tmp_path / "kb"
+    docs.mkdir()
+    (kb / "sub").mkdir(parents=True)
+    (docs / "a.txt").write_text("a")
+    calls = []
+
+    async def fake_extraction(client):
+        await asyncio.sleep(0)
+        return client
+
+    prewarmer = Prewarmer(poll_seconds=0.02, pause_seconds=0, client_factory=lambda: "client")
+    prewarmer.watch("doc", str(docs), lambda path: calls.append((os.path.basename(path), prewarmer.run_async(fake_extraction))))
+    prewarmer.watch("kb", str(kb), lambda path: calls.append(("kb", path)), recursive=True, per_file=False)
+    prewarmer.watch("broken", str(docs), lambda path: 1 / 0)
+    prewarmer.start(initial=True)
+    try:
+        (kb / "sub" / "policy.txt").write_text("p")
+        deadline = time.time() + 5
+        while len(calls) < 2 and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        prewarmer.stop()
+
+    assert ("a.txt", "client") in calls
+    assert ("kb", str(kb)) in calls
+    assert prewarmer.stats()["failed"] >= 1
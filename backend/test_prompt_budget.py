@@ -0,0 +1,54 @@
+from backend.prompt_budget import build_messages, context_allowance, fit_context, count_tokens, trim_history
+
+def turns(n, size=400):
+    history = []
+    for i in range(n):
+        history.append({"role": "user", "content": f"Question {i} " + "x" * size})
+        history.append({"role": "assistant", "content": f"Answer {i} " + "y" * size})
+    return history
+
+def test_history_is_trimmed_oldest_first_with_summary():
+    history = turns(20)
+    messages = build_messages("System prompt", "Latest question", history, max_tokens=2000, max_history_tokens=1000)
+
+    assert messages[0]["content"] == "System prompt"
+    assert messages[-1] == {"role": "user", "content": "Latest question"}
+    kept = messages[1:-1]
+    assert kept[-1] == history[-1]
+    assert kept[0]["role"] == "system" and "Earlier in this conversation" in kept[0]["content"]
+    assert sum(count_tokens(m["content"]) + 4 for m in kept) <= 1000
+
+def test_short_history_is_kept_whole():
+    history = turns(2, size=10)
+    assert trim_history(history, 1000) == history
+
+def test_context_allowance_reserves_room_for_history():
+    history = turns(10)
+    allowance = context_allowance(5000, "system", "question", history=history, max_tokens=3000, max_history_tokens=1000)
+    assert allowance < 3000 - 1000
+    assert context_allowance(500, "system", "question", history=history, max_tokens=3000) == 500
+
+def test_fit_context_respects_budget():
+    text = "word " * 1000
+    fitted = fit_context(text, 100)
+    assert 0 < count_tokens(fitted) <= 100
+    assert fit_context("short", 100) == "short"
+
+def test_fit_items_keeps_every_item():
+    from backend.prompt_budget import fit_items
+    texts = ["v1: short", "v2: " + "long context " * 200, "v3: " + "other row " * 100]
+    fitted = fit_items(texts, 200)
+    assert fitted[0] == "v1: short"
+    assert all(t.startswith(f"v{i + 1}") for i, t in enumerate(fitted))
+    assert sum(count_tokens(t) for t in fitted) <= 200
+
+def test_fit_items_drops_trailing_items_when_budget_is_tiny():
+    from backend.prompt_budget import fit_items
+    texts = [f"v{i}: " + "row context " * 20 for i in range(50)]
+    fitted = fit_items(texts, 60, omitted="({n} more variables not shown)")
+    assert fitted[-1].endswith("more variables not shown)")
+    kept = fitted[:-1]
+    assert kept and all(t.startswith(f"v{i}:") and t.strip() for i, t in enumerate(kept))
+    assert fitted[-1] == f"({50 - len(kept)} more variables not shown)"
+    assert sum(count_tokens(t) for t in fitted) <= 60
+    assert fit_items(texts, -10, omitted="({n} more)") == ["(50 more)"]
@@ -0,0 +1,51 @@
+from backend.kb_index import KnowledgeBaseIndex
+from backend.retrieval import RetrievalIndex, split_chunks, cited_sources
+
+def test_tabular_chunks_repeat_header():
+    text = "supplier,revenue\n" + "\n".join(f"S{i},{i * 100}" for i in range(200))
+    chunks = split_chunks(text, tabular=True, chunk_chars=200)
+    assert len(chunks) > 1
+    assert all(chunk.startswith("supplier,revenue\n") for chunk in chunks)
+
+def test_search_respects_budget_and_cites_sources(tmp_path):
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    (kb / "travel.txt").write_text("\n".join(["Travel expenses require manager approval."] * 40), encoding="utf-8")
+    (kb / "it.txt").write_text("\n".join(["Laptops are refreshed every three years."] * 40), encoding="utf-8")
+    index = RetrievalIndex(KnowledgeBaseIndex(str(kb), str(tmp_path / "index")), chunk_chars=300)
+
+    passages = index.search("who approves travel expenses", k=3, token_budget=200)
+    assert passages
+    assert cited_sources(passages) == ["travel.txt"]
+    assert sum(len(p["text"]) // 4 + 1 for p in passages) <= 200
+
+    # New files are picked up incrementally
+    (kb / "fleet.txt").write_text("Fleet vehicles are leased.", encoding="utf-8")
+    assert cited_sources(index.search("leased fleet vehicles", k=1, token_budget=200)) == ["fleet.txt"]
+
+def test_concurrent_refreshes_while_files_change(tmp_path):
+    import threading
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    index = RetrievalIndex(KnowledgeBaseIndex(str(kb), str(tmp_path / "index")))
+    errors = []
+
+    def refresh_repeatedly():
+        for _ in range(50):
+            try:
+                index.refresh()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=refresh_repeatedly) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for i in range(50):
+        (kb / f"doc{i}.txt").write_text(f"Policy {i}", encoding="utf-8")
+        if i % 3 == 0:
+            (kb / f"doc{i // 2}.txt").unlink(missing_ok=True)
+    for thread in threads:
+        thread.join()
+    index.refresh()
+    assert not errors
+    assert sorted(index._files) == sorted(p.name for p in kb.iterdir())
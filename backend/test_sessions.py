@@ -0,0 +1,56 @@
+import time
+
+from backend.sessions import Session, SessionStore, SQLiteSessionBackend
+
+def test_resolve_creates_and_reuses_sessions():
+    store = SessionStore(maxsize=10, idle_ttl=60)
+    session = store.resolve(None)
+    session.add_turn("Hello", "Hi there")
+    store.save(session)
+
+    again = store.resolve(session.id)
+    assert again is session
+    assert again.history == [{"role": "user", "content": "Hello"}, {"role": "assistant", "content": "Hi there"}]
+    assert store.resolve("unknown").id != session.id
+
+def test_lru_and_idle_eviction():
+    store = SessionStore(maxsize=2, idle_ttl=60)
+    first, second = store.resolve(), store.resolve()
+    store.resolve(first.id)  # touch, so second is the oldest
+    store.resolve()
+    assert store.get(second.id) is None
+    assert store.get(first.id) is first
+
+    first.last_seen = time.time() - 120
+    assert store.evict_idle() == 1
+    assert store.get(first.id) is None
+
+def test_history_is_trimmed_to_budget():
+    session = Session("s")
+    for i in range(50):
+        session.add_turn(f"Question {i} " + "x" * 400, "Answer " + "y" * 400, max_tokens=1000)
+    assert session.history[-1]["content"].startswith("Answer")
+    assert session.history[0]["role"] == "system"
+    assert len(session.history) < 20
+
+def test_context_is_keyed_by_fingerprint():
+    session = Session("s")
+    session.set_context("policy", ["p.pdf", 1, 10], "text")
+    assert session.get_context("policy", ["p.pdf", 1, 10]) == "text"
+    assert session.get_context("policy", ["p.pdf", 2, 10]) is None
+
+def test_sqlite_backend_survives_restart(tmp_path):
+    db = str(tmp_path / "sessions.db")
+    store = SessionStore(backend=SQLiteSessionBackend(db))
+    session = store.resolve()
+    session.add_turn("Hello", "Hi")
+    session.set_context("contract", ["c.docx", 1, 2], "Contract text")
+    store.save(session)
+
+    restarted = SessionStore(backend=SQLiteSessionBackend(db))
+    loaded = restarted.get(session.id)
+    assert loaded.history == session.history
+    assert loaded.get_context("contract", ["c.docx", 1, 2]) == "Contract text"
+
+    restarted.delete(session.id)
+    assert SessionStore(backend=SQLiteSessionBackend(db)).get(session.id) is None
@@ -0,0 +1,60 @@
+import os
+import pandas as pd
+from backend.sheet_cache import SheetCache, sniff_delimiter
+
+def write_csv(path, rows):
+    path.write_text("Supplier;Category;Sales;Share\n" + "\n".join(rows) + "\n", encoding="utf-8")
+
+def test_columnar_cache_round_trips_csv(tmp_path):
+    source = tmp_path / "sales.csv"
+    write_csv(source, ["Alpha Süpplies;IT;100;0.5", "Bravo;;250;", "Charlie;Logistics;75;0.25"])
+    expected = pd.read_csv(source, sep=None, engine="python").to_csv(index=False)
+
+    cache = SheetCache(str(tmp_path / "cache"))
+    assert sniff_delimiter(str(source)) == ";"
+    assert cache.load(str(source)).frame().to_csv(index=False) == expected
+
+    # A fresh process reads the columns back from disk without reparsing
+    table = SheetCache(str(tmp_path / "cache")).load(str(source))
+    assert table.frame().to_csv(index=False) == expected
+    assert table.frame(["Sales"]).columns.tolist() == ["Sales"]
+    summary = {c["name"]: c for c in table.summary()["columns"]}
+    assert (summary["Sales"]["min"], summary["Sales"]["max"]) == (75.0, 250.0)
+
+def test_columnar_cache_invalidated_on_change(tmp_path):
+    source = tmp_path / "sales.csv"
+    write_csv(source, ["Alpha;IT;100;0.5"])
+    cache = SheetCache(str(tmp_path / "cache"))
+    assert cache.load(str(source)).nrows == 1
+
+    write_csv(source, ["Alpha;IT;100;0.5", "Bravo;IT;200;0.1"])
+    os.utime(source, ns=(os.stat(source).st_atime_ns, os.stat(source).st_mtime_ns + 10**9))
+    assert cache.load(str(source)).nrows == 2
+    assert cache.stats()["conversions"] == 2
+
+def test_slow_conversion_does_not_block_other_files(tmp_path, monkeypatch):
+    import threading
+    import backend.sheet_cache as sheet_cache_module
+    slow, fast = tmp_path / "slow.csv", tmp_path / "fast.csv"
+    write_csv(slow, ["Alpha;IT;100;0.5"])
+    write_csv(fast, ["Bravo;IT;200;0.1"])
+    cache = SheetCache(str(tmp_path / "cache"))
+    started, release = threading.Event(), threading.Event()
+    read = sheet_cache_module.read_source_frame
+
+    def blocking_read(path):
+        if path.endswith("slow.csv"):
+            started.set()
+            release.wait(5)
+        return read(path)
+
+    monkeypatch.setattr(sheet_cache_module, "read_source_frame", blocking_read)
+    loaders = [threading.Thread(target=cache.load, args=(str(slow),)) for _ in range(2)]
+    for loader in loaders:
+        loader.start()
+    assert started.wait(5)
+    assert cache.load(str(fast)).nrows == 1  # not queued behind slow.csv
+    release.set()
+    for loader in loaders:
+        loader.join()
+    assert cache.stats()["conversions"] == 2  # slow.csv converted once for both loaders
@@ -0,0 +1,95 @@
+import pytest
+from backend.sheet_query import describe_sheets, validate_query, run_query, format_result, QueryError
+
+@pytest.fixture
+def kb_path(tmp_path):
+    (tmp_path / "finance").mkdir()
+    (tmp_path / "finance" / "sales.csv").write_text(
+        "Supplier_Name,Category,Year,Sales\n"
+        "Alpha Supplies,IT,2026,100\n"
+        "Alpha Supplies,Logistics,2026,50\n"
+        "Bravo Distributors,IT,2026,400\n"
+        "Charlie Co,IT,2025,300\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "notes.txt").write_text("Not a sheet", encoding="utf-8")
+    return str(tmp_path)
+
+def test_schema_lists_columns_and_samples(kb_path):
+    [schema] = describe_sheets(kb_path)
+    assert schema["sheet"] == "finance/sales.csv"
+    assert schema["rows"] == 4
+    columns = {c["name"]: c for c in schema["columns"]}
+    assert columns["Category"]["values"] == ["IT", "Logistics"]
+    assert columns["Sales"]["max"] == 400.0
+    assert len(schema["sample"]) == 4
+
+def test_schema_is_rebuilt_only_when_the_sheet_changes(kb_path):
+    import os
+    [first] = describe_sheets(kb_path)
+    assert describe_sheets(kb_path)[0] is first
+    sheet = os.path.join(kb_path, "finance", "sales.csv")
+    with open(sheet, "a", encoding="utf-8") as f:
+        f.write("Delta Ltd,IT,2026,10\n")
+    os.utime(sheet, ns=(os.stat(sheet).st_mtime_ns + 10 ** 9,) * 2)
+    assert describe_sheets(kb_path)[0]["rows"] == 5
+
+def test_grouped_totals_run_locally(kb_path):
+    schemas = describe_sheets(kb_path)
+    query = validate_query({
+        "filters": [{"column": "Year", "op": "==", "value": "2026"}, {"column": "Category", "op": "in", "value": ["it"]}],
+        "group_by": ["Supplier_Name"],
+        "aggregations": [{"column": "Sales", "func": "sum", "as": "total"}],
+        "sort": [{"column": "total", "order": "desc"}],
+        "limit": 1,
+    }, schemas)
+    result = run_query(kb_path, query)
+    assert result["columns"] == ["Supplier_Name", "total"]
+    assert result["rows"] == [["Bravo Distributors", 400]]
+    assert result["total_rows"] == 2 and result["truncated"]
+    assert format_result(result).splitlines()[:2] == ["Supplier_Name | total", "Bravo Distributors | 400"]
+
+def test_row_count_without_group(kb_path):
+    schemas = describe_sheets(kb_path)
+    query = validate_query({"filters": [{"column": "Supplier_Name", "op": "contains", "value": "ALPHA"}],
+                            "aggregations": [{"func": "count"}]}, schemas)
+    assert run_query(kb_path, query)["rows"] == [[2]]
+
+def test_filter_only_query_returns_all_columns_and_sorts(kb_path):
+    schemas = describe_sheets(kb_path)
+    query = validate_query({"filters": [{"column": "Category", "op": "==", "value": "it"}],
+                            "sort": [{"column": "Sales", "order": "desc"}]}, schemas)
+    result = run_query(kb_path, query)
+    assert result["columns"] == ["Supplier_Name", "Category", "Year", "Sales"]
+    assert [row[0] for row in result["rows"]] == ["Bravo Distributors", "Charlie Co", "Alpha Supplies"]
+
+@pytest.mark.parametrize("query", [
+    {"sheet": "../secrets.csv"},
+    {"filters": [{"column": "Price", "op": "==", "value": 1}]},
+    {"filters": [{"column": "Sales", "op": "eval", "value": "1"}]},
+    {"aggregations": [{"column": "Sales", "func": "__import__"}]},
+    {"sort": [{"column": "Missing"}]},
+    {"columns": ["Supplier_Name"], "sort": [{"column": "Sales"}]},
+    {"group_by": ["Supplier_Name"], "aggregations": [{"column": "Sales", "func": "sum", "as": "Supplier_Name"}]},
+    {"aggregations": [{"column": "Sales", "func": "sum", "as": "x"}, {"column": "Sales", "func": "max", "as": "x"}]},
+])
+def test_invalid_queries_are_rejected(kb_path, query):
+    with pytest.raises(QueryError):
+        validate_query(query, describe_sheets(kb_path))
+
+@pytest.mark.parametrize("plan", ['["not", "an", "object"]', '{"query": ["Sales"]}', '{"query": {"sheet": 42}}'])
+def test_bad_plans_fall_back_to_retrieval(kb_path, plan, monkeypatch):
+    import asyncio
+    from unittest.mock import AsyncMock, MagicMock
+    import backend.main as main
+
+    completion = MagicMock()
+    completion.choices[0].message.content = plan
+    fake = MagicMock()
+    fake.chat.completions.create = AsyncMock(return_value=completion)
+    monkeypatch.setattr(main, "client", fake)
+    request = main.ChatRequest(message="Total sales?", mode="data")
+    session = main.session_store.resolve()
+    # Fresh cache: a plan cached by another test must not be reused
+    monkeypatch.setattr(main, "llm_cache", main.llm_cache.__class__(maxsize=1))
+    assert asyncio.run(main.answer_from_sheets(request, kb_path, session)) is None
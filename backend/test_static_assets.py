@@ -0,0 +1,71 @@
+import gzip
+import os
+import shutil
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from backend.static_assets import StaticAssets, parse_accept_encoding
+
+DIST = os.path.join(os.path.dirname(__file__), "dist")
+
+def make_client(root):
+    assets = StaticAssets(root)
+    app = FastAPI()
+
+    @app.get("/{full_path:path}")
+    async def serve(full_path: str, request: Request):
+        return assets.response(full_path, request.headers) or {"error": "not built"}
+
+    return TestClient(app), assets
+
+def test_hashed_assets_are_immutable_and_compressed(tmp_path):
+    root = tmp_path / "static"
+    shutil.copytree(DIST, root)
+    client, _ = make_client(str(root))
+    js = next(n for n in os.listdir(root / "assets") if n.endswith(".js"))
+
+    response = client.get(f"/assets/{js}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == (root / "assets" / js).read_bytes()  # decoded by the client
+
+    raw = client.get(f"/assets/{js}", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    assert raw.headers["etag"] != response.headers["etag"]
+    assert client.get("/assets/missing-abcdefgh.js").status_code == 404
+
+def test_spa_routes_revalidate_index_with_etag(tmp_path):
+    root = tmp_path / "static"
+    shutil.copytree(DIST, root)
+    client, assets = make_client(str(root))
+
+    first = client.get("/contracts/some-route")
+    assert first.status_code == 200 and b"<html" in first.content.lower()
+    assert first.headers["cache-control"] == "no-cache"
+    assert client.get("/vite.svg").headers["cache-control"] == "no-cache"
+
+    again = client.get("/", headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304 and again.content == b""
+    assert assets.stats()["not_modified"] == 1
+
+def test_build_supplied_variants_are_used(tmp_path):
+    root = tmp_path / "static"
+    (root / "assets").mkdir(parents=True)
+    (root / "assets" / "app-AbCd1234.css").write_text("body { color: red; }\n" * 200)
+    (root / "assets" / "app-AbCd1234.css.gz").write_bytes(gzip.compress(b"prebuilt"))
+    client, _ = make_client(str(root))
+    response = client.get("/assets/app-AbCd1234.css", headers={"Accept-Encoding": "gzip"})
+    assert response.content == b"prebuilt"
+    assert client.get("/assets/app-AbCd1234.css.gz").status_code == 404
+
+def test_accept_encoding_parsing():
+    assert parse_accept_encoding("gzip;q=0, br") == {"br"}
+    assert parse_accept_encoding("*;q=0.5, gzip;q=0") == {"*", "br"}
+    assert parse_accept_encoding("") == set()
+
+def test_missing_build(tmp_path):
+    client, _ = make_client(str(tmp_path / "nothing"))
+    assert client.get("/").json() == {"error": "not built"}
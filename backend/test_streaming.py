@@ -0,0 +1,46 @@
+import json
+import asyncio
+from types import SimpleNamespace
+from backend.streaming import JsonStringFieldStreamer, completion_events
+
+def make_chunks(texts):
+    async def gen():
+        for text in texts:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+    return gen()
+
+def collect(agen):
+    async def run():
+        return [event async for event in agen]
+    return asyncio.run(run())
+
+def test_streamer_handles_split_escapes():
+    document = json.dumps({"response": 'Line "one"\nCafé \U0001F600 done', "extracted_data": {"v1": "x"}})
+    streamer = JsonStringFieldStreamer("response")
+    decoded = "".join(streamer.feed(document[i:i + 3]) for i in range(0, len(document), 3))
+    assert decoded == 'Line "one"\nCafé \U0001F600 done'
+    assert streamer.done
+
+def test_json_mode_events_end_with_extracted_data():
+    document = json.dumps({"response": "MAPPED VARIABLES", "extracted_data": {"v1": "Acme"}})
+    events = collect(completion_events(make_chunks([document[:10], document[10:25], document[25:]]), json_field="response"))
+
+    deltas = [json.loads(e[len("data: "):]) for e in events if e.startswith("data: ")]
+    assert "".join(d["delta"] for d in deltas) == "MAPPED VARIABLES"
+    assert events[-2] == 'event: extracted_data\ndata: {"v1": "Acme"}\n\n'
+    assert events[-1].startswith("event: done\n")
+
+def test_plain_mode_streams_deltas_and_done_payload():
+    events = collect(completion_events(make_chunks(["Hel", "lo"]), done_payload={"sources": ["a.pdf"]}))
+    assert events[:2] == ['data: {"delta": "Hel"}\n\n', 'data: {"delta": "lo"}\n\n']
+    assert json.loads(events[-1].split("data: ", 1)[1]) == {"sources": ["a.pdf"], "response": "Hello"}
+
+def test_async_done_hook_is_awaited():
+    seen = []
+
+    async def on_done(text):
+        await asyncio.sleep(0)
+        seen.append(text)
+
+    collect(completion_events(make_chunks(["Hi"]), on_done=on_done))
+    assert seen == ["Hi"]
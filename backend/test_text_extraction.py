@@ -0,0 +1,35 @@
+import docx
+from unittest.mock import patch
+from backend.text_extraction import ExtractionCache, UnsupportedFormatError, READERS, normalize_text
+import pytest
+
+def test_docx_includes_tables_in_body_order(tmp_path):
+    doc = docx.Document()
+    doc.add_paragraph("1. Pricing")
+    table = doc.add_table(rows=1, cols=2)
+    table.rows[0].cells[0].text = "Unit price"
+    table.rows[0].cells[1].text = "EUR\xa0120"
+    doc.add_paragraph("2. Termination")
+    path = str(tmp_path / "contract.docx")
+    doc.save(path)
+
+    assert ExtractionCache().extract(path) == "1. Pricing\nUnit price | EUR 120\n2. Termination"
+
+def test_identical_content_is_parsed_once(tmp_path):
+    (tmp_path / "a.txt").write_text("Payment within 30 days.\r\n", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("Payment within 30 days.\r\n", encoding="utf-8")
+    cache = ExtractionCache()
+
+    with patch.dict(READERS, {"txt": lambda path: open(path, encoding="utf-8").read()}):
+        assert cache.extract(str(tmp_path / "a.txt")) == "Payment within 30 days."
+        assert cache.extract(str(tmp_path / "b.txt")) == "Payment within 30 days."
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 1
+
+def test_unsupported_format(tmp_path):
+    (tmp_path / "a.bin").write_bytes(b"\x00")
+    with pytest.raises(UnsupportedFormatError):
+        ExtractionCache().extract(str(tmp_path / "a.bin"))
+
+def test_normalize_text_collapses_blank_runs():
+    assert normalize_text("a  \n\n\n\nb\r\n") == "a\n\nb"
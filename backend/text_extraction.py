@@ -0,0 +1,181 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+try:
+    from backend.file_utils import file_digest
+    from backend.sheet_cache import load_frame
+    from backend.pdf_text import extract_pdf_text
+except ImportError:
+    from file_utils import file_digest
+    from sheet_cache import load_frame
+    from pdf_text import extract_pdf_text
+
+
+class UnsupportedFormatError(ValueError):
+    pass
+
+
+READERS = {}
+
+
+def register_reader(*extensions):
+    """Registers a function(path) -> str as the text reader for the given extensions."""
+    def decorator(func):
+        for ext in extensions:
+            READERS[ext.lower().lstrip(".")] = func
+        return func
+    return decorator
+
+
+def file_extension(path: str) -> str:
+    return os.path.splitext(path)[1].lower().lstrip(".")
+
+
+def is_supported(path: str) -> bool:
+    return file_extension(path) in READERS
+
+
+# --- FORMAT READERS ---
+# Heavy libraries are imported inside each reader so they load on first use.
+
+@register_reader("txt")
+def _read_txt(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@register_reader("docx", "doc")
+def _read_docx(path):
+    from docx import Document
+    from docx.table import Table
+
+    doc = Document(path)
+    lines = []
+    # Body order, so table rows stay next to the clauses that introduce them
+    for block in doc.iter_inner_content():
+        if isinstance(block, Table):
+            for row in block.rows:
+                cells = []
+                for cell in row.cells:
+                    # Merged cells are returned once per grid column
+                    if not cells or cell._tc is not cells[-1][0]:
+                        cells.append((cell._tc, cell.text))
+                lines.append(" | ".join(text for _, text in cells))
+        elif block.text.strip():
+            lines.append(block.text)
+    return "\n".join(lines)
+
+
+@register_reader("pdf")
+def _read_pdf(path):
+    # Per-page cache; large documents are extracted across worker processes
+    return extract_pdf_text(path)
+
+
+@register_reader("xlsx", "xls", "csv")
+def _read_spreadsheet(path):
+    # Parsed once into the columnar sheet cache; later reads skip openpyxl and the CSV parser
+    return load_frame(path).to_csv(index=False)
+
+
+BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def normalize_text(text: str) -> str:
+    """Unifies line endings and non-breaking spaces and trims trailing whitespace."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\xa0", " ")
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+class ExtractionCache:
+    """
+    LRU cache of normalized document text keyed by content hash.
+
+    Identical bytes are parsed once no matter which path or endpoint asks for
+    them. A stat memo avoids re-hashing files that have not changed.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._texts = OrderedDict()  # (digest, ext) -> text
+        self._digests = {}  # abspath -> (mtime_ns, size, digest)
+        self._lock = threading.Lock()
+
+    def _digest(self, path):
+        stat = os.stat(path)
+        with self._lock:
+            known = self._digests.get(path)
+        if known and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+            return known[2]
+        digest = file_digest(path)
+        with self._lock:
+            self._digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def extract(self, path: str) -> str:
+        path = os.path.abspath(path)
+        ext = file_extension(path)
+        reader = READERS.get(ext)
+        if reader is None:
+            raise UnsupportedFormatError(f"Unsupported file format: .{ext}")
+
+        key = (self._digest(path), ext)
+        with self._lock:
+            text = self._texts.get(key)
+            if text is not None:
+                self._texts.move_to_end(key)
+                self.hits += 1
+                return text
+
+        text = normalize_text(reader(path))
+        with self._lock:
+            self.misses += 1
+            self._texts[key] = text
+            while len(self._texts) > self.maxsize:
+                self._texts.popitem(last=False)
+        return text
+
+    def clear(self):
+        with self._lock:
+            self._texts.clear()
+            self._digests.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._texts),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+extraction_cache = ExtractionCache(maxsize=int(os.getenv("EXTRACTION_CACHE_SIZE", "128")))
+
+
+def extract_text(path: str) -> str:
+    """
+    Returns the normalized text of a document, tables included.
+
+    Raises:
+        FileNotFoundError: If path does not exist.
+        UnsupportedFormatError: If no reader is registered for the extension.
+    """
+    return extraction_cache.extract(path)
+
+
+def extract_text_prefix(path: str, max_chars: int) -> str:
+    """
+    Returns at most max_chars of a document's normalized text.
+    PDFs are only parsed until the budget is met instead of in full.
+    """
+    if file_extension(path) == "pdf":
+        return normalize_text(extract_pdf_text(path, max_chars=max_chars))[:max_chars]
+    return extract_text(path)[:max_chars]